@@ -0,0 +1,237 @@
+# analysis_jobs.py
+# 오래 걸리는 PDF 분석을 HTTP 요청과 분리해서 백그라운드 워커로 실행하는 로컬 작업 큐 (SQLite)
+# - 작업(job)과 단계별 결과(stage checkpoint)를 파일에 저장 → 워커/서버가 죽어도 마지막 완료 단계부터 재개
+# - 실행 중인 작업은 lease(임대 시간)를 주기적으로 갱신, 갱신이 끊긴 작업은 다른 워커가 다시 가져감
+# - 같은 호스트의 uvicorn 워커들이 같은 DB 파일을 공유하므로 어느 프로세스에 제출해도 됨
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data"))
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))  # 프로세스당 동시에 처리할 분석 작업 수
+JOB_LEASE_SECONDS = 60
+JOB_POLL_SECONDS = 1.0
+JOB_MAX_ATTEMPTS = 3  # 같은 작업이 계속 워커를 죽이는 경우 무한 재시도 방지
+
+
+class JobStore:
+    def __init__(self, path: str = None):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        self.path = path or os.path.join(DATA_DIR, "jobs.sqlite3")
+        self.files_dir = os.path.join(DATA_DIR, "jobs")
+        os.makedirs(self.files_dir, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,          -- queued / running / done / failed
+                filename TEXT,
+                file_path TEXT,
+                file_sha256 TEXT,
+                current_stage TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                lease_until REAL,
+                error TEXT,
+                result TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                material_id INTEGER
+            )
+        """)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+        if "material_id" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN material_id INTEGER")  # 결과를 개념 그래프에 저장할 강의자료
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_stages (
+                job_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                output TEXT NOT NULL,
+                finished_at REAL NOT NULL,
+                PRIMARY KEY (job_id, stage)
+            )
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def file_path_for(self, job_id: str) -> str:
+        return os.path.join(self.files_dir, f"{job_id}.pdf")
+
+    def create(self, job_id: str, filename: str, file_sha256: str, status: str = "queued", result=None,
+               material_id: int = None) -> str:
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO jobs (job_id, status, filename, file_path, file_sha256, result, created_at, updated_at, "
+            "material_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, status, filename, self.file_path_for(job_id), file_sha256,
+             json.dumps(result, ensure_ascii=False) if result is not None else None, now, now, material_id)
+        )
+        return job_id
+
+    def claim(self, worker: str):
+        """대기 중이거나 lease가 끊긴 작업 하나를 원자적으로 가져옴"""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_until < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE job_id = ?",
+                (worker, now + JOB_LEASE_SECONDS, now, row["job_id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        job = dict(row)
+        job["attempts"] += 1
+        return job
+
+    def renew(self, job_id: str, worker: str):
+        now = time.time()
+        self._conn().execute(
+            "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE job_id = ? AND worker = ? AND status = 'running'",
+            (now + JOB_LEASE_SECONDS, now, job_id, worker)
+        )
+
+    def release(self, worker_prefix: str):
+        """정상 종료 시 이 프로세스가 잡고 있던 작업을 바로 대기열로 되돌림 (lease 만료를 기다리지 않게)"""
+        self._conn().execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, lease_until = NULL, attempts = attempts - 1 "
+            "WHERE status = 'running' AND worker LIKE ?",
+            (f"{worker_prefix}%",)
+        )
+
+    def set_stage(self, job_id: str, stage: str):
+        self._conn().execute(
+            "UPDATE jobs SET current_stage = ?, updated_at = ? WHERE job_id = ?", (stage, time.time(), job_id)
+        )
+
+    def save_stage(self, job_id: str, stage: str, output):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO job_stages (job_id, stage, output, finished_at) VALUES (?, ?, ?, ?)",
+            (job_id, stage, json.dumps(output, ensure_ascii=False), time.time())
+        )
+
+    def load_stages(self, job_id: str) -> dict:
+        rows = self._conn().execute("SELECT stage, output FROM job_stages WHERE job_id = ?", (job_id,)).fetchall()
+        return {row["stage"]: json.loads(row["output"]) for row in rows}
+
+    def finish(self, job_id: str, result):
+        self._conn().execute(
+            "UPDATE jobs SET status = 'done', result = ?, lease_until = NULL, updated_at = ? WHERE job_id = ?",
+            (json.dumps(result, ensure_ascii=False), time.time(), job_id)
+        )
+        self._cleanup(job_id)
+
+    def fail(self, job_id: str, error: str, final: bool):
+        # final이 아니면 대기열로 되돌려 다음 워커가 마지막 완료 단계부터 재시도
+        status = "failed" if final else "queued"
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, error = ?, worker = NULL, lease_until = NULL, updated_at = ? WHERE job_id = ?",
+            (status, error, time.time(), job_id)
+        )
+        if final:
+            self._cleanup(job_id)
+
+    def _cleanup(self, job_id: str):
+        self._conn().execute("DELETE FROM job_stages WHERE job_id = ?", (job_id,))
+        try:
+            os.unlink(self.file_path_for(job_id))
+        except OSError:
+            pass
+
+    def get(self, job_id: str):
+        row = self._conn().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["finished_stages"] = [
+            r["stage"] for r in self._conn().execute(
+                "SELECT stage FROM job_stages WHERE job_id = ? ORDER BY finished_at", (job_id,)
+            )
+        ]
+        return job
+
+
+class JobRunner:
+    """handler(job, store)를 ANALYSIS_WORKERS개의 asyncio 워커로 실행"""
+
+    def __init__(self, store: JobStore, handler, workers: int = ANALYSIS_WORKERS):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}:"
+        self._tasks = []
+        self._wakeup = None
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker_loop(f"{self.worker_prefix}{i}")) for i in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.store.release(self.worker_prefix)
+
+    def submit(self, filename: str, file_sha256: str, job_id: str = None, material_id: int = None) -> str:
+        job_id = self.store.create(job_id or uuid.uuid4().hex, filename, file_sha256, material_id=material_id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    def new_job_id(self) -> str:
+        return uuid.uuid4().hex
+
+    async def _heartbeat(self, job_id: str, worker: str):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            self.store.renew(job_id, worker)
+
+    async def _worker_loop(self, worker: str):
+        while True:
+            job = self.store.claim(worker)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heartbeat = asyncio.create_task(self._heartbeat(job["job_id"], worker))
+            try:
+                result = await self.handler(job, self.store)
+                self.store.finish(job["job_id"], result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"분석 작업 실패 ({job['job_id']}, 시도 {job['attempts']}회): {e}")
+                self.store.fail(job["job_id"], str(e), final=job["attempts"] >= JOB_MAX_ATTEMPTS)
+            finally:
+                heartbeat.cancel()
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, UploadFile, File
+from fastapi import APIRouter, Depends, UploadFile, File, Request
 from sqlalchemy.orm import Session
 from database import get_db
 from models import Archive, LectureMaterial, Slide, Question
 from auth import get_current_user
-import pdfplumber
+from pdf_extract import extract_text
+from lecture_bundle import BUNDLE_CACHE, bundle_response
 from database import Base, get_db, engine
 
 router = APIRouter()
@@ -14,13 +15,8 @@ def upload_pdf(
     db: Session = Depends(get_db),
     # user_id: int = Depends(get_current_user)
 ):
-    pdf_bytes = file.file.read()
-    with open("temp.pdf", "wb") as f:
-        f.write(pdf_bytes)
-    with pdfplumber.open("temp.pdf") as pdf:
-        original_text = ""
-        for page in pdf.pages:
-            original_text += page.extract_text() + "\n"
+    # 업로드 파일 객체를 요청 안에서 바로 읽음 (공용 temp.pdf를 쓰면 동시 업로드끼리 덮어씀)
+    original_text = extract_text(file.file)
     summary = call_summary_model(original_text)
     quiz_json = call_quiz_model(summary)
     archive = Archive(
@@ -52,37 +48,10 @@ def get_archives(
     ]
 
 @router.get("/archive/{lecture_id}")
-def get_archive(lecture_id: int, db: Session = Depends(get_db)):
-    # 강의자료 정보 조회
-    material = db.query(LectureMaterial).filter(LectureMaterial.material_id == lecture_id).first()
-    if not material:
-        from fastapi import HTTPException
-        raise HTTPException(status_code=404, detail="강의자료를 찾을 수 없습니다.")
+def get_archive(lecture_id: int, request: Request, db: Session = Depends(get_db)):
+    # 강의자료 + 슬라이드 + 문제 번들 (버전이 같으면 캐시된 JSON 또는 304, lecture_bundle 참고)
+    return bundle_response(request, db, lecture_id)
 
-    # 해당 강의자료의 슬라이드 조회
-    slides = db.query(Slide).filter(Slide.material_id == lecture_id).all()
-    slide_ids = [s.slide_id for s in slides]
-
-    # 해당 슬라이드에 연결된 문제 조회
-    questions = db.query(Question).filter(Question.slide_id.in_(slide_ids)).all()
-
-    return {
-        "lecture_id": lecture_id,
-        "material_name": material.material_name,
-        "slides": [
-            {
-                "slide_id": s.slide_id,
-                "slide_number": s.slide_number,
-                "summary": s.summary
-            } for s in slides
-        ],
-        "questions": [
-            {
-                "question_id": q.question_id,
-                "slide_id": q.slide_id,
-                "content": q.content,
-                "answer": q.answer,
-                "explanation": q.explanation
-            } for q in questions
-        ]
-    }
\ No newline at end of file
+@router.get("/archive-cache/stats")
+def archive_cache_stats():
+    return BUNDLE_CACHE.stats()
@@ -0,0 +1,58 @@
+# bench_extract.py
+# PDF 텍스트 추출 백엔드별 처리량 비교 (pages/s)
+#
+# 사용법 (backend 폴더에서):
+#   python benchmarks/bench_extract.py ../temp_files/*.pdf
+#   python benchmarks/bench_extract.py --backends pymupdf --repeat 5 ../temp_files/*.pdf
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdf_extract
+
+
+def bench_backend(backend, blobs, repeat):
+    pages = chars = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for data in blobs:
+            texts = pdf_extract.extract_page_texts(data, backend)
+            pages += len(texts)
+            chars += sum(len(t) for t in texts)
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": elapsed,
+        "pages_s": pages / elapsed,
+        "kchars_s": chars / elapsed / 1000,
+        "chars_per_page": chars / pages if pages else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--backends", default=",".join(pdf_extract.EXTRACT_BACKENDS))
+    parser.add_argument("--repeat", type=int, default=3, help="PDF 목록 반복 횟수 (측정 시간 확보용)")
+    args = parser.parse_args()
+
+    # 디스크 읽기 시간은 빼고 추출만 측정하도록 미리 메모리에 올림
+    blobs = []
+    for path in args.pdfs:
+        with open(path, "rb") as f:
+            blobs.append(f.read())
+    print(f"{len(blobs)} files x {args.repeat}")
+    print(f"{'backend':11} {'time(s)':>8} {'pages/s':>9} {'kch/s':>9} {'ch/page':>8}")
+    for backend in args.backends.split(","):
+        try:
+            r = bench_backend(backend, blobs, args.repeat)
+        except Exception as e:
+            print(f"{backend:11} 건너뜀: {e}")
+            continue
+        print(f"{backend:11} {r['seconds']:>8.2f} {r['pages_s']:>9.1f} {r['kchars_s']:>9.1f} {r['chars_per_page']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
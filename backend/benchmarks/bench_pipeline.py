@@ -0,0 +1,238 @@
+# bench_pipeline.py
+# 개념맵 분석 파이프라인(단계별)과 문제 생성(generate_quiz) 벤치마크
+# - 기본값으로 로컬 가짜 LLM 서버(fake_llm_server)를 띄워 OpenAI 대신 사용 (--api-base로 외부 서버 지정 가능)
+# - 단계별 벽시계 시간, LLM 호출 수/오류 수, 프롬프트/응답 토큰 수, 최대 RSS를 JSON으로 저장
+# - 분석/LLM 캐시는 빈 임시 폴더를 써서 항상 콜드 상태로 측정
+#
+# 사용법 (backend 폴더에서):
+#   python benchmarks/bench_pipeline.py ../temp_files/*.pdf
+#   python benchmarks/bench_pipeline.py --latency 0.8 --error-rate 0.05 --quiz 20 ../temp_files/*.pdf
+#   python benchmarks/bench_pipeline.py --baseline benchmarks/results/old.json ../temp_files/*.pdf
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm_server import FakeLLMServer
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)  # 리눅스 ru_maxrss 단위는 KB
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+class StageMeter:
+    """구간 시작/끝의 llm_client 사용량 차이로 단계별 LLM 호출/토큰 수를 계산"""
+
+    def __init__(self, llm_client):
+        self.llm_client = llm_client
+
+    def __enter__(self):
+        self.before = self.llm_client.usage_stats()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+        after = self.llm_client.usage_stats()
+        self.usage = {name: after[name] - self.before[name] for name in after}
+        self.peak_rss_mb = peak_rss_mb()
+
+    def as_dict(self, name: str) -> dict:
+        return {"name": name, "seconds": round(self.seconds, 4), "llm_calls": self.usage["calls"],
+                "llm_errors": self.usage["errors"], "prompt_tokens": self.usage["prompt_tokens"],
+                "completion_tokens": self.usage["completion_tokens"], "peak_rss_mb": self.peak_rss_mb}
+
+
+async def bench_document(sa, llm_client, pdf_path: str, end_to_end: bool) -> dict:
+    with open(pdf_path, "rb") as f:
+        pdf_sha256 = hashlib.sha256(f.read()).hexdigest()
+    ctx = {"pdf_path": pdf_path, "pdf_sha256": pdf_sha256}
+    stages = []
+    # 동시에 실행되는 단계 그룹도 단계별 사용량을 나누어 보려고 하나씩 순서대로 실행
+    for group in sa.ANALYSIS_STAGE_GROUPS:
+        for name, fn, _ in group:
+            with StageMeter(llm_client) as meter:
+                ctx.update(await fn(ctx))
+            stages.append(meter.as_dict(name))
+    doc = {
+        "file": os.path.basename(pdf_path),
+        "pages": len(ctx["slide_texts"]),
+        "keywords": len(sa._keyword_list(ctx)),
+        "stages": stages,
+        "sequential_seconds": round(sum(s["seconds"] for s in stages), 4),
+    }
+    if end_to_end:
+        # 실제 서비스와 같은 방식(그룹 내 단계 동시 실행)으로 한 번 더 측정
+        with StageMeter(llm_client) as meter:
+            await sa.run_analysis_pipeline(pdf_path, pdf_sha256)
+        doc["pipeline"] = meter.as_dict("pipeline")
+    return doc
+
+
+def bench_quiz(gpt_generate, llm_client, sample: dict, n: int) -> dict:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from models import Question, QuestionKeyword
+
+    # 문제 저장 경로까지 포함해서 측정하되 MariaDB 대신 메모리 SQLite 사용
+    engine = create_engine("sqlite://")
+    for table in (Question.__table__, QuestionKeyword.__table__):
+        table.create(engine)
+    db = sessionmaker(bind=engine)()
+    latencies = []
+    with StageMeter(llm_client) as meter:
+        for _ in range(n):
+            start = time.perf_counter()
+            try:
+                gpt_generate.generate_quiz(db=db, fresh=True, **sample)
+            except Exception as e:
+                print(f"문제 생성 실패: {e}")
+            latencies.append(time.perf_counter() - start)
+    db.close()
+    result = meter.as_dict("generate_quiz")
+    result.update({
+        "requests": n,
+        "p50_seconds": round(statistics.median(latencies), 4) if latencies else 0,
+        "p95_seconds": round(sorted(latencies)[int(len(latencies) * 0.95) - 1], 4) if latencies else 0,
+    })
+    return result
+
+
+def quiz_sample(doc_ctx_texts, title, keywords) -> dict:
+    first = next((t for t in doc_ctx_texts if t.strip()), "")
+    return {
+        "slide_id": 1,
+        "keyword_id": 1,
+        "slide_title": title,
+        "concept_explanation": first[:300],
+        "image_description": None,
+        "keywords": keywords[:5],
+        "important_sentences": [line for line in first.split("\n") if line.strip()][:3],
+        "slide_summary": first[:500],
+    }
+
+
+def print_report(report: dict, baseline: dict = None):
+    base_stages = {}
+    if baseline:
+        for doc in baseline.get("documents", []):
+            for stage in doc["stages"]:
+                base_stages[(doc["file"], stage["name"])] = stage
+    print(f"{'file':40} {'stage':13} {'sec':>8} {'calls':>6} {'p_tok':>8} {'c_tok':>7} {'rss_mb':>7} {'Δsec':>8}")
+    for doc in report["documents"]:
+        for stage in doc["stages"] + ([doc["pipeline"]] if "pipeline" in doc else []):
+            base = base_stages.get((doc["file"], stage["name"]))
+            delta = f"{stage['seconds'] - base['seconds']:+.3f}" if base else ""
+            print(f"{doc['file'][:40]:40} {stage['name']:13} {stage['seconds']:>8.3f} {stage['llm_calls']:>6} "
+                  f"{stage['prompt_tokens']:>8} {stage['completion_tokens']:>7} {stage['peak_rss_mb']:>7} {delta:>8}")
+    if report.get("quiz"):
+        q = report["quiz"]
+        print(f"generate_quiz x{q['requests']}: p50 {q['p50_seconds']}s, p95 {q['p95_seconds']}s, "
+              f"calls {q['llm_calls']}, errors {q['llm_errors']}, tokens {q['prompt_tokens']}+{q['completion_tokens']}")
+    print(f"peak RSS: {report['peak_rss_mb']} MB (자식 프로세스 {report['children_peak_rss_mb']} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--api-base", default=None, help="이미 떠 있는 OpenAI 호환 서버 주소 (없으면 가짜 서버 실행)")
+    parser.add_argument("--latency", type=float, default=0.3, help="가짜 서버 평균 응답 지연(초)")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quiz", type=int, default=10, help="generate_quiz 호출 횟수 (0이면 생략)")
+    parser.add_argument("--no-pipeline", action="store_true", help="동시 실행 전체 파이프라인 측정 생략")
+    parser.add_argument("--output", default=None, help="결과 JSON 경로 (기본: benchmarks/results/pipeline-<commit>.json)")
+    parser.add_argument("--baseline", default=None, help="비교할 이전 결과 JSON")
+    args = parser.parse_args()
+
+    pdfs = [os.path.abspath(p) for p in args.pdfs]
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    output = os.path.abspath(args.output or os.path.join(BACKEND_DIR, "benchmarks", "results",
+                                                          f"pipeline-{git_commit()}.json"))
+    server = None
+    api_base = args.api_base
+    if api_base is None:
+        server = FakeLLMServer(("127.0.0.1", 0), args.latency, args.jitter, args.error_rate, args.seed)
+        api_base = server.start_background().api_base
+
+    # 모듈 import 전에 환경 설정: 캐시/데이터는 빈 임시 폴더, OpenAI는 가짜 서버로
+    workdir = tempfile.mkdtemp(prefix="bench-pipeline-")
+    os.environ.update({
+        "OPENAI_API_BASE": api_base,
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "bench",
+        "CACHE_DIR": os.path.join(workdir, "cache"),
+        "DATA_DIR": os.path.join(workdir, "data"),
+        "LLM_CACHE_ENABLED": "0",
+    })
+    import llm_client
+    import slide_analyzer as sa  # 불용어 파일을 현재 폴더 기준으로 읽으므로 chdir 전에 import
+    import gpt_generate
+    import tokenizer_pool
+    os.chdir(workdir)  # 분석 단계가 남기는 디버그 CSV가 저장소에 쌓이지 않게
+
+    async def run_all():
+        docs = []
+        for path in pdfs:
+            print(f"분석: {os.path.basename(path)}")
+            docs.append(await bench_document(sa, llm_client, path, not args.no_pipeline))
+        return docs
+
+    documents = asyncio.run(run_all())
+    quiz = None
+    if args.quiz and pdfs:
+        texts, title = sa.read_pdf_pages(pdfs[0])
+        keywords, _ = sa.get_top_n_tfidf_nouns(texts, n=10)
+        quiz = bench_quiz(gpt_generate, llm_client, quiz_sample(texts, title, sorted(keywords)), args.quiz)
+    tokenizer_pool.shutdown()
+
+    report = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "api_base": api_base if args.api_base else "fake",
+            "latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate,
+            "llm_concurrency": llm_client.LLM_CONCURRENCY,
+            "tokenizer": tokenizer_pool.KOREAN_TOKENIZER,
+            "analysis_model": sa.ANALYSIS_MODEL,
+        },
+        "documents": documents,
+        "quiz": quiz,
+        "peak_rss_mb": peak_rss_mb(),
+        "children_peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+    if server is not None:
+        report["fake_server"] = dict(server.stats)
+        server.shutdown()
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    baseline = None
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    print(f"저장: {output}")
+
+
+if __name__ == "__main__":
+    main()
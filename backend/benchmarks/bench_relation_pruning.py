@@ -0,0 +1,85 @@
+# bench_relation_pruning.py
+# 후보 쌍 선택(keyword_pairs) 전/후의 관계 추론 LLM 호출 수와, 전체 쌍 결과 대비 관계 회수율 비교
+#
+# 사용법 (backend 폴더에서):
+#   python benchmarks/bench_relation_pruning.py ../temp_files/*.pdf
+#   python benchmarks/bench_relation_pruning.py --llm --keywords 라우터,스위치,IP ../temp_files/pdf3.pdf
+# --llm: 실제 GPT로 전체 쌍/후보 쌍 관계를 모두 추론해서 회수율 측정 (OPENAI_API_KEY 필요, 비용 발생)
+import argparse
+import asyncio
+import math
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+
+from keyword_pairs import select_candidate_pairs, RELATION_TOP_K
+
+BATCH_SIZE = 10  # get_keyword_relations의 배치 크기
+STOPWORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "stopwords-ko.txt")
+
+
+def load_pages(path):
+    with fitz.open(path) as doc:
+        return [page.get_text() for page in doc]
+
+
+def proxy_keywords(pages, n):
+    # 형태소 분석기 없이 빈도 상위 단어를 개념어 대용으로 사용
+    with open(STOPWORDS_PATH, encoding="utf-8") as f:
+        stopwords = set(line.strip() for line in f if line.strip())
+    words = re.findall(r"[가-힣A-Za-z]{2,}", "\n".join(pages))
+    counts = Counter(w for w in words if w not in stopwords)
+    return [w for w, _ in counts.most_common(n)]
+
+
+def relation_recall(full_rels, candidate_pairs):
+    related = {frozenset((a, b)) for a, b, rel in full_rels if rel != "관련없음"}
+    if not related:
+        return None
+    kept = {frozenset(p) for p in candidate_pairs}
+    return len(related & kept) / len(related)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--keywords", help="쉼표로 구분한 개념어 (없으면 빈도 상위 단어 사용)")
+    parser.add_argument("--n-keywords", type=int, default=40)
+    parser.add_argument("--top-k", type=int, default=RELATION_TOP_K)
+    parser.add_argument("--llm", action="store_true")
+    args = parser.parse_args()
+
+    print(f"{'pdf':45} {'kw':>3} {'pairs':>6} {'calls':>5} {'cand':>5} {'calls':>5} {'saved':>6} {'ms':>7} {'recall':>6}")
+    for path in args.pdfs:
+        pages = load_pages(path)
+        keywords = args.keywords.split(",") if args.keywords else proxy_keywords(pages, args.n_keywords)
+        n = len(keywords)
+        full_pairs = n * (n - 1) // 2
+
+        start = time.perf_counter()
+        candidates = select_candidate_pairs(keywords, pages, top_k=args.top_k)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        full_calls = math.ceil(full_pairs / BATCH_SIZE)
+        cand_calls = math.ceil(len(candidates) / BATCH_SIZE)
+        saved = 1 - cand_calls / full_calls if full_calls else 0.0
+
+        recall = None
+        if args.llm:
+            from slide_analyzer import get_keyword_relations, OPENAI_API_KEY
+            full_rels = asyncio.run(get_keyword_relations(keywords, "\n".join(pages), OPENAI_API_KEY))
+            recall = relation_recall(full_rels, candidates)
+
+        recall_str = f"{recall:.2f}" if recall is not None else "-"
+        print(f"{os.path.basename(path)[:45]:45} {n:>3} {full_pairs:>6} {full_calls:>5} "
+              f"{len(candidates):>5} {cand_calls:>5} {saved:>6.0%} {elapsed_ms:>7.1f} {recall_str:>6}")
+
+
+if __name__ == "__main__":
+    main()
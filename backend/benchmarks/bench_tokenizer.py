@@ -0,0 +1,82 @@
+# bench_tokenizer.py
+# Okt / Kiwi 명사 추출 처리량 비교 (단일 프로세스 vs 토크나이저 프로세스 풀)
+#
+# 사용법 (backend 폴더에서):
+#   python benchmarks/bench_tokenizer.py ../temp_files/*.pdf
+#   python benchmarks/bench_tokenizer.py --backends kiwi --workers 4 ../temp_files/*.pdf
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+
+import tokenizer_pool
+
+
+def load_pages(paths):
+    pages = []
+    for path in paths:
+        with fitz.open(path) as doc:
+            pages.extend(page.get_text() for page in doc)
+    return pages
+
+
+def bench_backend(backend, pages, workers, repeat):
+    total_chars = sum(len(p) for p in pages) * repeat
+    total_pages = len(pages) * repeat
+
+    start = time.perf_counter()
+    analyzer = tokenizer_pool.create_analyzer(backend)
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            tokenizer_pool.extract_nouns(analyzer, backend, page)
+    single_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tokenizer_pool.get_pool(backend, workers)
+    tokenizer_pool.warm_up(backend)
+    warm_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tokenizer_pool.tokenize_pages(pages * repeat, backend)
+    pool_s = time.perf_counter() - start
+
+    return {
+        "load_s": load_s,
+        "warm_s": warm_s,
+        "single_pages_s": total_pages / single_s,
+        "pool_pages_s": total_pages / pool_s,
+        "pool_kchars_s": total_chars / pool_s / 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--backends", default=",".join(tokenizer_pool.SUPPORTED_BACKENDS))
+    parser.add_argument("--workers", type=int, default=tokenizer_pool.TOKENIZER_WORKERS)
+    parser.add_argument("--repeat", type=int, default=3, help="페이지 목록 반복 횟수 (측정 시간 확보용)")
+    args = parser.parse_args()
+
+    pages = load_pages(args.pdfs)
+    print(f"{len(pages)} pages x {args.repeat}, workers={args.workers}")
+    print(f"{'backend':8} {'load(s)':>8} {'warm(s)':>8} {'1proc p/s':>10} {'pool p/s':>10} {'pool kch/s':>11}")
+    for backend in args.backends.split(","):
+        try:
+            r = bench_backend(backend, pages, args.workers, args.repeat)
+        except Exception as e:
+            print(f"{backend:8} 건너뜀: {e}")
+            continue
+        print(f"{backend:8} {r['load_s']:>8.2f} {r['warm_s']:>8.2f} {r['single_pages_s']:>10.1f} "
+              f"{r['pool_pages_s']:>10.1f} {r['pool_kchars_s']:>11.1f}")
+    tokenizer_pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# fake_llm_server.py
+# 벤치마크용 OpenAI 호환 로컬 서버 (POST /v1/chat/completions)
+# - 프롬프트 종류(소주제/설명/중요도/관계/문제 생성)를 보고 형식에 맞는 고정 JSON을 돌려줌
+# - 응답 지연(평균 + 흔들림)과 오류 비율을 설정할 수 있음
+# - 토큰 수는 글자 수 기반 추정치 (passage_index.estimate_tokens와 같은 방식)
+#
+# 단독 실행 (backend 폴더에서):
+#   python benchmarks/fake_llm_server.py --port 8765 --latency 0.5 --error-rate 0.05
+#   OPENAI_API_BASE=http://127.0.0.1:8765/v1 uvicorn main:app
+import argparse
+import ast
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_TOKEN = 1.5
+RELATION_TYPES = ["상위-하위", "원인-결과", "동의어", "관련없음"]
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, int(len(text) / CHARS_PER_TOKEN))
+
+
+def _terms_after(prompt: str, label: str):
+    # "용어: [...]" 줄의 JSON 배열
+    match = re.search(rf"^{label}\s*(\[.*\])\s*$", prompt, flags=re.MULTILINE)
+    if not match:
+        return []
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return []
+
+
+def _subtopics(prompt: str) -> dict:
+    n_sub = int((re.search(r"소주제\(중요한 (\d+)개\)", prompt) or [0, 4])[1])
+    n_kw = int((re.search(r"(\d+)개씩", prompt) or [0, 12])[1])
+    body = prompt.split("실제 입력:", 1)[-1]
+    # 입력 본문에서 자주 나온 한글 단어를 개념어로 사용 → 이후 TF-IDF 필터를 실제처럼 통과
+    words = [w for w, _ in Counter(re.findall(r"[가-힣]{2,}", body)).most_common(n_sub * n_kw)]
+    return {f"소주제{i + 1}": words[i * n_kw:(i + 1) * n_kw] for i in range(n_sub)}
+
+
+def canned_content(prompt: str) -> str:
+    if "관계유형" in prompt:
+        try:
+            pairs = ast.literal_eval(prompt.rsplit("용어쌍:", 1)[1].strip())
+        except (ValueError, SyntaxError, IndexError):
+            pairs = []
+        return json.dumps([[a, b, RELATION_TYPES[i % len(RELATION_TYPES)]] for i, (a, b) in enumerate(pairs)],
+                          ensure_ascii=False)
+    if "중요도" in prompt:
+        return json.dumps({t: (i % 5) + 1 for i, t in enumerate(_terms_after(prompt, "용어:"))}, ensure_ascii=False)
+    if "정의/설명" in prompt:
+        return json.dumps({t: f"{t}에 대한 간단한 설명입니다." for t in _terms_after(prompt, "용어:")},
+                          ensure_ascii=False)
+    if "소주제" in prompt:
+        return json.dumps(_subtopics(prompt), ensure_ascii=False)
+    if "문제" in prompt:
+        return json.dumps({
+            "type": "객관식",
+            "question": "다음 중 옳은 것은?",
+            "options": {"A": "보기1", "B": "보기2", "C": "보기3", "D": "보기4"},
+            "correct_answer": "A",
+            "explanation": "벤치마크용 고정 해설",
+            "tags": ["벤치마크"]
+        }, ensure_ascii=False)
+    return "{}"
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        super().__init__(address, FakeLLMHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    @property
+    def api_base(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start_background(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: dict):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._send(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with server.lock:
+            delay = max(0.0, server.latency + server.random.uniform(-server.jitter, server.jitter))
+            fail = server.random.random() < server.error_rate
+        time.sleep(delay)
+        if fail:
+            with server.lock:
+                server.stats["errors"] += 1
+            return self._send(500, {"error": {"message": "fake server error", "type": "server_error"}})
+
+        prompt = "\n".join(m.get("content") or "" for m in request.get("messages", []))
+        content = canned_content(prompt)
+        usage = {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(content)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        with server.lock:
+            server.stats["requests"] += 1
+            server.stats["prompt_tokens"] += usage["prompt_tokens"]
+            server.stats["completion_tokens"] += usage["completion_tokens"]
+        self._send(200, {
+            "id": f"chatcmpl-fake-{server.stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="평균 응답 지연(초)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="지연 흔들림 폭(초, ±)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 오류를 돌려줄 비율 (0~1)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    server = FakeLLMServer((args.host, args.port), args.latency, args.jitter, args.error_rate, args.seed)
+    print(f"fake LLM server: {server.api_base}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
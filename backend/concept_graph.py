@@ -0,0 +1,328 @@
+# concept_graph.py
+# 강의자료 간 개념 그래프
+# - /analyze-pdf 결과(개념맵)를 keywords.keyword_id 기준 노드(material_concepts)와 관계 엣지(concept_edges)로 저장
+#   강의자료 단위로 교체 저장하므로 새 자료를 분석할 때마다 전체 그래프에 점진적으로 병합됨
+# - 전체 엣지를 CSR(압축 희소 행) 인접 배열로 메모리에 올려 이웃/k-hop/최단경로/강의자료별 부분그래프를 LLM 호출 없이 조회
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import delete, insert, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import get_db
+from models import ConceptEdge, Keyword, MaterialConcept
+
+router = APIRouter()
+
+# 다른 워커 프로세스가 저장한 그래프 변경을 반영하기 위해 인덱스를 다시 읽는 주기(초)
+CONCEPT_GRAPH_REFRESH_SECONDS = int(os.getenv("CONCEPT_GRAPH_REFRESH_SECONDS", "60"))
+MAX_KEYWORD_LENGTH = 255
+NON_RELATIONS = {"main2subtopic", "subtopic2keyword", "관련없음"}
+
+
+def _csr(rows: np.ndarray, cols: np.ndarray, n: int):
+    """(rows[i] → cols[i]) 엣지 목록을 CSR로: indptr[v]:indptr[v+1] 구간이 v의 이웃, edge_ids는 원래 엣지 번호"""
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return indptr, cols[order], order
+
+
+def _expand(indptr: np.ndarray, indices: np.ndarray, frontier: np.ndarray):
+    """frontier 노드들의 이웃을 한 번에 모음 → (이웃 배열, 각 이웃의 출발 노드, CSR 내 위치)"""
+    starts = indptr[frontier]
+    counts = indptr[frontier + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    positions = np.arange(total) + np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return indices[positions], np.repeat(frontier, counts), positions
+
+
+class ConceptGraphIndex:
+    """DB의 개념 그래프를 메모리에 올린 읽기 전용 인덱스 (노드 번호는 keyword_id 오름차순 0..n-1)"""
+
+    def __init__(self, keyword_ids, names, src_ids, dst_ids, relations, weights, material_rows):
+        self.keyword_ids = np.asarray(keyword_ids, dtype=np.int64)
+        self.names = list(names)
+        n = len(self.keyword_ids)
+        self.relation_names = sorted(set(relations))
+        relation_code = {r: i for i, r in enumerate(self.relation_names)}
+        self.src = self._nodes(src_ids)
+        self.dst = self._nodes(dst_ids)
+        self.relations = np.asarray([relation_code[r] for r in relations], dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.int32)  # 같은 관계를 추출한 강의자료 수
+        self.out_indptr, self.out_indices, self.out_edges = _csr(self.src, self.dst, n)
+        self.in_indptr, self.in_indices, self.in_edges = _csr(self.dst, self.src, n)
+        # 강의자료별 노드 (material_id → [(노드 번호, 소주제, 중요도, tfidf)])
+        self.materials: Dict[int, list] = {}
+        for material_id, keyword_id, subtopic, importance, tfidf in material_rows:
+            self.materials.setdefault(material_id, []).append(
+                (int(self._nodes([keyword_id])[0]), subtopic, importance, tfidf)
+            )
+        self.loaded_at = time.time()
+
+    @classmethod
+    def load(cls, db: Session) -> "ConceptGraphIndex":
+        nodes = db.execute(text(
+            "SELECT k.keyword_id, k.keyword_name FROM keywords k "
+            "WHERE k.keyword_id IN (SELECT keyword_id FROM material_concepts) ORDER BY k.keyword_id"
+        )).fetchall()
+        edges = db.execute(text(
+            "SELECT source_keyword_id, target_keyword_id, relation_type, COUNT(*) FROM concept_edges "
+            "GROUP BY source_keyword_id, target_keyword_id, relation_type"
+        )).fetchall()
+        materials = db.execute(text(
+            "SELECT material_id, keyword_id, subtopic, importance, tfidf FROM material_concepts"
+        )).fetchall()
+        return cls(
+            [r[0] for r in nodes], [r[1] for r in nodes],
+            [r[0] for r in edges], [r[1] for r in edges], [r[2] for r in edges], [r[3] for r in edges],
+            materials
+        )
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.keyword_ids)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.src)
+
+    def _nodes(self, keyword_ids) -> np.ndarray:
+        return np.searchsorted(self.keyword_ids, np.asarray(keyword_ids, dtype=np.int64))
+
+    def node(self, keyword_id: int) -> int:
+        i = int(np.searchsorted(self.keyword_ids, keyword_id))
+        if i >= self.n_nodes or self.keyword_ids[i] != keyword_id:
+            raise KeyError(keyword_id)
+        return i
+
+    def _node_dict(self, i: int, **extra) -> dict:
+        return {"keyword_id": int(self.keyword_ids[i]), "keyword_name": self.names[i], **extra}
+
+    def _edge_dict(self, e: int) -> dict:
+        return {
+            "source": int(self.keyword_ids[self.src[e]]),
+            "target": int(self.keyword_ids[self.dst[e]]),
+            "relation": self.relation_names[self.relations[e]],
+            "weight": int(self.weights[e])
+        }
+
+    def neighbors(self, keyword_id: int, direction: str = "both", relation: Optional[str] = None) -> List[dict]:
+        i = self.node(keyword_id)
+        found = []
+        if direction in ("out", "both"):
+            lo, hi = self.out_indptr[i], self.out_indptr[i + 1]
+            found += [(int(self.out_indices[p]), int(self.out_edges[p]), "out") for p in range(lo, hi)]
+        if direction in ("in", "both"):
+            lo, hi = self.in_indptr[i], self.in_indptr[i + 1]
+            found += [(int(self.in_indices[p]), int(self.in_edges[p]), "in") for p in range(lo, hi)]
+        result = [
+            self._node_dict(j, relation=self.relation_names[self.relations[e]], direction=d, weight=int(self.weights[e]))
+            for j, e, d in found
+            if relation is None or self.relation_names[self.relations[e]] == relation
+        ]
+        return sorted(result, key=lambda x: -x["weight"])
+
+    def _bfs(self, start: int, max_hops: int, stop: Optional[int] = None):
+        """방향 무시 BFS. (거리 배열(-1 = 미방문), 부모 노드 배열, 부모에서 온 엣지 번호 배열)"""
+        dist = np.full(self.n_nodes, -1, dtype=np.int32)
+        parent = np.full(self.n_nodes, -1, dtype=np.int64)
+        via = np.full(self.n_nodes, -1, dtype=np.int64)
+        dist[start] = 0
+        frontier = np.asarray([start], dtype=np.int64)
+        for hop in range(1, max_hops + 1):
+            out_nb, out_from, out_pos = _expand(self.out_indptr, self.out_indices, frontier)
+            in_nb, in_from, in_pos = _expand(self.in_indptr, self.in_indices, frontier)
+            nb = np.concatenate([out_nb, in_nb])
+            came_from = np.concatenate([out_from, in_from])
+            edge = np.concatenate([self.out_edges[out_pos], self.in_edges[in_pos]])
+            new = dist[nb] < 0
+            nb, first = np.unique(nb[new], return_index=True)
+            if len(nb) == 0:
+                break
+            dist[nb] = hop
+            parent[nb] = came_from[new][first]
+            via[nb] = edge[new][first]
+            if stop is not None and dist[stop] >= 0:
+                break
+            frontier = nb
+        return dist, parent, via
+
+    def k_hop(self, keyword_id: int, k: int, limit: int) -> dict:
+        start = self.node(keyword_id)
+        dist, _, _ = self._bfs(start, k)
+        reached = np.flatnonzero(dist >= 0)
+        reached = reached[np.argsort(dist[reached], kind="stable")][:limit]
+        return self._subgraph(reached, {int(i): int(dist[i]) for i in reached})
+
+    def shortest_path(self, source_id: int, target_id: int, max_hops: int) -> Optional[dict]:
+        source, target = self.node(source_id), self.node(target_id)
+        dist, parent, via = self._bfs(source, max_hops, stop=target)
+        if dist[target] < 0:
+            return None
+        path, edges = [target], []
+        while path[-1] != source:
+            edges.append(self._edge_dict(int(via[path[-1]])))
+            path.append(int(parent[path[-1]]))
+        path.reverse()
+        edges.reverse()
+        return {"hops": int(dist[target]), "nodes": [self._node_dict(i) for i in path], "edges": edges}
+
+    def material_subgraph(self, material_id: int) -> Optional[dict]:
+        rows = self.materials.get(material_id)
+        if rows is None:
+            return None
+        attrs = {i: {"subtopic": s, "importance": imp, "tfidf": tfidf} for i, s, imp, tfidf in rows}
+        return self._subgraph(np.asarray(sorted(attrs), dtype=np.int64), attrs)
+
+    def _subgraph(self, node_ids: np.ndarray, extra: dict) -> dict:
+        # 선택한 노드끼리의 엣지 (다른 강의자료에서 나온 관계도 포함 → weight로 구분)
+        member = np.zeros(self.n_nodes, dtype=bool)
+        member[node_ids] = True
+        edge_ids = np.flatnonzero(member[self.src] & member[self.dst])
+        nodes = []
+        for i in node_ids:
+            info = extra.get(int(i))
+            nodes.append(self._node_dict(int(i), **(info if isinstance(info, dict) else {"hops": info})))
+        return {"nodes": nodes, "edges": [self._edge_dict(int(e)) for e in edge_ids]}
+
+
+_index: Optional[ConceptGraphIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index(db: Session) -> ConceptGraphIndex:
+    global _index
+    with _index_lock:
+        if _index is None or time.time() - _index.loaded_at > CONCEPT_GRAPH_REFRESH_SECONDS:
+            _index = ConceptGraphIndex.load(db)
+        return _index
+
+
+def invalidate_index():
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def resolve_keyword_ids(db: Session, names: List[str]) -> Dict[str, int]:
+    """개념어 이름 → keyword_id (없는 이름은 한 번에 추가). 대소문자는 DB 콜레이션처럼 구분하지 않음"""
+    def lookup():
+        rows = db.query(Keyword.keyword_name, Keyword.keyword_id).filter(Keyword.keyword_name.in_(names)).all()
+        return {name.lower(): keyword_id for name, keyword_id in rows}
+
+    found = lookup()
+    missing = list({n.lower(): n for n in names if n.lower() not in found}.values())
+    if missing:
+        try:
+            db.execute(insert(Keyword), [{"keyword_name": n} for n in missing])
+            db.commit()
+        except IntegrityError:
+            # 다른 요청이 같은 개념어를 먼저 추가한 경우 → 하나씩 추가하고 중복은 무시
+            db.rollback()
+            for n in missing:
+                try:
+                    with db.begin_nested():
+                        db.add(Keyword(keyword_name=n))
+                except IntegrityError:
+                    pass
+            db.commit()
+        found = lookup()
+    return {n: found[n.lower()] for n in names if n.lower() in found}
+
+
+def save_material_graph(db: Session, material_id: int, result: dict) -> dict:
+    """분석 결과(nodes/edges)를 강의자료 단위로 저장. 같은 자료를 다시 분석하면 그 자료의 노드/엣지만 교체"""
+    keywords = {n["id"]: n for n in result.get("nodes", [])
+                if n.get("group") == 3 and 0 < len(n["id"]) <= MAX_KEYWORD_LENGTH}
+    subtopic_names = {n["id"]: n.get("description") or n["id"] for n in result.get("nodes", []) if n.get("group") == 2}
+    subtopic_of, relations = {}, set()
+    for e in result.get("edges", []):
+        if e.get("type") == "subtopic2keyword":
+            subtopic_of.setdefault(e["target"], subtopic_names.get(e["source"], e["source"]))
+        elif e.get("type") not in NON_RELATIONS and e["source"] in keywords and e["target"] in keywords \
+                and e["source"] != e["target"]:
+            relations.add((e["source"], e["target"], e["type"][:50]))
+
+    ids = resolve_keyword_ids(db, list(keywords))
+    concept_rows = {}
+    for name, node in keywords.items():
+        if name in ids:
+            concept_rows.setdefault(ids[name], {
+                "material_id": material_id,
+                "keyword_id": ids[name],
+                "subtopic": (subtopic_of.get(name) or "")[:255] or None,
+                "importance": node.get("importance"),
+                "tfidf": node.get("tfidf"),
+                "description": node.get("description")
+            })
+    edge_rows = {
+        (ids[a], ids[b], rel): {"material_id": material_id, "source_keyword_id": ids[a],
+                                "target_keyword_id": ids[b], "relation_type": rel}
+        for a, b, rel in relations if a in ids and b in ids and ids[a] != ids[b]
+    }
+    db.execute(delete(ConceptEdge).where(ConceptEdge.material_id == material_id))
+    db.execute(delete(MaterialConcept).where(MaterialConcept.material_id == material_id))
+    if concept_rows:
+        db.execute(insert(MaterialConcept), list(concept_rows.values()))
+    if edge_rows:
+        db.execute(insert(ConceptEdge), list(edge_rows.values()))
+    db.commit()
+    invalidate_index()
+    return {"material_id": material_id, "concepts": len(concept_rows), "relations": len(edge_rows)}
+
+
+def _graph_or_404(db: Session, keyword_ids) -> ConceptGraphIndex:
+    index = get_index(db)
+    for keyword_id in keyword_ids:
+        try:
+            index.node(keyword_id)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"개념 그래프에 없는 개념어입니다: {keyword_id}")
+    return index
+
+
+@router.get("/concept-graph/stats")
+def concept_graph_stats(db: Session = Depends(get_db)):
+    index = get_index(db)
+    return {"nodes": index.n_nodes, "edges": index.n_edges, "materials": len(index.materials),
+            "relations": index.relation_names, "loaded_at": index.loaded_at}
+
+
+@router.get("/concept-graph/keywords/{keyword_id}/neighbors")
+def concept_neighbors(keyword_id: int, direction: str = Query("both", pattern="^(in|out|both)$"),
+                      relation: Optional[str] = None, db: Session = Depends(get_db)):
+    index = _graph_or_404(db, [keyword_id])
+    return {"keyword_id": keyword_id, "neighbors": index.neighbors(keyword_id, direction, relation)}
+
+
+@router.get("/concept-graph/keywords/{keyword_id}/k-hop")
+def concept_k_hop(keyword_id: int, k: int = Query(2, ge=1, le=6), limit: int = Query(200, ge=1, le=2000),
+                  db: Session = Depends(get_db)):
+    index = _graph_or_404(db, [keyword_id])
+    return index.k_hop(keyword_id, k, limit)
+
+
+@router.get("/concept-graph/path")
+def concept_path(source: int, target: int, max_hops: int = Query(6, ge=1, le=12), db: Session = Depends(get_db)):
+    index = _graph_or_404(db, [source, target])
+    path = index.shortest_path(source, target, max_hops)
+    if path is None:
+        raise HTTPException(status_code=404, detail="두 개념어를 잇는 경로가 없습니다.")
+    return path
+
+
+@router.get("/concept-graph/materials/{material_id}")
+def concept_material_subgraph(material_id: int, db: Session = Depends(get_db)):
+    subgraph = get_index(db).material_subgraph(material_id)
+    if subgraph is None:
+        raise HTTPException(status_code=404, detail="개념 그래프가 저장되지 않은 강의자료입니다.")
+    return {"material_id": material_id, **subgraph}
@@ -0,0 +1,116 @@
+# disk_cache.py
+# SQLite 기반 영구 캐시 (같은 호스트의 uvicorn 워커들이 파일 하나를 공유)
+# - 크기 제한(max_bytes)을 넘으면 가장 오래 사용되지 않은 항목부터 삭제(LRU)
+# - 항목별 TTL(초)을 지정하면 만료된 항목은 미스로 처리하고 삭제
+# - 적중/미스 횟수도 DB에 기록해서 워커 간에 합산됨
+import os
+import sqlite3
+import threading
+import time
+
+import metrics
+
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+
+
+class DiskCache:
+    def __init__(self, name: str, max_bytes: int):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        self.name = name
+        self.path = os.path.join(CACHE_DIR, f"{name}.sqlite3")
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL,
+                    expires_at REAL
+                )
+            """)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(entries)")]
+            if "expires_at" not in columns:
+                conn.execute("ALTER TABLE entries ADD COLUMN expires_at REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 연결은 스레드 간 공유하지 않음 → 스레드마다 하나씩
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def incr(self, name: str, amount: int = 1):
+        """hits/misses 외의 사용자 정의 카운터 증가 (stats()에 함께 표시됨)"""
+        with self._conn() as conn:
+            self._incr(conn, name, amount)
+
+    def _incr(self, conn, name: str, amount: int = 1):
+        conn.execute(
+            "INSERT INTO stats (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+
+    def get(self, key: str):
+        """저장된 값(bytes)을 반환, 없으면 None"""
+        with self._conn() as conn:
+            now = time.time()
+            row = conn.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] is not None and row[1] <= now:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._incr(conn, "expired")
+                row = None
+            if row is None:
+                self._incr(conn, "misses")
+                metrics.record_cache_lookup(self.name, hit=False)
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._incr(conn, "hits")
+        metrics.record_cache_lookup(self.name, hit=True)
+        return row[0]
+
+    def set(self, key: str, value: bytes, ttl: float = None):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now + ttl if ttl else None)
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        # 만료된 항목을 먼저 정리하고, 그래도 크기를 넘으면 LRU 순서로 삭제
+        conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        self._incr(conn, "evictions", evicted)
+
+    def stats(self) -> dict:
+        with self._conn() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            **counters,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0
+        }
@@ -1,54 +1,67 @@
 # -*- coding: utf-8 -*-
 from fastapi import APIRouter, HTTPException, Depends, Query, Body
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from auth import get_current_user
-from database import get_db
-from schemas import QuizGenerationRequest, QuizOptions, QuizGenerationResponse, RegisterQuestionRequest
-from models import Question, QuestionAttempt, Keyword, WeakKeywordLog
+from database import SessionLocal, get_db
+from schemas import QuizGenerationRequest, QuizOptions, QuizGenerationResponse, RegisterQuestionRequest, GenerateBatchRequest
+from models import Question, QuestionAttempt, QuestionKeyword, Keyword, WeakKeywordLog, Slide
 import openai, json, re
-from typing import List, Optional
-from sqlalchemy import text
+from typing import Callable, Iterator, List, Optional
+from sqlalchemy import insert, text
 import random
 import os
+import time
+from llm_client import chat_completion, stream_chat_completion, response_text, cache_stats
+import metrics
+from question_listing import QuestionFilter, list_questions
+import keyword_stats
+import write_behind
+import question_pool
+import question_dedup
+from quiz_stream import sse, stream_fields
 
 router = APIRouter()
 
-# ✅ 문제 생성 및 저장 API (Swagger에서 자물쇠 나오게 수정)
-@router.post("/quiz/generate")
-def generate_quiz(
-    slide_id: int = Body(...),
-    keyword_id: int = Body(...),
-    slide_title: str = Body(...),
-    concept_explanation: str = Body(...),
-    image_description: str = Body(None),
-    keywords: list = Body(...),
-    important_sentences: list = Body(...),
-    slide_summary: str = Body(...),
-    db: Session = Depends(get_db)
-):
-    # 난이도 기준 정의
-    difficulty_levels = [
-        {
-            "level": "하",
-            "concept": "기억(Remember), 이해(Understand)",
-            "prior_knowledge": "기본 용어만 알면 풀 수 있음",
-            "reasoning": "단순 fact-check, 암기형"
-        },
-        {
-            "level": "중",
-            "concept": "적용(Apply), 분석(Analyze)",
-            "prior_knowledge": "전공/수업 개념 필요",
-            "reasoning": "정보 연결, 간단한 추론"
-        },
-        {
-            "level": "상",
-            "concept": "평가(Evaluate), 창작(Create)",
-            "prior_knowledge": "여러 단원/심화 전공지식 필요",
-            "reasoning": "복합적 추론, 종합, 창의적 문제 해결"
-        }
-    ]
-    selected = random.choice(difficulty_levels)
-    difficulty = selected["level"]
+# 같은 슬라이드/키워드로 같은 프롬프트가 다시 만들어졌을 때 GPT 응답을 재사용하는 기간(초)
+QUIZ_LLM_CACHE_TTL = int(os.getenv("QUIZ_LLM_CACHE_TTL", "600"))
+
+def parse_quiz_json(content: str) -> dict:
+    # ```json ... ``` 코드블록 감싸기 제거 후 파싱
+    content = re.sub(r"^```(?:json)?\s*|\s*```$", "", content.strip(), flags=re.MULTILINE)
+    return json.loads(content)
+
+# 난이도 기준 정의
+DIFFICULTY_LEVELS = [
+    {
+        "level": "하",
+        "concept": "기억(Remember), 이해(Understand)",
+        "prior_knowledge": "기본 용어만 알면 풀 수 있음",
+        "reasoning": "단순 fact-check, 암기형"
+    },
+    {
+        "level": "중",
+        "concept": "적용(Apply), 분석(Analyze)",
+        "prior_knowledge": "전공/수업 개념 필요",
+        "reasoning": "정보 연결, 간단한 추론"
+    },
+    {
+        "level": "상",
+        "concept": "평가(Evaluate), 창작(Create)",
+        "prior_knowledge": "여러 단원/심화 전공지식 필요",
+        "reasoning": "복합적 추론, 종합, 창의적 문제 해결"
+    }
+]
+
+
+def build_quiz_prompt(context: dict, difficulty: str) -> str:
+    selected = next(level for level in DIFFICULTY_LEVELS if level["level"] == difficulty)
+    slide_title = context["slide_title"]
+    concept_explanation = context["concept_explanation"]
+    image_description = context.get("image_description")
+    keywords = context["keywords"]
+    important_sentences = context["important_sentences"]
+    slide_summary = context["slide_summary"]
 
     prompt = f"""
 [슬라이드 제목]
@@ -75,27 +88,23 @@ def generate_quiz(
 - 정보 탐색 난이도: {selected['reasoning']}
 
 위 기준에 맞춰 대학생 수준의 기출 문제를 생성해줘. 문제 유형은 객관식, 주관식, 참/거짓, 빈칸 채우기 중 하나를 선택해서 아래 JSON 형식으로 정확히 출력해줘:\n\n예시 (객관식):\n{{\n  "type": "객관식",\n  "question": "...",\n  "options": {{ "A": "...", "B": "...", "C": "...", "D": "..." }},\n  "correct_answer": "A",\n  "explanation": "...",\n  "tags": ["..."]\n}}\n"""
-    try:
-        openai.api_key = os.getenv("OPENAI_API_KEY")
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "너는 대학 강의 기반 문제 생성 AI야."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7
-        )
-        content = response.choices[0].message['content']
-        content = re.sub(r"^```json\\s*|\\s*```$", "", content.strip(), flags=re.MULTILINE)
-        parsed = json.loads(content)
-        # 난이도 정보도 함께 반환
-        parsed["difficulty"] = difficulty
+    return prompt
 
-        # 주관식 문제의 경우 correct_answer가 없을 수 있으므로 처리
-        if parsed.get("type") == "주관식" and not parsed.get("correct_answer"):
-            parsed["correct_answer"] = "정답 없음"  # 임시 정답 설정
 
-        # DB에 저장 (slide_id, keyword_id 명시적으로 저장)
+def save_generated_question(db: Session, slide_id: int, keyword_id: int, parsed: dict, difficulty: str) -> dict:
+    """파싱한 GPT 응답을 questions(+ question_keywords)에 저장하고 question_id/difficulty를 채워서 반환"""
+    # 난이도 정보도 함께 반환
+    parsed["difficulty"] = difficulty
+
+    # 주관식 문제의 경우 correct_answer가 없을 수 있으므로 처리
+    if parsed.get("type") == "주관식" and not parsed.get("correct_answer"):
+        parsed["correct_answer"] = "정답 없음"  # 임시 정답 설정
+
+    # 기존 문제와 거의 같으면 저장하지 않음 (DuplicateQuestion → 호출한 쪽에서 다시 생성하거나 기존 문제 재사용)
+    question_dedup.check_duplicate(db, parsed.get("question"))
+
+    # DB에 저장 (slide_id, keyword_id 명시적으로 저장)
+    with metrics.span("quiz", "save"):
         question = Question(
             slide_id=slide_id,
             question_type=parsed.get("type"),
@@ -116,48 +125,386 @@ def generate_quiz(
                 {"qid": question.question_id, "kid": keyword_id}
             )
             db.commit()
+    question_dedup.index_question(question.question_id, question.content)
+
+    return parsed
+
+
+def reusable_duplicate(db: Session, question_id: int, difficulty: str, user_id: Optional[int]) -> Optional[dict]:
+    """중복으로 걸린 기존 문제를 대신 내줘도 되면 그 문제(reused), 난이도가 다르거나 사용자가 이미 본 문제면 None"""
+    parsed = question_pool.load_question(db, question_id)
+    if parsed["difficulty"] != difficulty:
+        return None
+    if user_id is not None and not QUESTION_POOL.is_unseen(db, user_id, question_id):
+        return None
+    return parsed
+
+
+def generate_question(db: Session, slide_id: int, keyword_id: int, context: dict, difficulty: str,
+                      fresh: bool = False, user_id: Optional[int] = None) -> dict:
+    """
+    슬라이드 내용으로 GPT 문제 하나 생성 후 저장 (/quiz/generate와 문제 풀 채우기에서 공용)
+    생성한 문제가 기존 문제와 중복이면: 그 문제가 같은 난이도이고 user_id가 아직 안 본 문제면 바로 재사용,
+    아니면 캐시를 건너뛰고 다시 생성. 끝까지 재사용할 수 없는 중복만 나오면 DuplicateQuestion (중복은 저장하지 않음)
+    """
+    prompt = build_quiz_prompt(context, difficulty)
+    openai.api_key = os.getenv("OPENAI_API_KEY")
+    for attempt in range(question_dedup.QUESTION_DEDUP_RETRIES + 1):
+        with metrics.span("quiz", "llm"):
+            response = chat_completion(
+                model="gpt-4",
+                messages=[
+                    {"role": "system", "content": "너는 대학 강의 기반 문제 생성 AI야."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.7,
+                cache_ttl=QUIZ_LLM_CACHE_TTL,
+                bypass_cache=fresh or attempt > 0,  # 중복이면 캐시된 같은 응답 대신 새로 생성
+                validate=parse_quiz_json
+            )
+        parsed = parse_quiz_json(response_text(response))
+        try:
+            return save_generated_question(db, slide_id, keyword_id, parsed, difficulty)
+        except question_dedup.DuplicateQuestion as e:
+            duplicate = e
+            reusable = reusable_duplicate(db, e.question_id, difficulty, user_id)
+            if reusable is not None:
+                return reusable
+    raise duplicate
+
+
+# 한 번의 GPT 호출로 만들 최대 문제 수 (응답 길이 제한)
+QUIZ_BATCH_MAX_QUESTIONS = int(os.getenv("QUIZ_BATCH_MAX_QUESTIONS", "20"))
+
+# GPT가 내는 문제 유형 표기 → questions.question_type 값
+QUESTION_TYPES = {
+    "객관식": "객관식", "주관식": "주관식",
+    "참/거짓": "참거짓", "참거짓": "참거짓",
+    "빈칸 채우기": "빈칸채우기", "빈칸채우기": "빈칸채우기"
+}
+
+
+def parse_batch_json(content: str) -> list:
+    # [...] 또는 {"questions": [...]} 형식 모두 허용
+    parsed = parse_quiz_json(content)
+    if isinstance(parsed, dict) and isinstance(parsed.get("questions"), list):
+        parsed = parsed["questions"]
+    if not isinstance(parsed, list):
+        raise ValueError("문제 배열이 아닙니다.")
+    return parsed
 
+
+def validate_batch_item(item, count: int) -> Optional[dict]:
+    """배열 원소 하나 검사 → 저장할 수 있으면 정리한 dict, 아니면 None (해당 문제만 버림)"""
+    if not isinstance(item, dict):
+        return None
+    index = item.get("index")
+    if not isinstance(index, int) or not 1 <= index <= count:
+        return None
+    if item.get("type") not in QUESTION_TYPES:
+        return None
+    if not isinstance(item.get("question"), str) or not item["question"].strip():
+        return None
+    answer = item.get("correct_answer")
+    if item["type"] == "주관식" and not answer:
+        answer = "정답 없음"
+    if not isinstance(answer, str) or not answer.strip():
+        return None
+    options = item.get("options")
+    if item["type"] == "객관식" and (not isinstance(options, dict) or answer not in options):
+        return None
+    explanation = item.get("explanation")
+    tags = item.get("tags")
+    return {
+        "index": index,
+        "type": item["type"],
+        "question": item["question"],
+        "options": options if isinstance(options, dict) else None,
+        "correct_answer": answer,
+        "explanation": explanation if isinstance(explanation, str) else None,
+        "tags": [t for t in tags if isinstance(t, str)] if isinstance(tags, list) else []
+    }
+
+
+def build_batch_prompt(specs: List[dict], slides: dict, keyword_names: dict) -> str:
+    slide_blocks = []
+    for slide_id in dict.fromkeys(spec["slide_id"] for spec in specs):
+        slide = slides[slide_id]
+        slide_blocks.append(f"""[슬라이드 S{slide_id}]
+- 제목: {slide.slide_title or ''}
+- 개념 설명: {slide.concept_explanation or ''}
+- 주요 키워드: {slide.main_keywords or ''}
+- 중요 문장: {' / '.join(s for s in (slide.important_sentences or '').split(chr(10)) if s.strip())}
+- 요약: {slide.summary or ''}""")
+    levels = {level["level"]: level for level in DIFFICULTY_LEVELS}
+    question_lines = []
+    for i, spec in enumerate(specs, start=1):
+        level = levels[spec["difficulty"]]
+        keyword = keyword_names.get(spec["keyword_id"]) or "자유"
+        question_lines.append(
+            f"{i}. 슬라이드 S{spec['slide_id']}, 키워드: {keyword}, 난이도: {spec['difficulty']} "
+            f"({level['concept']} / {level['prior_knowledge']} / {level['reasoning']})"
+        )
+    return f"""
+{chr(10).join(slide_blocks)}
+
+[만들 문제 목록]
+{chr(10).join(question_lines)}
+
+위 목록의 번호마다 해당 슬라이드 내용으로 대학생 수준의 기출 문제를 하나씩 생성해줘. 같은 슬라이드/키워드라도 서로 다른 내용의 문제여야 해.
+문제 유형은 객관식, 주관식, 참/거짓, 빈칸 채우기 중 하나를 선택하고, "index"에 목록 번호를 넣어서 아래 형식의 JSON 배열만 정확히 출력해줘:
+
+[
+  {{
+    "index": 1,
+    "type": "객관식",
+    "question": "...",
+    "options": {{ "A": "...", "B": "...", "C": "...", "D": "..." }},
+    "correct_answer": "A",
+    "explanation": "...",
+    "tags": ["..."]
+  }}
+]
+"""
+
+
+def generate_questions_batch(db: Session, specs: List[dict], fresh: bool = False):
+    """
+    specs: [{"slide_id", "keyword_id", "difficulty"}] → 한 번의 GPT 호출로 생성, 유효한 문제만 한 트랜잭션으로 저장
+    반환: (저장한 문제 목록(question_id 포함), 버린 문제 수)
+    """
+    slide_ids = {spec["slide_id"] for spec in specs}
+    slides = {s.slide_id: s for s in db.query(Slide).filter(Slide.slide_id.in_(slide_ids))}
+    missing = sorted(slide_ids - slides.keys())
+    if missing:
+        raise HTTPException(status_code=404, detail=f"슬라이드를 찾을 수 없습니다: {missing}")
+    keyword_ids = {spec["keyword_id"] for spec in specs if spec["keyword_id"]}
+    keyword_names = dict(db.query(Keyword.keyword_id, Keyword.keyword_name)
+                         .filter(Keyword.keyword_id.in_(keyword_ids)).all()) if keyword_ids else {}
+
+    openai.api_key = os.getenv("OPENAI_API_KEY")
+    with metrics.span("quiz_batch", "llm"):
+        response = chat_completion(
+            model="gpt-4",
+            messages=[
+                {"role": "system", "content": "너는 대학 강의 기반 문제 생성 AI야."},
+                {"role": "user", "content": build_batch_prompt(specs, slides, keyword_names)}
+            ],
+            temperature=0.7,
+            cache_ttl=QUIZ_LLM_CACHE_TTL,
+            bypass_cache=fresh,
+            validate=parse_batch_json
+        )
+    items = parse_batch_json(response_text(response))
+
+    # 원소별 검사: 형식이 틀린 문제, 같은 번호의 중복 응답, 기존 문제(또는 같은 묶음의 앞 문제)와 거의 같은 문제만 버리고 나머지는 저장
+    valid, signatures, duplicates = {}, [], 0
+    for item in items:
+        checked = validate_batch_item(item, len(specs))
+        if checked is None or checked["index"] in valid:
+            continue
+        if question_dedup.QUESTION_DEDUP_ENABLED:
+            sig = question_dedup.signature(checked["question"])
+            try:
+                question_dedup.check_duplicate(db, checked["question"])
+            except question_dedup.DuplicateQuestion:
+                duplicates += 1
+                continue
+            if any(question_dedup.similarity(sig, other) >= question_dedup.QUESTION_DEDUP_THRESHOLD
+                   for other in signatures):
+                duplicates += 1
+                continue
+            signatures.append(sig)
+        valid[checked["index"]] = checked
+    dropped = len(specs) - len(valid)
+    if dropped:
+        print(f"일괄 문제 생성: {len(specs)}개 중 {dropped}개 제외 (중복 {duplicates}개, 나머지는 형식 오류/누락)")
+
+    with metrics.span("quiz_batch", "save"):
+        rows = []
+        for index, parsed in sorted(valid.items()):
+            spec = specs[index - 1]
+            rows.append((spec, parsed, Question(
+                slide_id=spec["slide_id"],
+                question_type=QUESTION_TYPES[parsed["type"]],
+                content=parsed["question"],
+                answer=parsed["correct_answer"],
+                explanation=parsed["explanation"],
+                difficulty=spec["difficulty"]
+            )))
+        db.add_all([question for _, _, question in rows])
+        db.flush()  # question_id 발급 (커밋은 키워드 연결까지 한 번)
+        links = [
+            {"question_id": question.question_id, "keyword_id": spec["keyword_id"]}
+            for spec, _, question in rows if spec["keyword_id"]
+        ]
+        if links:
+            db.execute(insert(QuestionKeyword), links)
+        db.commit()
+    for _, _, question in rows:
+        question_dedup.index_question(question.question_id, question.content)
+
+    saved = []
+    for spec, parsed, question in rows:
+        parsed.pop("index")
+        parsed.update(question_id=question.question_id, slide_id=spec["slide_id"],
+                      keyword_id=spec["keyword_id"], difficulty=spec["difficulty"])
+        saved.append(parsed)
+    return saved, dropped
+
+
+def reuse_before_generate(db: Session, user_id: Optional[int], keyword_ids: List[int], difficulty: str,
+                          slide_id: Optional[int] = None, fresh: bool = False, pipeline: str = "quiz") -> Optional[dict]:
+    """LLM 호출 전: 키워드(와 슬라이드)/난이도가 같은 저장된 문제 중 이 사용자가 안 본 문제가 있으면 재사용"""
+    keyword_ids = [kid for kid in keyword_ids if kid]
+    if user_id is None or not keyword_ids or fresh or not question_dedup.QUESTION_DEDUP_ENABLED:
+        return None
+    with metrics.span(pipeline, "reuse"):
+        return QUESTION_POOL.reuse_existing(db, user_id, keyword_ids, difficulty, slide_id=slide_id)
+
+
+def duplicate_error(e: question_dedup.DuplicateQuestion) -> HTTPException:
+    return HTTPException(status_code=409, detail=f"기존 문제와 중복된 문제만 생성되었습니다. 다시 시도해 주세요. ({e})")
+
+
+# ✅ 문제 생성 및 저장 API (Swagger에서 자물쇠 나오게 수정)
+@router.post("/quiz/generate")
+def generate_quiz(
+    slide_id: int = Body(...),
+    keyword_id: int = Body(...),
+    slide_title: str = Body(...),
+    concept_explanation: str = Body(...),
+    image_description: str = Body(None),
+    keywords: list = Body(...),
+    important_sentences: list = Body(...),
+    slide_summary: str = Body(...),
+    fresh: bool = Body(False),  # True면 캐시를 무시하고 항상 새 문제 생성
+    user_id: Optional[int] = Body(None),  # 있으면 미리 만들어 둔 문제 풀에서 이 사용자가 안 본 문제를 먼저 제공
+    difficulty: Optional[str] = Body(None),  # 하/중/상, 없으면 무작위
+    db: Session = Depends(get_db)
+):
+    if difficulty is None:
+        difficulty = random.choice(DIFFICULTY_LEVELS)["level"]
+    elif difficulty not in question_pool.DIFFICULTIES:
+        raise HTTPException(status_code=400, detail="difficulty는 하, 중, 상 중 하나여야 합니다.")
+
+    pooled = question_pool.QUESTION_POOL_ENABLED and user_id is not None and bool(keyword_id) and not fresh
+    if pooled:
+        with metrics.span("quiz", "pool"):
+            served = QUESTION_POOL.take(db, user_id, slide_id, keyword_id, difficulty)
+        if served is not None:
+            return served
+    served = reuse_before_generate(db, user_id, [keyword_id], difficulty, slide_id=slide_id, fresh=fresh)
+    if served is not None:
+        return served
+
+    context = {
+        "slide_title": slide_title,
+        "concept_explanation": concept_explanation,
+        "image_description": image_description,
+        "keywords": keywords,
+        "important_sentences": important_sentences,
+        "slide_summary": slide_summary
+    }
+    try:
+        # 풀이 바닥난 사용자에게 캐시된 같은 문제가 다시 나가지 않도록 풀 사용 시에는 새로 생성
+        parsed = generate_question(db, slide_id, keyword_id, context, difficulty, fresh=fresh or pooled,
+                                   user_id=user_id)
+        if user_id is not None and parsed.get("reused"):
+            QUESTION_POOL.mark_seen(db, user_id, parsed["question_id"])
+        elif pooled:
+            QUESTION_POOL.add(db, (slide_id, keyword_id, difficulty), parsed, served_to=user_id)
         return parsed
+    except question_dedup.DuplicateQuestion as e:
+        raise duplicate_error(e)
     except Exception as e:
         print("문제 생성 에러:", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# ✅ 저장된 문제 전체 조회용 (테스트용)
+@router.post("/quiz/generate-batch")
+def generate_quiz_batch(data: GenerateBatchRequest, db: Session = Depends(get_db)):
+    # 여러 슬라이드/키워드/난이도의 문제 N개를 GPT 한 번으로 생성 → 문제 + 키워드 연결을 한 트랜잭션으로 저장
+    specs = []
+    for item in data.items:
+        if item.difficulty is not None and item.difficulty not in question_pool.DIFFICULTIES:
+            raise HTTPException(status_code=400, detail="difficulty는 하, 중, 상 중 하나여야 합니다.")
+        for _ in range(item.count):
+            specs.append({
+                "slide_id": item.slide_id,
+                "keyword_id": item.keyword_id,
+                "difficulty": item.difficulty or random.choice(DIFFICULTY_LEVELS)["level"]
+            })
+    if len(specs) > QUIZ_BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {QUIZ_BATCH_MAX_QUESTIONS}문제까지 생성할 수 있습니다.")
+    try:
+        questions, dropped = generate_questions_batch(db, specs, fresh=data.fresh)
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        print("일괄 문제 생성 에러:", e)
+        raise HTTPException(status_code=500, detail=str(e))
+    if not questions:
+        raise HTTPException(status_code=500, detail="GPT 응답에 형식이 올바른 문제가 없습니다.")
+    return {"requested": len(specs), "dropped": dropped, "questions": questions}
+
+
+# 문제 풀: 백그라운드 채우기는 키 하나의 부족분을 generate_questions_batch 한 번으로 생성
+QUESTION_POOL = question_pool.QuestionPool(generate_question, generate_batch=generate_questions_batch)
+
+
+@router.post("/quiz/pool/prefill")
+def prefill_question_pool(
+    slide_id: int = Body(...),
+    keyword_ids: Optional[List[int]] = Body(None),  # 없으면 슬라이드의 모든 키워드
+    db: Session = Depends(get_db)
+):
+    # 수업 전에 풀을 미리 채워 두면 첫 요청부터 LLM 대기 없이 제공
+    scheduled = QUESTION_POOL.prefill(db, slide_id, keyword_ids)
+    return {"slide_id": slide_id, "scheduled": scheduled}
+
+
+@router.get("/quiz/pool/stats")
+def question_pool_stats():
+    return QUESTION_POOL.stats()
+
+
+@router.get("/quiz/dedup/stats")
+def question_dedup_stats():
+    return question_dedup.QUESTION_INDEX.stats()
+
+
+@router.on_event("shutdown")
+def shutdown_question_pool():
+    QUESTION_POOL.shutdown()
+
+
+# ✅ 저장된 문제 조회용 (테스트용) - 필터/커서/스트리밍은 /quiz/all과 동일, keyword_ids는 제외
 @router.get("/questions")
-def get_all_questions(db: Session = Depends(get_db)):
-    questions = db.query(Question).all()
-    return [
-        {
-            "question_id": q.question_id,
-            "slide_id": q.slide_id,
-            "type": q.question_type,
-            "content": q.content,
-            "answer": q.answer,
-            "explanation": q.explanation
-        } for q in questions
-    ]
+def get_all_questions(
+    slide_id: Optional[int] = None,
+    material_id: Optional[int] = None,
+    keyword_id: Optional[int] = None,
+    difficulty: Optional[str] = None,
+    after: Optional[int] = None,
+    limit: Optional[int] = None,
+    format: str = "json",
+    db: Session = Depends(get_db)
+):
+    filters = QuestionFilter(slide_id, material_id, keyword_id, difficulty)
+    return list_questions(db, filters, format, after, limit, with_keywords=False)
 
 
-@router.post("/quiz/weak-generate")
-def generate_weak_gpt_quiz(user_id: int, top_n: int = 1, db: Session = Depends(get_db)):
-    # 1. 약점 키워드 top_n 추출 (집계 뷰 사용)
-    stats = db.execute(
-        text("""
-        SELECT w.keyword_id, k.keyword_name, w.incorrect_count
-        FROM weak_weak_keyword_stats w
-        JOIN keywords k ON w.keyword_id = k.keyword_id
-        WHERE w.user_id = :user_id
-        ORDER BY w.incorrect_count DESC
-        LIMIT :top_n
-        """),
-        {"user_id": user_id, "top_n": top_n}
-    ).fetchall()
+def build_weak_prompt(db: Session, user_id: int, top_n: int):
+    """약점 키워드/유형으로 프롬프트 구성 → (프롬프트, 난이도, 약점 keyword_id 목록)"""
+    # 1. 약점 키워드 top_n 추출 (user_keyword_stats 인덱스 조회)
+    stats = keyword_stats.top_weak_keywords(db, user_id, top_n, write_behind.pending_counts_for(user_id))
     if not stats:
         raise HTTPException(status_code=404, detail="약점 키워드가 없습니다.")
 
-    keyword_names = [row[1] for row in stats]
-    keyword_ids = [row[0] for row in stats]
+    keyword_names = [row["keyword_name"] for row in stats]
+    keyword_ids = [row["keyword_id"] for row in stats]
 
     # 2. 문제 유형별 약점 분석 (오답 많은 유형)
     type_counts = db.execute(
@@ -175,27 +522,7 @@ def generate_weak_gpt_quiz(user_id: int, top_n: int = 1, db: Session = Depends(g
     weak_types = [row[0] for row in type_counts] if type_counts else []
 
     # 난이도 기준 랜덤 선택
-    difficulty_levels = [
-        {
-            "level": "하",
-            "concept": "기억(Remember), 이해(Understand)",
-            "prior_knowledge": "기본 용어만 알면 풀 수 있음",
-            "reasoning": "단순 fact-check, 암기형"
-        },
-        {
-            "level": "중",
-            "concept": "적용(Apply), 분석(Analyze)",
-            "prior_knowledge": "전공/수업 개념 필요",
-            "reasoning": "정보 연결, 간단한 추론"
-        },
-        {
-            "level": "상",
-            "concept": "평가(Evaluate), 창작(Create)",
-            "prior_knowledge": "여러 단원/심화 전공지식 필요",
-            "reasoning": "복합적 추론, 종합, 창의적 문제 해결"
-        }
-    ]
-    selected = random.choice(difficulty_levels)
+    selected = random.choice(DIFFICULTY_LEVELS)
     difficulty = selected["level"]
 
     # 3. GPT 프롬프트 생성
@@ -224,23 +551,23 @@ def generate_weak_gpt_quiz(user_id: int, top_n: int = 1, db: Session = Depends(g
 만약 키워드가 너무 추상적이거나 문제가 생성이 어렵더라도, 반드시 아래 JSON 예시 형식에 맞는 임의의 문제를 만들어서 출력해줘. 절대 설명문만 출력하지 마!
 """
 
-    # 4. GPT 호출 (openai 라이브러리 사용)
+    return prompt, difficulty, keyword_ids
+
+
+def save_weak_question(db: Session, parsed: dict, difficulty: str, keyword_ids: List[int], user_id: int) -> dict:
+    """약점 문제 저장. 기존 문제와 거의 같으면 저장하지 않고, 이 사용자가 안 본 같은 난이도 문제면 그 문제를 재사용
+    (재사용할 수 없으면 DuplicateQuestion → 호출한 쪽에서 다시 생성)"""
     try:
-        openai.api_key = os.getenv("OPENAI_API_KEY")
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "너는 대학 강의 기반 문제 생성 AI야."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7
-        )
-        content = response.choices[0].message['content']
-        print("GPT 응답:", content)  # 디버깅용
-        content = re.sub(r"^```json\\s*|\\s*```$|^```|```$", "", content.strip(), flags=re.MULTILINE)
-        parsed = json.loads(content)
-        parsed["difficulty"] = difficulty
-        # DB에 저장 (slide_id는 None, keyword_id는 약점 키워드 중 첫 번째)
+        question_dedup.check_duplicate(db, parsed.get("question"))
+    except question_dedup.DuplicateQuestion as e:
+        reused = reusable_duplicate(db, e.question_id, difficulty, user_id)
+        if reused is None:
+            raise
+        QUESTION_POOL.mark_seen(db, user_id, reused["question_id"])
+        return reused
+    parsed["difficulty"] = difficulty
+    # DB에 저장 (slide_id는 None, keyword_id는 약점 키워드 중 첫 번째)
+    with metrics.span("weak_quiz", "save"):
         question = Question(
             slide_id=None,
             question_type=parsed.get("type"),
@@ -261,8 +588,182 @@ def generate_weak_gpt_quiz(user_id: int, top_n: int = 1, db: Session = Depends(g
                 {"qid": question.question_id, "kid": keyword_ids[0]}
             )
             db.commit()
+    question_dedup.index_question(question.question_id, question.content)
+    return parsed
 
-        return parsed
+
+@router.post("/quiz/weak-generate")
+def generate_weak_gpt_quiz(user_id: int, top_n: int = 1, fresh: bool = False, db: Session = Depends(get_db)):
+    prompt, difficulty, keyword_ids = build_weak_prompt(db, user_id, top_n)
+
+    # 약점 키워드에 연결된 같은 난이도 문제 중 안 본 문제가 있으면 LLM 없이 재사용
+    served = reuse_before_generate(db, user_id, keyword_ids, difficulty, fresh=fresh, pipeline="weak_quiz")
+    if served is not None:
+        return served
+
+    # 4. GPT 호출 (llm_client 캐시 래퍼 사용), 재사용할 수 없는 중복이면 캐시를 건너뛰고 다시 생성
+    content = None
+    try:
+        openai.api_key = os.getenv("OPENAI_API_KEY")
+        for attempt in range(question_dedup.QUESTION_DEDUP_RETRIES + 1):
+            with metrics.span("weak_quiz", "llm"):
+                response = chat_completion(
+                    model="gpt-4",
+                    messages=[
+                        {"role": "system", "content": "너는 대학 강의 기반 문제 생성 AI야."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.7,
+                    cache_ttl=QUIZ_LLM_CACHE_TTL,
+                    bypass_cache=fresh or attempt > 0,
+                    validate=parse_quiz_json
+                )
+            content = response_text(response)
+            print("GPT 응답:", content)  # 디버깅용
+            parsed = parse_quiz_json(content)
+            try:
+                return save_weak_question(db, parsed, difficulty, keyword_ids, user_id)
+            except question_dedup.DuplicateQuestion as e:
+                duplicate = e
+        raise duplicate_error(duplicate)
+    except HTTPException:
+        raise
     except Exception as e:
         print("파싱 실패 content:", content)
         raise HTTPException(status_code=500, detail=f"GPT 문제 생성 실패: {str(e)} / content: {content}")
+
+
+# 스트리밍으로 보낼 문제 필드 (완성되는 순서대로 같은 이름의 SSE 이벤트)
+STREAM_FIELDS = ("type", "question", "options", "correct_answer", "explanation", "tags")
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # 프록시가 모아서 보내지 않도록
+
+
+def quiz_event_stream(pipeline: str, prompt: str, difficulty: str, save: Callable) -> Iterator[str]:
+    """
+    GPT 스트리밍 응답에서 필드가 완성될 때마다 SSE로 전송 → 끝나면 저장하고 done(question_id 포함) 전송
+    이벤트: start → type/question/options/correct_answer/explanation/tags → done | error
+    save(db, parsed): 응답 스트림이 끝난 뒤 실행되므로 요청 세션 대신 새 세션으로 저장
+    """
+    yield sse("start", {"difficulty": difficulty})
+    started = time.perf_counter()
+    first_field = True
+    content = ""
+    try:
+        openai.api_key = os.getenv("OPENAI_API_KEY")
+        with metrics.span(pipeline, "llm_stream"):
+            chunks = stream_chat_completion(
+                model="gpt-4",
+                messages=[
+                    {"role": "system", "content": "너는 대학 강의 기반 문제 생성 AI야."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.7
+            )
+            for name, value, content in stream_fields(chunks):
+                if name not in STREAM_FIELDS:
+                    continue
+                if first_field:
+                    # 첫 내용이 나가기까지 걸린 시간 (pipeline_stage_duration_seconds{stage="first_field"})
+                    metrics.STAGE_SECONDS.observe(time.perf_counter() - started, pipeline=pipeline,
+                                                  stage="first_field", outcome="ok")
+                    first_field = False
+                yield sse(name, value)
+        parsed = parse_quiz_json(content)
+        db = SessionLocal()
+        try:
+            parsed = save(db, parsed)
+        finally:
+            db.close()
+        yield sse("done", parsed)
+    except Exception as e:
+        print("문제 스트리밍 생성 에러:", e, "/ content:", content)
+        yield sse("error", {"detail": str(e)})
+
+
+def pooled_event_stream(parsed: dict) -> Iterator[str]:
+    # 풀에서 꺼낸 문제는 이미 완성돼 있으므로 같은 이벤트 순서로 한 번에 전송
+    yield sse("start", {"difficulty": parsed["difficulty"]})
+    for name in STREAM_FIELDS:
+        if name in parsed:
+            yield sse(name, parsed[name])
+    yield sse("done", parsed)
+
+
+@router.post("/quiz/generate/stream")
+def generate_quiz_stream(
+    slide_id: int = Body(...),
+    keyword_id: int = Body(...),
+    slide_title: str = Body(...),
+    concept_explanation: str = Body(...),
+    image_description: str = Body(None),
+    keywords: list = Body(...),
+    important_sentences: list = Body(...),
+    slide_summary: str = Body(...),
+    user_id: Optional[int] = Body(None),
+    difficulty: Optional[str] = Body(None),
+    db: Session = Depends(get_db)
+):
+    # /quiz/generate의 SSE 버전: 필드가 완성되는 대로 전송 (스트리밍 응답은 캐시하지 않음)
+    if difficulty is None:
+        difficulty = random.choice(DIFFICULTY_LEVELS)["level"]
+    elif difficulty not in question_pool.DIFFICULTIES:
+        raise HTTPException(status_code=400, detail="difficulty는 하, 중, 상 중 하나여야 합니다.")
+
+    pooled = question_pool.QUESTION_POOL_ENABLED and user_id is not None and bool(keyword_id)
+    if pooled:
+        with metrics.span("quiz", "pool"):
+            served = QUESTION_POOL.take(db, user_id, slide_id, keyword_id, difficulty)
+        if served is not None:
+            return StreamingResponse(pooled_event_stream(served), media_type="text/event-stream",
+                                     headers=SSE_HEADERS)
+    served = reuse_before_generate(db, user_id, [keyword_id], difficulty, slide_id=slide_id)
+    if served is not None:
+        return StreamingResponse(pooled_event_stream(served), media_type="text/event-stream", headers=SSE_HEADERS)
+
+    context = {
+        "slide_title": slide_title,
+        "concept_explanation": concept_explanation,
+        "image_description": image_description,
+        "keywords": keywords,
+        "important_sentences": important_sentences,
+        "slide_summary": slide_summary
+    }
+
+    def save(session: Session, parsed: dict) -> dict:
+        try:
+            parsed = save_generated_question(session, slide_id, keyword_id, parsed, difficulty)
+        except question_dedup.DuplicateQuestion as e:
+            # 이미 필드를 보낸 뒤라 다시 생성하지 않음: 이 사용자가 안 본 같은 난이도 문제면 done으로 기존 문제(reused)를
+            # 알려주고, 아니면 (이미 봤거나 난이도가 다름) 저장하지 않고 error 이벤트로 끝냄
+            reused = reusable_duplicate(session, e.question_id, difficulty, user_id)
+            if reused is None:
+                raise
+            if user_id is not None:
+                QUESTION_POOL.mark_seen(session, user_id, reused["question_id"])
+            return reused
+        if pooled:
+            QUESTION_POOL.add(session, (slide_id, keyword_id, difficulty), parsed, served_to=user_id)
+        return parsed
+
+    events = quiz_event_stream("quiz_stream", build_quiz_prompt(context, difficulty), difficulty, save)
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.post("/quiz/weak-generate/stream")
+def generate_weak_gpt_quiz_stream(user_id: int, top_n: int = 1, db: Session = Depends(get_db)):
+    # /quiz/weak-generate의 SSE 버전
+    prompt, difficulty, keyword_ids = build_weak_prompt(db, user_id, top_n)
+    served = reuse_before_generate(db, user_id, keyword_ids, difficulty, pipeline="weak_quiz")
+    if served is not None:
+        return StreamingResponse(pooled_event_stream(served), media_type="text/event-stream", headers=SSE_HEADERS)
+    events = quiz_event_stream(
+        "weak_quiz_stream", prompt, difficulty,
+        lambda session, parsed: save_weak_question(session, parsed, difficulty, keyword_ids, user_id)
+    )
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+# ✅ GPT 응답 캐시 통계 (절약한 토큰 수 포함)
+@router.get("/llm/cache-stats")
+def llm_cache_stats():
+    return cache_stats()
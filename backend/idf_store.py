@@ -0,0 +1,86 @@
+# idf_store.py
+# 지금까지 분석한 모든 강의자료의 문서 빈도(DF)를 누적하는 영구 저장소 (SQLite)
+# - 새 PDF를 분석할 때 그 문서의 고유 명사들만 df += 1 (전체 재학습 없음)
+# - 새 문서 점수 계산은 그 문서에 나온 용어의 df만 조회하는 희소 연산
+import math
+import os
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data"))
+_SQLITE_MAX_VARS = 500  # IN (...) 한 번에 넣을 용어 수
+
+
+class IdfStore:
+    def __init__(self, path: str = None):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        self.path = path or os.path.join(DATA_DIR, "idf.sqlite3")
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS docs (doc_id TEXT PRIMARY KEY, n_terms INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('n_docs', 0)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add_document(self, doc_id: str, terms: Iterable[str]) -> bool:
+        """문서 하나를 DF에 반영. 이미 반영된 doc_id면 아무것도 하지 않고 False"""
+        unique = set(terms)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")  # 워커 간 동시 업로드에도 같은 문서를 두 번 세지 않도록
+        try:
+            cur = conn.execute("INSERT OR IGNORE INTO docs (doc_id, n_terms) VALUES (?, ?)", (doc_id, len(unique)))
+            if cur.rowcount == 0:
+                conn.execute("ROLLBACK")
+                return False
+            conn.executemany(
+                "INSERT INTO terms (term, df) VALUES (?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                ((t,) for t in unique)
+            )
+            conn.execute("UPDATE meta SET value = value + 1 WHERE name = 'n_docs'")
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def n_docs(self) -> int:
+        return self._conn().execute("SELECT value FROM meta WHERE name = 'n_docs'").fetchone()[0]
+
+    def document_frequencies(self, terms: List[str]) -> Dict[str, int]:
+        conn = self._conn()
+        df = {}
+        for i in range(0, len(terms), _SQLITE_MAX_VARS):
+            chunk = terms[i:i + _SQLITE_MAX_VARS]
+            placeholders = ",".join("?" * len(chunk))
+            df.update(conn.execute(f"SELECT term, df FROM terms WHERE term IN ({placeholders})", chunk).fetchall())
+        return df
+
+    def tfidf(self, counts: Counter, counted: bool = True) -> Dict[str, float]:
+        """용어 빈도(counts)에 코퍼스 IDF를 곱해 L2 정규화한 점수 (sklearn smooth_idf와 같은 식)
+
+        counted: 이 문서가 이미 add_document로 DF에 반영됐는지. False면 자기 자신을 포함한 것처럼 계산
+        """
+        if not counts:
+            return {}
+        terms = list(counts)
+        df = self.document_frequencies(terms)
+        extra = 0 if counted else 1
+        n = self.n_docs() + extra
+        scores = {t: counts[t] * (math.log((1 + n) / (1 + df.get(t, 0) + extra)) + 1) for t in terms}
+        norm = math.sqrt(sum(v * v for v in scores.values()))
+        return {t: v / norm for t, v in scores.items()} if norm else scores
+
+    def top_n(self, counts: Counter, n: int, counted: bool = True) -> Tuple[List[Tuple[str, float]], Dict[str, float]]:
+        scores = self.tfidf(counts, counted)
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:n], scores
@@ -0,0 +1,87 @@
+# keyword_pairs.py
+# 관계 추론(LLM) 전에 개념어 쌍을 로컬 점수로 걸러내는 후보 선택 단계
+# - 페이지 동시출현, 문장 윈도우 근접도, TF-IDF 벡터 유사도를 페이지×용어 행렬로 한 번에 계산
+import re
+from typing import List, Tuple
+
+import numpy as np
+
+RELATION_TOP_K = 5        # 개념어마다 LLM에 보낼 후보 쌍 수
+SENTENCE_WINDOW = 2       # 앞뒤 몇 문장까지 "가깝다"고 볼지
+SCORE_WEIGHTS = (0.4, 0.3, 0.3)  # (페이지 동시출현, 문장 근접도, TF-IDF 유사도)
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?。])\s+|\n+")
+
+
+def _count_matrix(units: List[str], keywords: List[str]) -> np.ndarray:
+    # units(페이지/문장) × keywords 출현 횟수 (한국어 복합명사 때문에 부분문자열 기준)
+    lowered = [kw.lower() for kw in keywords]
+    return np.array([[u.count(kw) for kw in lowered] for u in (x.lower() for x in units)], dtype=np.float32)
+
+
+def _jaccard(binary: np.ndarray) -> np.ndarray:
+    co = binary.T @ binary
+    df = np.diag(co)
+    union = df[:, None] + df[None, :] - co
+    return np.divide(co, union, out=np.zeros_like(co), where=union > 0)
+
+
+def _window_proximity(slide_texts: List[str], keywords: List[str], window: int) -> np.ndarray:
+    # 페이지 사이에 window개의 빈 행을 끼워 넣어 윈도우가 페이지 경계를 넘지 않게 함
+    rows = []
+    for page in slide_texts:
+        rows.extend(s for s in _SENTENCE_SPLIT.split(page) if s.strip())
+        rows.extend([""] * window)
+    if not rows:
+        return np.zeros((len(keywords), len(keywords)), dtype=np.float32)
+    S = (_count_matrix(rows, keywords) > 0).astype(np.float32)
+    # 누적합으로 [i-window, i+window] 구간 합을 벡터화 계산
+    padded = np.vstack([np.zeros((window + 1, S.shape[1]), dtype=np.float32), S,
+                        np.zeros((window, S.shape[1]), dtype=np.float32)])
+    csum = np.cumsum(padded, axis=0)
+    W = (csum[2 * window + 1:] - csum[:-2 * window - 1] > 0).astype(np.float32)
+    near = S.T @ W  # i가 나온 문장 근처에 j가 나온 횟수
+    near = np.maximum(near, near.T)
+    df = S.sum(axis=0)
+    denom = np.minimum(df[:, None], df[None, :])
+    return np.divide(near, denom, out=np.zeros_like(near), where=denom > 0).clip(0, 1)
+
+
+def _tfidf_similarity(counts: np.ndarray) -> np.ndarray:
+    n_pages = counts.shape[0]
+    df = (counts > 0).sum(axis=0)
+    idf = np.log((1 + n_pages) / (1 + df)) + 1
+    X = counts * idf
+    norms = np.linalg.norm(X, axis=0)
+    Xn = np.divide(X, norms, out=np.zeros_like(X), where=norms > 0)
+    return Xn.T @ Xn
+
+
+def score_keyword_pairs(keywords: List[str], slide_texts: List[str], window: int = SENTENCE_WINDOW) -> np.ndarray:
+    """keywords × keywords 관련도 점수 행렬 (대각선은 0)"""
+    counts = _count_matrix(slide_texts, keywords)
+    cooc = _jaccard((counts > 0).astype(np.float32))
+    prox = _window_proximity(slide_texts, keywords, window)
+    sim = _tfidf_similarity(counts)
+    w_cooc, w_prox, w_sim = SCORE_WEIGHTS
+    scores = w_cooc * cooc + w_prox * prox + w_sim * sim
+    np.fill_diagonal(scores, 0)
+    return scores
+
+
+def select_candidate_pairs(keywords: List[str], slide_texts: List[str], top_k: int = RELATION_TOP_K,
+                           window: int = SENTENCE_WINDOW) -> List[Tuple[str, str]]:
+    """개념어마다 점수 상위 top_k개 상대만 남긴 쌍 목록 (a, b 순서는 keywords 순서를 따름)"""
+    n = len(keywords)
+    if n < 2:
+        return []
+    scores = score_keyword_pairs(keywords, slide_texts, window)
+    k = min(top_k, n - 1)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    selected = np.zeros((n, n), dtype=bool)
+    rows = np.repeat(np.arange(n), k)
+    selected[rows, top.ravel()] = True
+    selected |= selected.T
+    selected &= scores > 0  # 근거가 전혀 없는 쌍은 제외
+    i_idx, j_idx = np.nonzero(np.triu(selected, k=1))
+    return [(keywords[i], keywords[j]) for i, j in zip(i_idx, j_idx)]
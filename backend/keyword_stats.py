@@ -0,0 +1,174 @@
+# keyword_stats.py
+# 사용자 × 키워드 학습 통계 (user_keyword_stats)
+# - 문제 제출 때마다 풀이 기록과 같은 트랜잭션에서 한 행씩 원자적으로 갱신 (INSERT ... ON DUPLICATE KEY UPDATE)
+# - 약점 점수: 오답 한 번 = 1점, 반감기(WEAKNESS_HALF_LIFE_DAYS)마다 절반으로 감쇠하는 합계
+#   그대로 저장하면 행마다 감쇠 기준 시각이 달라 정렬할 수 없으므로 weakness_key = ln(점수) + λ·t(일) 로 저장
+#   → 모든 행이 같은 속도로 감쇠하므로 weakness_key 순서 = 현재 약점 점수 순서, (user_id, weakness_key) 인덱스로 top-N 조회
+# - 기존 데이터는 `python keyword_stats.py backfill` 로 weak_keyword_logs/question_attempts에서 다시 계산
+import math
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from models import Keyword, UserKeywordStat
+
+WEAKNESS_HALF_LIFE_DAYS = float(os.getenv("WEAKNESS_HALF_LIFE_DAYS", "14"))
+DECAY_PER_DAY = math.log(2) / WEAKNESS_HALF_LIFE_DAYS
+
+
+def _days(ts: float) -> float:
+    return ts / 86400
+
+
+def weakness_score(weakness_key: Optional[float], now: float = None) -> float:
+    """저장된 weakness_key → 현재 시각 기준 약점 점수"""
+    if weakness_key is None:
+        return 0.0
+    return math.exp(weakness_key - DECAY_PER_DAY * _days(now or time.time()))
+
+
+def record_attempt(db: Session, user_id: int, keyword_ids: List[int], is_correct: bool, now: float = None):
+    """문제 하나의 풀이 결과를 키워드별 통계에 반영 (commit은 호출한 쪽에서 풀이 기록과 함께)"""
+    record_attempts(db, user_id, {kid: (1, 0 if is_correct else 1) for kid in keyword_ids}, now)
+
+
+def record_attempts(db: Session, user_id: int, counts: Dict[int, Tuple[int, int]], now: float = None):
+    """keyword_id → (풀이 수, 오답 수)를 한 번에 반영 (여러 문제를 한꺼번에 제출한 경우 키워드별로 합산해서 전달)"""
+    if not counts:
+        return
+    now = now or time.time()
+    db.execute(
+        text("""
+            INSERT INTO user_keyword_stats
+                (user_id, keyword_id, attempts, incorrect_count, last_seen_at, last_incorrect_at, weakness_key)
+            VALUES
+                (:uid, :kid, :attempts, :wrong, FROM_UNIXTIME(:now), IF(:wrong > 0, FROM_UNIXTIME(:now), NULL),
+                 IF(:wrong > 0, :now_key + LN(:wrong), NULL))
+            ON DUPLICATE KEY UPDATE
+                weakness_key = IF(:wrong > 0, :now_key + LN(COALESCE(EXP(weakness_key - :now_key), 0) + :wrong),
+                                  weakness_key),
+                attempts = attempts + :attempts,
+                incorrect_count = incorrect_count + :wrong,
+                last_seen_at = FROM_UNIXTIME(:now),
+                last_incorrect_at = IF(:wrong > 0, FROM_UNIXTIME(:now), last_incorrect_at)
+        """),
+        [
+            {"uid": user_id, "kid": kid, "attempts": attempts, "wrong": wrong, "now": now,
+             "now_key": DECAY_PER_DAY * _days(now)}
+            for kid, (attempts, wrong) in counts.items()
+        ]
+    )
+
+
+def top_weak_keywords(db: Session, user_id: int, top_n: int,
+                      pending: Dict[int, Tuple[int, int]] = None) -> List[dict]:
+    """
+    약점 점수가 높은 키워드 top_n (idx_uks_weakness 역순 스캔)
+    pending: 아직 저장되지 않은 제출(write_behind)의 keyword_id → (풀이 수, 오답 수), 지금 시각 기준으로 더해서 순위 계산
+    """
+    now = time.time()
+    pending = {kid: c for kid, c in (pending or {}).items() if c[1] > 0}
+    rows = db.execute(
+        text("""
+            SELECT s.keyword_id, k.keyword_name, s.incorrect_count, s.attempts, s.last_incorrect_at, s.weakness_key
+            FROM user_keyword_stats s
+            JOIN keywords k ON k.keyword_id = s.keyword_id
+            WHERE s.user_id = :uid AND s.weakness_key IS NOT NULL
+            ORDER BY s.weakness_key DESC
+            LIMIT :top_n
+        """),
+        {"uid": user_id, "top_n": top_n + len(pending)}
+    ).fetchall()
+    result = {
+        row[0]: {
+            "keyword_id": row[0],
+            "keyword_name": row[1],
+            "incorrect_count": row[2],
+            "attempts": row[3],
+            "last_incorrect_at": str(row[4]) if row[4] else None,
+            "weakness": weakness_score(row[5], now)
+        }
+        for row in rows
+    }
+    if pending:
+        # 상위 목록 밖에 있던 키워드도 대기 중인 오답으로 올라올 수 있으므로 해당 키워드 행을 따로 조회
+        missing = [kid for kid in pending if kid not in result]
+        if missing:
+            extra = db.execute(
+                select(Keyword.keyword_id, Keyword.keyword_name, UserKeywordStat.incorrect_count,
+                       UserKeywordStat.attempts, UserKeywordStat.weakness_key)
+                .outerjoin(UserKeywordStat, (UserKeywordStat.keyword_id == Keyword.keyword_id)
+                           & (UserKeywordStat.user_id == user_id))
+                .where(Keyword.keyword_id.in_(missing))
+            )
+            for kid, name, incorrect, attempts, key in extra:
+                result[kid] = {"keyword_id": kid, "keyword_name": name, "incorrect_count": incorrect or 0,
+                               "attempts": attempts or 0, "last_incorrect_at": None,
+                               "weakness": weakness_score(key, now)}
+        for kid, (attempts, wrong) in pending.items():
+            if kid in result:
+                result[kid]["attempts"] += attempts
+                result[kid]["incorrect_count"] += wrong
+                result[kid]["weakness"] += wrong
+    ranked = sorted(result.values(), key=lambda r: -r["weakness"])[:top_n]
+    for r in ranked:
+        r["weakness"] = round(r["weakness"], 4)
+    return ranked
+
+
+def backfill(db: Session, user_ids: List[int] = None) -> int:
+    """
+    weak_keyword_logs(오답 시각)와 question_attempts(풀이 수)로 통계를 다시 계산해서 덮어씀
+    사용자 단위로 커밋하므로 서비스 중에 실행해도 잠금이 짧음 (실행 중 들어온 제출은 다음 실행 때 재계산)
+    """
+    if user_ids is None:
+        user_ids = [row[0] for row in db.execute(text(
+            "SELECT DISTINCT user_id FROM question_attempts UNION SELECT DISTINCT user_id FROM weak_keyword_logs"
+        ))]
+    for uid in user_ids:
+        db.execute(text("""
+            INSERT INTO user_keyword_stats (user_id, keyword_id, attempts, incorrect_count, last_seen_at)
+            SELECT qa.user_id, qk.keyword_id, COUNT(*), 0, MAX(qa.attempt_date)
+            FROM question_attempts qa
+            JOIN question_keywords qk ON qk.question_id = qa.question_id
+            WHERE qa.user_id = :uid
+            GROUP BY qa.user_id, qk.keyword_id
+            ON DUPLICATE KEY UPDATE attempts = VALUES(attempts), last_seen_at = VALUES(last_seen_at)
+        """), {"uid": uid})
+        # 약점 점수: Σ exp(-λ·경과일) 을 현재 시각 기준으로 합산 → weakness_key = λ·now + ln(합계)
+        now = time.time()
+        db.execute(text("""
+            INSERT INTO user_keyword_stats
+                (user_id, keyword_id, attempts, incorrect_count, last_seen_at, last_incorrect_at, weakness_key)
+            SELECT l.user_id, l.keyword_id, COUNT(*), COUNT(*), MAX(l.occurred_at), MAX(l.occurred_at),
+                   :now_key + LN(SUM(EXP(-:decay * (:now - UNIX_TIMESTAMP(l.occurred_at)) / 86400)))
+            FROM weak_keyword_logs l
+            WHERE l.user_id = :uid AND l.is_incorrect = TRUE
+            GROUP BY l.user_id, l.keyword_id
+            ON DUPLICATE KEY UPDATE
+                incorrect_count = VALUES(incorrect_count),
+                last_seen_at = GREATEST(COALESCE(last_seen_at, VALUES(last_seen_at)), VALUES(last_seen_at)),
+                last_incorrect_at = VALUES(last_incorrect_at),
+                weakness_key = VALUES(weakness_key)
+        """), {"uid": uid, "now": now, "now_key": DECAY_PER_DAY * _days(now), "decay": DECAY_PER_DAY})
+        db.commit()
+    return len(user_ids)
+
+
+if __name__ == "__main__":
+    # 사용법 (backend 폴더에서): python keyword_stats.py backfill [user_id ...]
+    if len(sys.argv) < 2 or sys.argv[1] != "backfill":
+        print("사용법: python keyword_stats.py backfill [user_id ...]")
+        sys.exit(1)
+    from database import SessionLocal
+    session = SessionLocal()
+    try:
+        started = time.time()
+        count = backfill(session, [int(u) for u in sys.argv[2:]] or None)
+        print(f"user_keyword_stats 백필 완료: 사용자 {count}명, {time.time() - started:.1f}초")
+    finally:
+        session.close()
@@ -0,0 +1,210 @@
+# lecture_bundle.py
+# GET /archive/{lecture_id} 응답(강의자료 + 슬라이드 + 문제)을 미리 직렬화해 두는 읽기 모델 캐시
+# - 캐시 검증: material_versions.version (slides/questions 변경 시 DB 트리거가 증가) → 요청마다 PK 조회 한 번
+# - 버전이 같으면 메모리(크기 제한 LRU) 또는 디스크 캐시의 JSON 바이트를 그대로 반환, 다르면 다시 만듦
+# - ETag/Last-Modified를 붙이고, 클라이언트가 같은 버전을 갖고 있으면 본문 없이 304
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+import metrics
+from disk_cache import DiskCache
+from models import Question, Slide
+
+LECTURE_BUNDLE_CACHE_MAX_BYTES = int(os.getenv("LECTURE_BUNDLE_CACHE_MAX_MB", "32")) * 1024 * 1024
+LECTURE_BUNDLE_DISK_CACHE = os.getenv("LECTURE_BUNDLE_DISK_CACHE", "0") == "1"
+# 버전 증가 트리거 (create_database.sql) → 모두 있을 때만 버전 행이 없는 자료에 버전 행을 만들어 캐시 사용
+VERSION_TRIGGERS = ("slides_version_ins", "slides_version_upd", "slides_version_del",
+                    "questions_version_ins", "questions_version_upd", "questions_version_del")
+_triggers_installed = None
+
+
+class Bundle:
+    def __init__(self, lecture_id: int, version: int, body: bytes):
+        self.lecture_id = lecture_id
+        self.version = version
+        self.body = body
+
+
+class BundleCache:
+    """lecture_id → 가장 최근 버전의 Bundle (본문 바이트 합계가 max_bytes를 넘으면 LRU 삭제)"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[int, Bundle]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.disk = DiskCache("lecture_bundles", max_bytes=max_bytes * 4) if LECTURE_BUNDLE_DISK_CACHE else None
+
+    def get(self, lecture_id: int, version: int) -> Optional[bytes]:
+        with self._lock:
+            bundle = self._items.get(lecture_id)
+            if bundle is not None and bundle.version == version:
+                self._items.move_to_end(lecture_id)
+                hit = bundle.body
+            else:
+                hit = None
+        metrics.record_cache_lookup("lecture_bundle", hit=hit is not None)
+        if hit is None and self.disk is not None:
+            # 다른 워커가 만든 번들 → 메모리에도 올림
+            hit = self.disk.get(f"{lecture_id}:{version}")
+            if hit is not None:
+                self._remember(Bundle(lecture_id, version, hit))
+        return hit
+
+    def put(self, bundle: Bundle):
+        self._remember(bundle)
+        if self.disk is not None:
+            self.disk.set(f"{bundle.lecture_id}:{bundle.version}", bundle.body)
+
+    def _remember(self, bundle: Bundle):
+        if len(bundle.body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(bundle.lecture_id, None)
+            if old is not None:
+                self._bytes -= len(old.body)
+            self._items[bundle.lecture_id] = bundle
+            self._bytes += len(bundle.body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted.body)
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = {"entries": len(self._items), "bytes": self._bytes, "max_bytes": self.max_bytes}
+        if self.disk is not None:
+            result["disk"] = self.disk.stats()
+        return result
+
+
+BUNDLE_CACHE = BundleCache(LECTURE_BUNDLE_CACHE_MAX_BYTES)
+
+
+def _as_utc(value: Optional[datetime]) -> datetime:
+    if value is None:
+        return datetime(1970, 1, 1, tzinfo=timezone.utc)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def triggers_installed(db: Session) -> bool:
+    """버전 증가 트리거가 모두 설치돼 있는지 (프로세스당 한 번 확인)"""
+    global _triggers_installed
+    if _triggers_installed is None:
+        installed = db.execute(
+            text("""
+                SELECT COUNT(DISTINCT TRIGGER_NAME) FROM information_schema.TRIGGERS
+                WHERE TRIGGER_SCHEMA = DATABASE() AND TRIGGER_NAME IN :names
+            """).bindparams(bindparam("names", expanding=True)),
+            {"names": list(VERSION_TRIGGERS)}
+        ).scalar()
+        _triggers_installed = installed == len(VERSION_TRIGGERS)
+        if not _triggers_installed:
+            print("material_versions 트리거가 없어 강의자료 번들을 캐시하지 않습니다 (config/create_database.sql 참고)")
+    return _triggers_installed
+
+
+def _version_row(db: Session, lecture_id: int):
+    return db.execute(
+        text("""
+            SELECT m.material_name, m.created_at, v.version, v.updated_at
+            FROM lecture_materials m
+            LEFT JOIN material_versions v ON v.material_id = m.material_id
+            WHERE m.material_id = :mid
+        """),
+        {"mid": lecture_id}
+    ).fetchone()
+
+
+def current_version(db: Session, lecture_id: int):
+    """
+    (강의자료 이름, 버전, 마지막 변경 시각). 버전 행이 없는 기존 자료는 트리거가 설치돼 있으면 여기서 버전 행을 만들고,
+    트리거가 없으면 변경을 감지할 수 없으므로 버전 None
+    """
+    row = _version_row(db, lecture_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="강의자료를 찾을 수 없습니다.")
+    if row[2] is None and triggers_installed(db):
+        # 트리거 설치 전부터 있던 자료: 이후 변경은 트리거가 이 행을 올림 (동시에 만들어도 IGNORE로 하나만)
+        db.execute(text("INSERT IGNORE INTO material_versions (material_id, version) VALUES (:mid, 1)"),
+                   {"mid": lecture_id})
+        db.commit()
+        row = _version_row(db, lecture_id)
+    return row[0], row[2], max(_as_utc(row[1]), _as_utc(row[3]))
+
+
+def build_bundle_body(db: Session, lecture_id: int, material_name: str) -> bytes:
+    slides = db.query(Slide.slide_id, Slide.slide_number, Slide.summary) \
+        .filter(Slide.material_id == lecture_id).order_by(Slide.slide_number, Slide.slide_id).all()
+    questions = db.query(Question.question_id, Question.slide_id, Question.content, Question.answer,
+                         Question.explanation) \
+        .join(Slide, Slide.slide_id == Question.slide_id) \
+        .filter(Slide.material_id == lecture_id).order_by(Question.question_id).all()
+    payload = {
+        "lecture_id": lecture_id,
+        "material_name": material_name,
+        "slides": [
+            {
+                "slide_id": s.slide_id,
+                "slide_number": s.slide_number,
+                "summary": s.summary
+            } for s in slides
+        ],
+        "questions": [
+            {
+                "question_id": q.question_id,
+                "slide_id": q.slide_id,
+                "content": q.content,
+                "answer": q.answer,
+                "explanation": q.explanation
+            } for q in questions
+        ]
+    }
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return last_modified.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def bundle_response(request: Request, db: Session, lecture_id: int) -> Response:
+    material_name, version, last_modified = current_version(db, lecture_id)
+    if version is None:
+        # 변경을 감지할 수 없으므로 캐시/검증 없이 매번 새로 만듦
+        return Response(content=build_bundle_body(db, lecture_id, material_name), media_type="application/json")
+    etag = f'"lecture-{lecture_id}-v{version}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": "no-cache"  # 캐시해도 되지만 쓸 때마다 재검증
+    }
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    body = BUNDLE_CACHE.get(lecture_id, version)
+    if body is None:
+        with metrics.span("archive", "build_bundle"):
+            body = build_bundle_body(db, lecture_id, material_name)
+        BUNDLE_CACHE.put(Bundle(lecture_id, version, body))
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,165 @@
+# llm_client.py
+# OpenAI ChatCompletion 호출을 이벤트 루프 밖(전용 스레드풀)에서 실행하는 공용 LLM 실행 레이어
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import weakref
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import openai
+from dotenv import load_dotenv
+
+import metrics
+from disk_cache import DiskCache
+
+load_dotenv()
+
+# 동시에 진행할 수 있는 LLM 호출 수 (프로세스 단위)
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+
+# 블로킹 openai 호출은 전용 스레드풀에서 실행 → 이벤트 루프는 다른 요청 처리 가능
+_executor = ThreadPoolExecutor(max_workers=LLM_CONCURRENCY, thread_name_prefix="llm")
+# 세마포어는 처음 기다린 이벤트 루프에 묶이므로 루프마다 따로 만듦 (asyncio.run을 여러 번 하는 벤치마크/스크립트 대응)
+_semaphores = weakref.WeakKeyDictionary()
+_semaphores_lock = threading.Lock()
+
+
+def _loop_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    with _semaphores_lock:
+        semaphore = _semaphores.get(loop)
+        if semaphore is None:
+            semaphore = _semaphores[loop] = asyncio.Semaphore(LLM_CONCURRENCY)
+        return semaphore
+
+# 프롬프트 단위 응답 캐시: (model, messages, temperature, max_tokens)가 같으면 이전 응답 재사용
+LLM_CACHE = DiskCache("llm", max_bytes=int(os.getenv("LLM_CACHE_MAX_MB", "128")) * 1024 * 1024)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+
+# 일시적 오류(속도 제한, 서버 오류, 타임아웃)는 지수 백오프로 재시도
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "1.0"))  # 첫 재시도 대기(초), 이후 2배씩
+_RETRYABLE_ERRORS = tuple(
+    getattr(openai.error, name) for name in
+    ("RateLimitError", "APIError", "Timeout", "ServiceUnavailableError", "APIConnectionError", "TryAgain")
+    if hasattr(getattr(openai, "error", None), name)
+)
+
+# 프로세스 내 실제 API 호출 집계 (캐시 적중은 제외). 벤치마크/모니터링에서 구간별 차이로 사용
+_usage = Counter()
+_usage_lock = threading.Lock()
+
+
+def prompt_cache_key(model, messages, temperature=None, max_tokens=None) -> str:
+    """공백/줄바꿈 차이는 무시하도록 정규화한 뒤 해시"""
+    normalized = [
+        {"role": m.get("role"), "content": re.sub(r"\s+", " ", m.get("content") or "").strip()}
+        for m in messages
+    ]
+    raw = json.dumps([model, normalized, temperature, max_tokens], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def chat_completion(cache_ttl: float = None, bypass_cache: bool = False, validate=None, **kwargs):
+    """openai.ChatCompletion.create 동기 호출
+
+    cache_ttl: 호출 위치별 캐시 유지 시간(초). None이면 캐시하지 않음
+    bypass_cache: 창의적인 결과가 필요한 호출 등 캐시를 건너뛸 때 True
+    validate: 응답 본문 검사 함수(예: json.loads). 예외가 나면 그 응답은 캐시하지 않음
+    """
+    use_cache = LLM_CACHE_ENABLED and cache_ttl and not bypass_cache and not kwargs.get("stream")
+    if use_cache:
+        key = prompt_cache_key(kwargs.get("model"), kwargs.get("messages", []),
+                               kwargs.get("temperature"), kwargs.get("max_tokens"))
+        cached = LLM_CACHE.get(key)
+        if cached is not None:
+            response = json.loads(cached)
+            usage = response.get("usage") or {}
+            LLM_CACHE.incr("prompt_tokens_saved", usage.get("prompt_tokens", 0))
+            LLM_CACHE.incr("completion_tokens_saved", usage.get("completion_tokens", 0))
+            return response
+    response = _create_with_retry(**kwargs)
+    if use_cache and _is_valid(response, validate):
+        LLM_CACHE.set(key, json.dumps(response, ensure_ascii=False).encode("utf-8"), ttl=cache_ttl)
+    return response
+
+
+def stream_chat_completion(**kwargs):
+    """stream=True 호출 → 생성되는 본문 조각을 바로 yield (캐시하지 않음, 재시도는 연결 시점까지만)"""
+    for chunk in _create_with_retry(stream=True, **kwargs):
+        choices = chunk.get("choices") or []
+        content = (choices[0].get("delta") or {}).get("content") if choices else None
+        if content:
+            yield content
+
+
+def _create_with_retry(**kwargs):
+    model = kwargs.get("model", "")
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            response = openai.ChatCompletion.create(**kwargs)
+            break
+        except _RETRYABLE_ERRORS as e:
+            if attempt == LLM_MAX_RETRIES:
+                _count_usage(errors=1)
+                metrics.record_llm_call(model, "error")
+                raise
+            metrics.LLM_RETRIES.inc(model=model, error=type(e).__name__)
+            time.sleep(LLM_RETRY_BACKOFF * (2 ** attempt))
+        except Exception:
+            _count_usage(errors=1)
+            metrics.record_llm_call(model, "error")
+            raise
+    usage = (response.get("usage") if isinstance(response, dict) else None) or {}  # stream=True면 제너레이터
+    prompt_tokens, completion_tokens = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    _count_usage(calls=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    metrics.record_llm_call(model, "ok", prompt_tokens, completion_tokens)
+    return response
+
+
+def _is_valid(response, validate) -> bool:
+    if validate is None:
+        return True
+    try:
+        validate(response_text(response))
+        return True
+    except Exception:
+        return False
+
+
+def _count_usage(**amounts):
+    with _usage_lock:
+        _usage.update(amounts)
+
+
+def usage_stats() -> dict:
+    """이 프로세스에서 지금까지 보낸 LLM 요청 수/오류 수/토큰 수"""
+    with _usage_lock:
+        return {name: _usage.get(name, 0) for name in ("calls", "errors", "prompt_tokens", "completion_tokens")}
+
+
+def cache_stats() -> dict:
+    stats = LLM_CACHE.stats()
+    stats["tokens_saved"] = stats.get("prompt_tokens_saved", 0) + stats.get("completion_tokens_saved", 0)
+    return stats
+
+
+async def achat_completion(**kwargs):
+    """chat_completion을 동시 실행 제한(LLM_CONCURRENCY) 안에서 비동기로 실행"""
+    async with _loop_semaphore():
+        loop = asyncio.get_running_loop()
+        # run_in_executor는 contextvars를 넘기지 않으므로 요청 단위 집계(metrics)가 이어지도록 복사해서 실행
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(_executor, partial(context.run, chat_completion, **kwargs))
+
+
+def response_text(response) -> str:
+    """ChatCompletion 응답에서 본문 텍스트만 꺼내기"""
+    return response['choices'][0]['message']['content']
@@ -1,10 +1,16 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from fastapi.openapi.utils import get_openapi
+from fastapi.responses import PlainTextResponse
 from user_api import router as user_router
 from archive_api import router as archive_router
 from gpt_generate import router as gpt_router
 from quiz_api import router as quiz_router
+from concept_graph import router as concept_graph_router
+from slide_analyzer import router as analysis_router
 from fastapi.middleware.cors import CORSMiddleware
+from database import engine
+import metrics
 
 app = FastAPI()
 
@@ -45,6 +51,10 @@ app.include_router(user_router, prefix="/api")
 app.include_router(archive_router)
 app.include_router(gpt_router)
 app.include_router(quiz_router)
+app.include_router(concept_graph_router)
+# 분석 라우터는 마지막에 등록: 종료 훅은 등록 순서대로 실행되므로 풀이 기록(write-behind)을 먼저 비우고
+# 분석 작업 워커를 멈춤 (작업 워커는 write-behind 큐를 쓰지 않아 순서에 따른 유실은 없음)
+app.include_router(analysis_router)
 
 # 👇 이 부분 추가!
 app.add_middleware(
@@ -54,3 +64,24 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+# 📈 계측: 라우트별 응답 시간, 요청별 DB 쿼리/LLM 호출 수 → /metrics (Prometheus 텍스트 형식)
+metrics.instrument_engine(engine)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    stats, token = metrics.begin_request(request.method, request.url.path)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # 라우팅 후 scope에 남는 route의 경로 템플릿(/quiz/{id})을 라벨로 사용
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        metrics.end_request(stats, token, status, time.perf_counter() - start, route)
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,225 @@
+# metrics.py
+# FastAPI 앱 계측: 라우트별 응답 시간, 파이프라인 단계 구간(span), LLM 호출/토큰/재시도, 캐시 적중, DB 쿼리 수
+# - 프로세스 메모리에 집계하고 /metrics에서 Prometheus 텍스트 형식으로 내보냄 (uvicorn 워커마다 따로 집계)
+# - METRICS_JSON_LOGS=1이면 요청마다 구조화된 JSON 로그 한 줄을 stdout에 출력
+# - 요청 단위 집계(DB 쿼리 수, LLM 호출 수, 단계별 시간)는 contextvars로 요청 처리 흐름을 따라감
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+METRICS_JSON_LOGS = os.getenv("METRICS_JSON_LOGS", "0") == "1"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help_text, labels
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                yield f"{self.name}{_label_text(self.labels, key)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, buckets
+        self._values: Dict[tuple, list] = {}  # key → [버킷별 개수..., 합계, 전체 개수]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            state = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, state):
+                    le = f'le="{bound}"'
+                    yield f"{self.name}_bucket{_label_text(self.labels, key, le)} {count}"
+                le = 'le="+Inf"'
+                yield f"{self.name}_bucket{_label_text(self.labels, key, le)} {state[-1]}"
+                yield f"{self.name}_sum{_label_text(self.labels, key)} {state[-2]}"
+                yield f"{self.name}_count{_label_text(self.labels, key)} {state[-1]}"
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help_text, labels
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def set(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                yield f"{self.name}{_label_text(self.labels, key)} {value}"
+
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "라우트별 HTTP 응답 시간", ("method", "route", "status"))
+STAGE_SECONDS = Histogram("pipeline_stage_duration_seconds", "파이프라인 단계별 실행 시간", ("pipeline", "stage", "outcome"))
+LLM_REQUESTS = Counter("llm_requests_total", "LLM API 호출 수 (캐시 적중 제외)", ("model", "outcome"))
+LLM_TOKENS = Counter("llm_tokens_total", "LLM 토큰 사용량", ("model", "kind"))
+LLM_RETRIES = Counter("llm_retries_total", "일시적 오류로 다시 보낸 LLM 호출 수", ("model", "error"))
+CACHE_LOOKUPS = Counter("cache_lookups_total", "디스크 캐시 조회 결과", ("cache", "result"))
+DB_QUERIES = Counter("db_queries_total", "실행한 SQL 문 수", ("route",))
+WRITE_BEHIND_FLUSHES = Counter("write_behind_flushes_total", "풀이 기록 지연 저장 묶음 처리 결과", ("outcome",))
+QUESTION_POOL_REQUESTS = Counter("question_pool_requests_total", "문제 풀 조회 결과 (hit: 풀에서 제공, fallback: 요청 안에서 생성)", ("outcome",))
+QUESTION_POOL_DEPTH = Gauge("question_pool_fresh_questions", "아직 아무에게도 나가지 않은 풀 문제 수 (이 프로세스가 읽은 키 기준)", ("difficulty",))
+DB_QUERIES_PER_REQUEST = Histogram("db_queries_per_request", "요청 하나가 실행한 SQL 문 수", ("route",), COUNT_BUCKETS)
+
+
+class RequestStats:
+    """요청 하나 동안의 집계 (미들웨어가 만들고, 각 계층이 채움)"""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.db_queries = 0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cache_hits = 0
+        self.stages = []  # [(pipeline, stage, 초)]
+        self._lock = threading.Lock()
+
+    def add(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                setattr(self, name, getattr(self, name) + amount)
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_request() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def begin_request(method: str, path: str):
+    stats = RequestStats(method, path)
+    return stats, _current.set(stats)
+
+
+def end_request(stats: RequestStats, token, status: int, seconds: float, route: str):
+    """route: 실제 경로(/quiz/123) 대신 경로 템플릿(/quiz/{id}) → 라벨 종류가 늘지 않게"""
+    _current.reset(token)
+    REQUEST_SECONDS.observe(seconds, method=stats.method, route=route, status=str(status))
+    DB_QUERIES.inc(stats.db_queries, route=route)
+    DB_QUERIES_PER_REQUEST.observe(stats.db_queries, route=route)
+    if METRICS_JSON_LOGS:
+        log_event(
+            "request", method=stats.method, path=stats.path, route=route, status=status,
+            duration_ms=round(seconds * 1000, 1), db_queries=stats.db_queries, llm_calls=stats.llm_calls,
+            prompt_tokens=stats.prompt_tokens, completion_tokens=stats.completion_tokens,
+            cache_hits=stats.cache_hits,
+            stages=[{"pipeline": p, "stage": s, "ms": round(sec * 1000, 1)} for p, s, sec in stats.stages]
+        )
+
+
+def log_event(event: str, **fields):
+    if METRICS_JSON_LOGS:
+        print(json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, ensure_ascii=False), flush=True)
+
+
+@contextmanager
+def span(pipeline: str, stage: str):
+    """with span("analysis", "extract"): ... → 단계 시간 히스토그램 + 현재 요청 로그에 기록 (async 코드 안에서도 사용 가능)"""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, pipeline=pipeline, stage=stage, outcome=outcome)
+        stats = current_request()
+        if stats is not None:
+            with stats._lock:
+                stats.stages.append((pipeline, stage, seconds))
+        if outcome == "error":
+            log_event("stage_error", pipeline=pipeline, stage=stage, duration_ms=round(seconds * 1000, 1))
+
+
+def record_llm_call(model: str, outcome: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+    LLM_REQUESTS.inc(model=model, outcome=outcome)
+    if prompt_tokens or completion_tokens:
+        LLM_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+        LLM_TOKENS.inc(completion_tokens, model=model, kind="completion")
+    stats = current_request()
+    if stats is not None:
+        stats.add(llm_calls=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+    stats = current_request()
+    if stats is not None and hit:
+        stats.add(cache_hits=1)
+
+
+def instrument_engine(engine):
+    """SQLAlchemy 엔진의 SQL 실행마다 쿼리 수 집계"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count_query(conn, cursor, statement, parameters, context, executemany):
+        stats = current_request()
+        if stats is not None:
+            stats.add(db_queries=1)
+        else:
+            DB_QUERIES.inc(route="background")  # 백그라운드 작업 등 요청 밖에서 실행된 쿼리
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -1,5 +1,5 @@
 from database import Base, get_db, engine
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean, TIMESTAMP, text, Float, Date, Enum
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean, TIMESTAMP, text, Float, Date, Enum, BigInteger, DateTime
 
 class User(Base):
     __tablename__ = "users"
@@ -36,6 +36,7 @@ class QuestionAttempt(Base):
     is_correct = Column(Boolean, nullable=False)
     answer = Column(Text)
     attempt_date = Column(Date, nullable=False, server_default=text("CURDATE()"))
+    submission_id = Column(String(32), unique=True)  # write-behind 제출 ID (재시도 시 중복 방지)
 
 # class WeakKeyword(Base):
 #     __tablename__ = "weak_keywords"
@@ -53,6 +54,47 @@ class WeakKeywordLog(Base):
     is_incorrect = Column(Boolean, nullable=False)
     occurred_at = Column(TIMESTAMP, nullable=False, server_default=text("CURRENT_TIMESTAMP"))
 
+class UserKeywordStat(Base):
+    # 사용자 × 키워드 풀이 통계 (keyword_stats.record_attempt가 문제 제출 때마다 갱신)
+    __tablename__ = "user_keyword_stats"
+    user_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True)
+    keyword_id = Column(Integer, ForeignKey("keywords.keyword_id"), primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    incorrect_count = Column(Integer, nullable=False, default=0)
+    last_seen_at = Column(TIMESTAMP)
+    last_incorrect_at = Column(TIMESTAMP)
+    weakness_key = Column(Float)
+
+class ReviewSchedule(Base):
+    # 간격 반복 복습 일정 (review_scheduler.record_review가 문제 제출 때마다 갱신)
+    __tablename__ = "review_schedule"
+    user_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True)
+    question_id = Column(Integer, ForeignKey("questions.question_id"), primary_key=True)
+    repetitions = Column(Integer, nullable=False, default=0)
+    interval_days = Column(Float, nullable=False, default=0)
+    ease = Column(Float, nullable=False, default=2.5)
+    lapses = Column(Integer, nullable=False, default=0)
+    last_reviewed_at = Column(DateTime)
+    due_at = Column(DateTime, nullable=False)
+
+class QuestionPoolEntry(Base):
+    # 미리 만들어 둔 문제 풀 (question_pool.py), payload는 options/tags까지 포함한 생성 응답 JSON
+    __tablename__ = "question_pool"
+    question_id = Column(Integer, ForeignKey("questions.question_id"), primary_key=True)
+    slide_id = Column(Integer, ForeignKey("slides.slide_id"), nullable=False)
+    keyword_id = Column(Integer, ForeignKey("keywords.keyword_id"), nullable=False)
+    difficulty = Column(String(10), nullable=False)
+    payload = Column(Text, nullable=False)
+    served_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
+
+class UserSeenQuestion(Base):
+    # 사용자가 풀에서 받은 문제 (같은 문제를 다시 주지 않기 위함)
+    __tablename__ = "user_seen_questions"
+    user_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True)
+    question_id = Column(Integer, ForeignKey("questions.question_id"), primary_key=True)
+    seen_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
+
 class Keyword(Base):
     __tablename__ = "keywords"
     keyword_id = Column(Integer, primary_key=True, index=True)
@@ -90,6 +132,31 @@ class QuestionKeyword(Base):
     question_id = Column(Integer, ForeignKey("questions.question_id"), primary_key=True)
     keyword_id = Column(Integer, ForeignKey("keywords.keyword_id"), primary_key=True)
 
+class MaterialVersion(Base):
+    # 강의자료의 슬라이드/문제 변경 버전 (DB 트리거가 증가시킴, 강의자료 번들 캐시 검증용)
+    __tablename__ = "material_versions"
+    material_id = Column(Integer, ForeignKey("lecture_materials.material_id"), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
+
+class MaterialConcept(Base):
+    # 강의자료별 개념맵 노드 (개념어는 keywords 테이블 공유 → 강의자료 간 연결)
+    __tablename__ = "material_concepts"
+    material_id = Column(Integer, ForeignKey("lecture_materials.material_id"), primary_key=True)
+    keyword_id = Column(Integer, ForeignKey("keywords.keyword_id"), primary_key=True)
+    subtopic = Column(String(255))
+    importance = Column(Integer)
+    tfidf = Column(Float)
+    description = Column(Text)
+
+class ConceptEdge(Base):
+    # 개념어 간 관계(상위-하위, 원인-결과 등), 어느 강의자료의 분석에서 나왔는지 함께 저장
+    __tablename__ = "concept_edges"
+    material_id = Column(Integer, ForeignKey("lecture_materials.material_id"), primary_key=True)
+    source_keyword_id = Column(Integer, ForeignKey("keywords.keyword_id"), primary_key=True)
+    target_keyword_id = Column(Integer, ForeignKey("keywords.keyword_id"), primary_key=True)
+    relation_type = Column(String(50), primary_key=True)
+
 class DailyStudyTime(Base):
     __tablename__ = "daily_study_time"
     study_date = Column(Date, primary_key=True)
@@ -0,0 +1,170 @@
+# ocr_engine.py
+# 텍스트 레이어가 없는(스캔/이미지) 슬라이드를 위한 파이썬 OCR 단계
+# - 글자가 거의 없는 페이지만 골라 PyMuPDF로 렌더링 후 pytesseract로 인식
+# - 페이지 단위 작업을 프로세스 풀에서 병렬 실행, 페이지별 타임아웃, 처리량(pages/s) 보고
+# - 렌더링된 페이지 이미지 해시 + 언어/엔진 설정으로 인식 결과를 디스크에 캐시 (업로드/사용자 간 공유)
+import functools
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Tuple
+
+import fitz
+import pytesseract
+from PIL import Image
+
+from disk_cache import DiskCache
+
+OCR_ENABLED = os.getenv("OCR_ENABLED", "1") == "1"
+OCR_MIN_TEXT_CHARS = int(os.getenv("OCR_MIN_TEXT_CHARS", "20"))  # 이보다 글자가 적은 페이지는 OCR 대상
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_LANG = os.getenv("OCR_LANG", "kor")
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+OCR_PAGE_TIMEOUT = float(os.getenv("OCR_PAGE_TIMEOUT", "30"))  # 페이지당 최대 인식 시간(초)
+# 기본값은 저장소에 포함된 backend/kor.traineddata를 쓰도록 backend 폴더
+TESSDATA_DIR = os.getenv("TESSDATA_DIR", os.path.dirname(os.path.abspath(__file__)))
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "1") == "1"
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+_pool = None
+_pool_lock = threading.Lock()
+_worker_doc = None  # 워커 프로세스에서 마지막으로 연 문서 (같은 PDF의 페이지가 연달아 오므로 재사용)
+_cache = None  # (pid, DiskCache)
+
+
+def tesseract_config(lang: str = OCR_LANG) -> str:
+    # TESSDATA_DIR에 필요한 언어 파일이 모두 있을 때만 지정, 아니면 시스템 tessdata 사용
+    langs = lang.split("+")
+    if all(os.path.exists(os.path.join(TESSDATA_DIR, f"{l}.traineddata")) for l in langs):
+        return f'--tessdata-dir "{TESSDATA_DIR}"'
+    return ""
+
+
+def get_cache() -> DiskCache:
+    # 워커는 fork로 만들어지므로 부모 프로세스의 sqlite 연결을 물려받지 않도록 프로세스마다 따로 엶
+    global _cache
+    if _cache is None or _cache[0] != os.getpid():
+        _cache = (os.getpid(), DiskCache("ocr", OCR_CACHE_MAX_BYTES))
+    return _cache[1]
+
+
+@functools.lru_cache(maxsize=1)
+def engine_version() -> str:
+    try:
+        return f"tesseract-{pytesseract.get_tesseract_version()}"
+    except Exception:
+        return "tesseract-unknown"
+
+
+def ocr_cache_key(image: bytes, lang: str, dpi: int = None) -> str:
+    """이미지 바이트 해시 + 인식 설정(언어, 렌더링 DPI, 엔진 버전, tessdata 위치)"""
+    settings = [hashlib.sha256(image).hexdigest(), lang, dpi, engine_version(), tesseract_config(lang)]
+    return hashlib.sha256(json.dumps(settings).encode("utf-8")).hexdigest()
+
+
+def find_textless_pages(slide_texts: List[str], min_chars: int = OCR_MIN_TEXT_CHARS) -> List[int]:
+    """텍스트 레이어가 (거의) 없는 페이지 번호 목록 (1부터)"""
+    return [i for i, text in enumerate(slide_texts, start=1) if len("".join(text.split())) < min_chars]
+
+
+def render_page_png(pdf_path: str, page_no: int, dpi: int = OCR_DPI) -> bytes:
+    global _worker_doc
+    if _worker_doc is None or _worker_doc.name != pdf_path:
+        if _worker_doc is not None:
+            _worker_doc.close()
+        _worker_doc = fitz.open(pdf_path)
+    pix = _worker_doc[page_no - 1].get_pixmap(dpi=dpi)
+    return pix.tobytes("png")
+
+
+def recognize_png(png: bytes, lang: str = OCR_LANG, timeout: float = OCR_PAGE_TIMEOUT) -> str:
+    with Image.open(io.BytesIO(png)) as image:
+        return pytesseract.image_to_string(image, lang=lang, config=tesseract_config(lang), timeout=timeout)
+
+
+def recognize_cached(image: bytes, lang: str = OCR_LANG, timeout: float = OCR_PAGE_TIMEOUT,
+                     dpi: int = None) -> Tuple[str, bool]:
+    """캐시에 같은 이미지/설정의 결과가 있으면 OCR 없이 반환. (텍스트, 캐시 적중 여부)"""
+    key = ocr_cache_key(image, lang, dpi) if OCR_CACHE_ENABLED else None
+    if key:
+        cached = get_cache().get(key)
+        if cached is not None:
+            return cached.decode("utf-8"), True
+    text = recognize_png(image, lang, timeout)
+    if key:
+        get_cache().set(key, text.encode("utf-8"))
+    return text, False
+
+
+def _ocr_page(pdf_path: str, page_no: int, dpi: int, lang: str, timeout: float) -> Tuple[str, bool]:
+    # 워커 프로세스에서 실행: 이미지도 워커에서 렌더링해서 큰 이미지를 프로세스 간에 주고받지 않음
+    try:
+        return recognize_cached(render_page_png(pdf_path, page_no, dpi), lang, timeout, dpi)
+    except RuntimeError:
+        raise
+    except Exception as e:
+        # pytesseract 예외 일부(TesseractNotFoundError 등)는 부모 프로세스에서 unpickle이 안 돼 풀이 깨지므로 변환
+        raise OSError(f"{type(e).__name__}: {e}") from None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS)
+        return _pool
+
+
+def ocr_pages(pdf_path: str, page_numbers: List[int], dpi: int = OCR_DPI, lang: str = OCR_LANG,
+              timeout: float = OCR_PAGE_TIMEOUT) -> Tuple[Dict[int, str], dict]:
+    """page_numbers 페이지들을 병렬 OCR. (페이지 번호 → 텍스트, 통계) 반환. 실패/시간초과 페이지는 결과에서 빠짐"""
+    start = time.perf_counter()
+    pool = get_pool()
+    futures = {page_no: pool.submit(_ocr_page, pdf_path, page_no, dpi, lang, timeout) for page_no in page_numbers}
+    texts, failed, timed_out, cache_hits = {}, [], [], 0
+    for page_no, future in futures.items():
+        try:
+            # tesseract 자체 timeout에 렌더링/대기 여유분을 더해 기다림
+            texts[page_no], cached = future.result(timeout=timeout * 2 + 5)
+            cache_hits += cached
+        except BrokenProcessPool as e:
+            # 워커가 비정상 종료됨 → 풀을 버리고 다음 호출 때 새로 생성
+            print(f"OCR 워커 비정상 종료 (page {page_no}): {e}")
+            failed.append(page_no)
+            shutdown()
+        except (FutureTimeoutError, RuntimeError) as e:
+            # pytesseract는 시간 초과 시 RuntimeError("Tesseract process timeout")
+            if isinstance(e, FutureTimeoutError) or "timeout" in str(e).lower():
+                timed_out.append(page_no)
+            else:
+                failed.append(page_no)
+            future.cancel()
+        except Exception as e:
+            print(f"OCR 실패 (page {page_no}): {e}")
+            failed.append(page_no)
+    elapsed = time.perf_counter() - start
+    stats = {
+        "pages": len(page_numbers),
+        "recognized": len(texts),
+        "cache_hits": cache_hits,
+        "failed": failed,
+        "timed_out": timed_out,
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(len(texts) / elapsed, 2) if elapsed > 0 else 0.0,
+        "dpi": dpi,
+        "lang": lang,
+    }
+    return texts, stats
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
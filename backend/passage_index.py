@@ -0,0 +1,113 @@
+# passage_index.py
+# 요청마다 페이지 텍스트로 만드는 BM25 문단 인덱스
+# - LLM 프롬프트에 강의자료 전체 대신, 해당 개념어가 등장하는 상위 문단만 토큰 예산 안에서 넣기 위함
+import math
+import os
+import re
+from typing import List
+
+import numpy as np
+
+PASSAGE_TOKEN_BUDGET = int(os.getenv("PASSAGE_TOKEN_BUDGET", "1500"))    # 개념어 배치당 문맥 토큰 예산
+OVERVIEW_TOKEN_BUDGET = int(os.getenv("OVERVIEW_TOKEN_BUDGET", "3000"))  # 소주제 추출용 전체 개요 토큰 예산
+CHARS_PER_TOKEN = 1.5   # 한국어 기준 대략적인 글자/토큰 비율 (토크나이저 없이 예산 계산용)
+MIN_CHUNK_CHARS = 80    # 너무 짧은 문단은 앞 문단과 합침
+MAX_CHUNK_CHARS = 600   # 너무 긴 문단은 잘라서 나눔
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _split_page(text: str) -> List[str]:
+    # 빈 줄 기준 문단 → 긴 문단은 줄 단위로 MAX_CHUNK_CHARS까지 묶음 → 짧은 조각은 앞 조각과 합침
+    pieces = []
+    for para in re.split(r"\n\s*\n", text):
+        current = ""
+        for line in para.split("\n"):
+            line = re.sub(r"\s+", " ", line).strip()
+            if not line:
+                continue
+            if current and len(current) + len(line) + 1 > MAX_CHUNK_CHARS:
+                pieces.append(current)
+                current = ""
+            current = f"{current} {line}" if current else line
+        if current:
+            pieces.append(current)
+    chunks = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) < MIN_CHUNK_CHARS:
+            chunks[-1] = f"{chunks[-1]} {piece}"
+        else:
+            chunks.append(piece)
+    # 줄 하나가 MAX_CHUNK_CHARS보다 긴 경우만 글자 단위로 자름
+    return [c[i:i + MAX_CHUNK_CHARS] for c in chunks for i in range(0, len(c), MAX_CHUNK_CHARS)]
+
+
+class PassageIndex:
+    def __init__(self, slide_texts: List[str]):
+        self.pages = slide_texts
+        self.chunks = []       # 문단 텍스트
+        self.chunk_pages = []  # 문단이 속한 페이지 번호(1부터)
+        for page_no, text in enumerate(slide_texts, start=1):
+            for chunk in _split_page(text):
+                self.chunks.append(chunk)
+                self.chunk_pages.append(page_no)
+        self._lowered = [c.lower() for c in self.chunks]
+        self._lengths = np.array([len(c) for c in self.chunks], dtype=np.float32)
+        self._avg_len = float(self._lengths.mean()) if self.chunks else 0.0
+
+    def scores(self, terms: List[str]) -> np.ndarray:
+        """문단 × 용어 BM25 점수 행렬 (한국어 조사 때문에 부분문자열 출현 횟수를 tf로 사용)"""
+        lowered = [t.lower() for t in terms]
+        tf = np.array([[c.count(t) for t in lowered] for c in self._lowered], dtype=np.float32)
+        n = len(self.chunks)
+        df = (tf > 0).sum(axis=0)
+        idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths / self._avg_len)
+        return idf * tf * (BM25_K1 + 1) / (tf + norm[:, None])
+
+    def context_for(self, terms: List[str], token_budget: int = PASSAGE_TOKEN_BUDGET) -> str:
+        """terms 관련 상위 문단을 토큰 예산 안에서 골라 페이지 순서대로 이어 붙임 (고른 문단이 없으면 개요)"""
+        terms = [t for t in terms if t]
+        if not self.chunks or not terms:
+            return self.overview(token_budget)
+        scores = self.scores(terms)
+        # 1) 용어마다 최고 점수 문단을 먼저 넣어 모든 용어가 최소 한 번은 문맥을 갖게 하고
+        # 2) 남은 예산은 합계 점수 순으로 채움
+        totals = scores.sum(axis=1)
+        order = [int(i) for i in scores.argmax(axis=0)] + [int(i) for i in np.argsort(-totals)]
+        chosen, used = set(), 0
+        for i in order:
+            if i in chosen or totals[i] <= 0:
+                continue
+            cost = estimate_tokens(self.chunks[i])
+            if used + cost > token_budget:
+                continue
+            chosen.add(i)
+            used += cost
+        if not chosen:
+            # 어떤 용어도 자료에 안 나오면(모든 점수 0) 빈 문맥 대신 자료 개요를 같은 예산으로 넣음
+            return self.overview(token_budget)
+        return self._render(sorted(chosen))
+
+    def overview(self, token_budget: int = OVERVIEW_TOKEN_BUDGET) -> str:
+        """자료 전체 구조 파악용: 페이지마다 앞부분을 고르게 잘라 예산 안에서 이어 붙임"""
+        texts = [re.sub(r"\s+", " ", p).strip() for p in self.pages]
+        budget_chars = int(token_budget * CHARS_PER_TOKEN)
+        if sum(len(t) for t in texts) <= budget_chars:
+            return "\n".join(f"[p.{i}] {t}" for i, t in enumerate(texts, start=1) if t)
+        # 짧은 페이지가 남긴 몫은 긴 페이지들이 나눠 가짐
+        remaining, pending = budget_chars, sorted((len(t), i) for i, t in enumerate(texts) if t)
+        limits = {}
+        while pending:
+            share = remaining // len(pending)
+            length, i = pending.pop(0)
+            limits[i] = min(length, share)
+            remaining -= limits[i]
+        return "\n".join(f"[p.{i + 1}] {texts[i][:limits[i]]}" for i in sorted(limits))
+
+    def _render(self, chunk_ids: List[int]) -> str:
+        return "\n".join(f"[p.{self.chunk_pages[i]}] {self.chunks[i]}" for i in chunk_ids)
@@ -0,0 +1,63 @@
+# pdf_extract.py
+# 업로드된 PDF의 텍스트 추출 서비스
+# - 요청마다 받은 파일 객체/바이트를 그대로 읽음 (공용 임시 파일을 쓰지 않아 동시 업로드가 섞이지 않음)
+# - 페이지 텍스트는 리스트에 모았다가 마지막에 한 번만 join (선형 시간)
+# - 백엔드 선택: pymupdf(빠름, 기본값) / pdfplumber(레이아웃 보존이 중요할 때)
+import io
+import os
+from typing import BinaryIO, Iterator, List, Union
+
+import fitz
+import pdfplumber
+from fastapi import HTTPException
+
+PDF_TEXT_BACKEND = os.getenv("PDF_TEXT_BACKEND", "pymupdf")
+
+PdfSource = Union[str, bytes, BinaryIO]  # 파일 경로, 바이트, 파일 객체(UploadFile.file 등)
+
+
+def _pymupdf_pages(source: PdfSource) -> Iterator[str]:
+    if isinstance(source, str):
+        doc = fitz.open(source)
+    else:
+        data = source if isinstance(source, bytes) else source.read()
+        doc = fitz.open(stream=data, filetype="pdf")
+    with doc:
+        for page in doc:
+            yield page.get_text()
+
+
+def _pdfplumber_pages(source: PdfSource) -> Iterator[str]:
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    with pdfplumber.open(source) as pdf:
+        for page in pdf.pages:
+            # 텍스트가 없는 페이지(이미지 슬라이드)는 None을 반환
+            yield page.extract_text() or ""
+            page.flush_cache()  # 페이지별 파싱 결과를 바로 해제해서 큰 문서에서도 메모리가 늘지 않게
+
+
+EXTRACT_BACKENDS = {
+    "pymupdf": _pymupdf_pages,
+    "pdfplumber": _pdfplumber_pages,
+}
+
+
+def iter_page_texts(source: PdfSource, backend: str = PDF_TEXT_BACKEND) -> Iterator[str]:
+    if backend not in EXTRACT_BACKENDS:
+        raise ValueError(f"지원하지 않는 PDF 추출 백엔드: {backend} (가능: {', '.join(EXTRACT_BACKENDS)})")
+    return EXTRACT_BACKENDS[backend](source)
+
+
+def extract_page_texts(source: PdfSource, backend: str = PDF_TEXT_BACKEND) -> List[str]:
+    try:
+        return list(iter_page_texts(source, backend))
+    except ValueError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"PDF 텍스트 추출 실패: {str(e)}")
+
+
+def extract_text(source: PdfSource, backend: str = PDF_TEXT_BACKEND) -> str:
+    """문서 전체 텍스트 (페이지마다 줄바꿈)"""
+    return "".join(text + "\n" for text in extract_page_texts(source, backend))
@@ -0,0 +1,71 @@
+# pdf_ingest.py
+# PDF 업로드 수집 레이어
+# - 업로드를 메모리에 통째로 올리지 않고 청크 단위로 디스크에 쓰면서 SHA-256을 같이 계산
+# - 문서는 한 번만 열고, 페이지를 하나씩 읽어 PageRecord로 내보내는 제너레이터 제공
+import hashlib
+from typing import Iterator, List, NamedTuple
+
+import fitz
+from fastapi import HTTPException, UploadFile
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+TITLE_CANDIDATES = 3  # 페이지마다 제목 후보로 남길 앞쪽 줄 수
+DEFAULT_TITLE = "제목없음"
+
+
+class PageRecord(NamedTuple):
+    page_no: int                 # 1부터 시작
+    text: str
+    title_candidates: List[str]  # 페이지 앞쪽의 비어있지 않은 줄
+
+
+async def save_upload(file: UploadFile, dest_path: str) -> str:
+    """업로드를 dest_path에 청크 단위로 저장하고 SHA-256(hex)을 반환"""
+    digest = hashlib.sha256()
+    with open(dest_path, "wb") as out:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest()
+
+
+def file_sha256(path: str) -> str:
+    """디스크에 있는 파일의 SHA-256(hex), 청크 단위로 읽음 (save_upload와 같은 값)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_pages(pdf_path: str) -> Iterator[PageRecord]:
+    """문서를 한 번 열어 페이지 순서대로 PageRecord를 하나씩 생성"""
+    try:
+        doc = fitz.open(pdf_path)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"PDF 텍스트 추출 실패: {str(e)}")
+    with doc:
+        for page in doc:
+            text = page.get_text()
+            lines = []
+            for line in text.split("\n"):
+                line = line.strip()
+                if line:
+                    lines.append(line)
+                    if len(lines) == TITLE_CANDIDATES:
+                        break
+            yield PageRecord(
+                page_no=page.number + 1,
+                text=text,
+                title_candidates=lines
+            )
+
+
+def title_from_record(record) -> str:
+    """첫 페이지의 첫 줄을 강의자료 제목으로 사용"""
+    if record is None or not record.title_candidates:
+        return DEFAULT_TITLE
+    return record.title_candidates[0]
@@ -0,0 +1,185 @@
+# question_dedup.py
+# 문제 본문(questions.content) 유사도 인덱스: 문자 3-gram MinHash + LSH
+# - 문제마다 MinHash 서명(QUESTION_DEDUP_NUM_PERM개)을 만들고 QUESTION_DEDUP_BANDS개 밴드로 나눠 버킷에 넣음
+#   → 같은 버킷에 걸린 후보만 서명 일치율(Jaccard 추정)로 비교, 전체 문제와 비교하지 않음
+# - 생성한 문제가 기존 문제와 QUESTION_DEDUP_THRESHOLD 이상 비슷하면 저장하지 않음 (gpt_generate)
+# - 비슷한 문제끼리는 같은 그룹(처음 들어온 문제 ID)으로 묶어서, 문제 풀은 본 문제와 같은 그룹의 문제도 본 것으로 취급
+# - 인덱스는 프로세스 메모리에 처음 한 번 전체를 올리고, 이후에는 이 프로세스가 저장한 문제를 바로 추가 +
+#   QUESTION_DEDUP_REFRESH_SECONDS마다 마지막으로 읽은 question_id 이후 행만 읽어서 다른 워커가 저장한 문제 반영
+import os
+import re
+import threading
+import time
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Question
+
+QUESTION_DEDUP_ENABLED = os.getenv("QUESTION_DEDUP_ENABLED", "1") == "1"
+QUESTION_DEDUP_THRESHOLD = float(os.getenv("QUESTION_DEDUP_THRESHOLD", "0.8"))   # 이 이상이면 중복 문제
+QUESTION_DEDUP_NUM_PERM = int(os.getenv("QUESTION_DEDUP_NUM_PERM", "64"))
+QUESTION_DEDUP_BANDS = int(os.getenv("QUESTION_DEDUP_BANDS", "16"))               # NUM_PERM의 약수여야 함
+QUESTION_DEDUP_REFRESH_SECONDS = int(os.getenv("QUESTION_DEDUP_REFRESH_SECONDS", "30"))
+QUESTION_DEDUP_RETRIES = int(os.getenv("QUESTION_DEDUP_RETRIES", "1"))            # 중복이면 새로 생성해 볼 횟수
+
+SHINGLE_SIZE = 3
+LOAD_BATCH_SIZE = 2000
+_PRIME = (1 << 32) + 15  # 32비트 해시보다 큰 소수
+_rng = np.random.RandomState(20240601)  # 워커마다 같은 서명이 나오도록 고정
+_A = _rng.randint(1, 1 << 31, size=QUESTION_DEDUP_NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, 1 << 31, size=QUESTION_DEDUP_NUM_PERM).astype(np.uint64)
+
+
+class DuplicateQuestion(Exception):
+    def __init__(self, question_id: int):
+        super().__init__(f"기존 문제와 중복: {question_id}")
+        self.question_id = question_id
+
+
+def normalize(content: str) -> str:
+    # 공백/문장부호/대소문자 차이는 무시
+    return re.sub(r"[^\w]", "", (content or "").lower())
+
+
+def signature(content: str) -> np.ndarray:
+    text = normalize(content)
+    if len(text) <= SHINGLE_SIZE:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """두 서명의 일치 비율 = 3-gram 집합 Jaccard 유사도 추정치"""
+    return float(np.mean(a == b))
+
+
+class SimilarityIndex:
+    def __init__(self, num_perm: int = QUESTION_DEDUP_NUM_PERM, bands: int = QUESTION_DEDUP_BANDS):
+        self.rows = num_perm // bands
+        self.bands = bands
+        self._signatures: Dict[int, np.ndarray] = {}
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+        self._group: Dict[int, int] = {}  # question_id → 그룹 대표 question_id
+        self._max_id = 0
+        self._loaded = False
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    def _band_keys(self, sig: np.ndarray):
+        for band in range(self.bands):
+            yield band, sig[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _best_match(self, sig: np.ndarray, threshold: float) -> Optional[Tuple[int, float]]:
+        candidates = set()
+        for key in self._band_keys(sig):
+            candidates.update(self._buckets.get(key, ()))
+        if not candidates:
+            return None
+        candidates = list(candidates)
+        scores = (np.stack([self._signatures[qid] for qid in candidates]) == sig).mean(axis=1)
+        best = int(np.argmax(scores))
+        return (candidates[best], float(scores[best])) if scores[best] >= threshold else None
+
+    def _add(self, question_id: int, sig: np.ndarray):
+        if question_id in self._signatures:
+            return
+        match = self._best_match(sig, QUESTION_DEDUP_THRESHOLD)
+        self._group[question_id] = self._group[match[0]] if match else question_id
+        self._signatures[question_id] = sig
+        for key in self._band_keys(sig):
+            self._buckets[key].append(question_id)
+
+    def add(self, question_id: int, content: str):
+        """이 프로세스에서 저장한 문제를 바로 인덱스에 추가"""
+        sig = signature(content)
+        with self._lock:
+            self._add(question_id, sig)
+
+    def refresh(self, db: Session):
+        """처음이면 전체, 이후에는 QUESTION_DEDUP_REFRESH_SECONDS마다 마지막으로 읽은 question_id 이후 행만 읽음"""
+        with self._lock:
+            if self._loaded and time.time() - self._refreshed_at <= QUESTION_DEDUP_REFRESH_SECONDS:
+                return
+            after = self._max_id if self._loaded else 0
+        started = time.time()
+        while True:
+            rows = db.execute(
+                select(Question.question_id, Question.content)
+                .where(Question.question_id > after)
+                .order_by(Question.question_id)
+                .limit(LOAD_BATCH_SIZE)
+            ).fetchall()
+            signed = [(row[0], signature(row[1])) for row in rows]
+            with self._lock:
+                for question_id, sig in signed:
+                    self._add(question_id, sig)
+                # 이 프로세스가 add()로 먼저 넣은 문제보다 작은 ID가 다른 워커에서 늦게 커밋될 수 있으므로 DB에서 읽은 행 기준으로만 진행
+                if rows:
+                    self._max_id = max(self._max_id, rows[-1][0])
+            if len(rows) < LOAD_BATCH_SIZE:
+                break
+            after = rows[-1][0]
+        with self._lock:
+            if not self._loaded:
+                print(f"문제 유사도 인덱스 생성: {len(self._signatures)}개, {time.time() - started:.1f}초")
+            self._loaded = True
+            self._refreshed_at = time.time()
+
+    def find_duplicate(self, db: Session, content: str, threshold: float = QUESTION_DEDUP_THRESHOLD) -> Optional[int]:
+        """content와 threshold 이상 비슷한 기존 문제 중 가장 비슷한 question_id"""
+        self.refresh(db)
+        sig = signature(content)
+        with self._lock:
+            match = self._best_match(sig, threshold)
+        return match[0] if match else None
+
+    def group(self, question_id: int) -> int:
+        with self._lock:
+            return self._group.get(question_id, question_id)
+
+    def group_map(self, question_ids: Iterable[int]) -> Dict[int, int]:
+        with self._lock:
+            return {qid: self._group.get(qid, qid) for qid in question_ids}
+
+    def groups(self, question_ids: Iterable[int]) -> Set[int]:
+        with self._lock:
+            return {self._group.get(qid, qid) for qid in question_ids}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": QUESTION_DEDUP_ENABLED,
+                "questions": len(self._signatures),
+                "groups": len(set(self._group.values())),
+                "buckets": len(self._buckets),
+                "max_question_id": self._max_id,
+                "threshold": QUESTION_DEDUP_THRESHOLD,
+                "bands": self.bands,
+                "rows_per_band": self.rows
+            }
+
+
+QUESTION_INDEX = SimilarityIndex()
+
+
+def check_duplicate(db: Session, content: str):
+    """저장 전에 호출: 기존 문제와 중복이면 DuplicateQuestion"""
+    if not QUESTION_DEDUP_ENABLED or not content:
+        return
+    duplicate = QUESTION_INDEX.find_duplicate(db, content)
+    if duplicate is not None:
+        raise DuplicateQuestion(duplicate)
+
+
+def index_question(question_id: int, content: str):
+    """저장 후 호출: 다음 생성부터 중복 검사 대상에 포함"""
+    if QUESTION_DEDUP_ENABLED and content:
+        QUESTION_INDEX.add(question_id, content)
@@ -0,0 +1,137 @@
+# question_listing.py
+# 문제 목록 조회 (/quiz/all, /questions 공용)
+# - question_id 기준 키셋(커서) 페이지네이션: WHERE question_id > :after ORDER BY question_id LIMIT n
+#   → OFFSET과 달리 뒤 페이지로 가도 앞 행을 다시 읽지 않음
+# - 문제별 키워드는 배치마다 question_keywords를 한 번만 조회 (문제당 쿼리 X)
+# - format=json/ndjson은 배치 단위로 읽으면서 바로 내보내므로 결과 행 수와 관계없이 메모리 사용량 일정
+import json
+from typing import Dict, Iterator, List, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Question, QuestionKeyword, Slide
+
+STREAM_BATCH_SIZE = 500
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+LIST_FORMATS = ("json", "ndjson", "page")
+
+
+class QuestionFilter:
+    def __init__(self, slide_id: int = None, material_id: int = None, keyword_id: int = None,
+                 difficulty: str = None):
+        self.slide_id = slide_id
+        self.material_id = material_id
+        self.keyword_id = keyword_id
+        self.difficulty = difficulty
+
+    def apply(self, stmt):
+        if self.slide_id is not None:
+            stmt = stmt.where(Question.slide_id == self.slide_id)
+        if self.material_id is not None:
+            stmt = stmt.where(Question.slide_id.in_(
+                select(Slide.slide_id).where(Slide.material_id == self.material_id)
+            ))
+        if self.keyword_id is not None:
+            stmt = stmt.where(Question.question_id.in_(
+                select(QuestionKeyword.question_id).where(QuestionKeyword.keyword_id == self.keyword_id)
+            ))
+        if self.difficulty is not None:
+            stmt = stmt.where(Question.difficulty == self.difficulty)
+        return stmt
+
+
+def keyword_ids_by_question(db: Session, question_ids: List[int]) -> Dict[int, List[int]]:
+    """문제 여러 개의 keyword_id를 쿼리 한 번으로 조회"""
+    keyword_ids = {qid: [] for qid in question_ids}
+    if question_ids:
+        rows = db.execute(
+            select(QuestionKeyword.question_id, QuestionKeyword.keyword_id)
+            .where(QuestionKeyword.question_id.in_(question_ids))
+            .order_by(QuestionKeyword.question_id, QuestionKeyword.keyword_id)
+        )
+        for qid, kid in rows:
+            keyword_ids[qid].append(kid)
+    return keyword_ids
+
+
+def fetch_page(db: Session, filters: QuestionFilter, after: Optional[int], limit: int,
+               with_keywords: bool) -> List[dict]:
+    stmt = select(
+        Question.question_id, Question.slide_id, Question.question_type,
+        Question.content, Question.answer, Question.explanation
+    )
+    stmt = filters.apply(stmt)
+    if after is not None:
+        stmt = stmt.where(Question.question_id > after)
+    rows = db.execute(stmt.order_by(Question.question_id).limit(limit)).fetchall()
+    items = [
+        {
+            "question_id": row[0],
+            "slide_id": row[1],
+            "type": row[2],
+            "content": row[3],
+            "answer": row[4],
+            "explanation": row[5]
+        }
+        for row in rows
+    ]
+    if with_keywords:
+        keyword_ids = keyword_ids_by_question(db, [item["question_id"] for item in items])
+        for item in items:
+            item["keyword_ids"] = keyword_ids[item["question_id"]]
+    return items
+
+
+def iter_questions(db: Session, filters: QuestionFilter, after: Optional[int], limit: Optional[int],
+                   with_keywords: bool) -> Iterator[dict]:
+    """키셋 배치로 끝까지(또는 limit개까지) 순회"""
+    remaining = limit
+    while remaining is None or remaining > 0:
+        batch_size = STREAM_BATCH_SIZE if remaining is None else min(STREAM_BATCH_SIZE, remaining)
+        items = fetch_page(db, filters, after, batch_size, with_keywords)
+        yield from items
+        if len(items) < batch_size:
+            break
+        after = items[-1]["question_id"]
+        if remaining is not None:
+            remaining -= len(items)
+
+
+def _json_array(items: Iterator[dict]) -> Iterator[str]:
+    yield "["
+    for i, item in enumerate(items):
+        yield ("," if i else "") + json.dumps(item, ensure_ascii=False)
+    yield "]"
+
+
+def _ndjson(items: Iterator[dict]) -> Iterator[str]:
+    for item in items:
+        yield json.dumps(item, ensure_ascii=False) + "\n"
+
+
+def list_questions(db: Session, filters: QuestionFilter, fmt: str, after: Optional[int], limit: Optional[int],
+                   with_keywords: bool):
+    """
+    fmt=json   : 기존과 같은 JSON 배열을 스트리밍 (limit 없으면 전체)
+    fmt=ndjson : 한 줄에 문제 하나 (마지막 줄의 question_id를 다음 after로 사용)
+    fmt=page   : {"items": [...], "next_cursor": 다음 after 값 또는 null}
+    """
+    if fmt not in LIST_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format은 {', '.join(LIST_FORMATS)} 중 하나여야 합니다.")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit은 1 이상이어야 합니다.")
+    if fmt == "page":
+        page_size = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+        # 한 행 더 읽어서 다음 페이지가 있는지 확인
+        items = fetch_page(db, filters, after, page_size + 1, with_keywords)
+        has_more = len(items) > page_size
+        items = items[:page_size]
+        return {"items": items, "next_cursor": items[-1]["question_id"] if has_more else None}
+    items = iter_questions(db, filters, after, limit, with_keywords)
+    if fmt == "ndjson":
+        return StreamingResponse(_ndjson(items), media_type="application/x-ndjson")
+    return StreamingResponse(_json_array(items), media_type="application/json")
@@ -0,0 +1,381 @@
+# question_pool.py
+# 미리 만들어 둔 문제 풀 (/quiz/generate 요청에 user_id를 보내면 사용)
+# - (slide_id, keyword_id, difficulty)별로 생성해 둔 문제를 question_pool에 보관 (options/tags까지 생성 응답 JSON 그대로)
+# - 요청은 LLM 호출 없이 풀에서 이 사용자가 아직 안 본 문제를 바로 꺼냄, 본 문제는 user_seen_questions에 기록 → 같은 문제를 두 번 받지 않음
+# - 아직 아무에게도 안 나간 문제 수가 QUESTION_POOL_LOW_WATER 아래로 내려가면 백그라운드 스레드가 QUESTION_POOL_TARGET까지 채움
+#   (프롬프트 재료는 slides 테이블의 제목/개념 설명/키워드/중요 문장/요약)
+# - 본 문제와 거의 같은 문제(question_dedup 유사도 그룹)도 본 것으로 취급
+# - 풀에 안 본 문제가 없으면 같은 슬라이드/키워드/난이도로 저장된 기존 문제 중 안 본 문제를 재사용하고,
+#   그것도 없으면 기존처럼 요청 안에서 생성(fallback)한 뒤 만든 문제는 풀에 넣어 다른 사용자에게 재사용
+# - 키별 문제 목록과 사용자별 본 문제 집합은 프로세스 메모리에 올려두고 QUESTION_POOL_TTL_SECONDS마다 DB에서 다시 읽음
+# - 키마다 내줄 순서 큐(새 문제 먼저, 그다음 덜 나간 순)를 두고 앞에서 꺼냄, 사용자가 본 문제는 꺼낼 때 건너뜀
+#   (꺼낸 문제는 큐 뒤로) → 보통 첫 항목에서 끝나고, 최악(사용자가 키의 문제를 거의 다 봄)에도 키의 문제 수만큼만 확인
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+import metrics
+import question_dedup
+from database import SessionLocal
+from models import Keyword, Question, QuestionKeyword, QuestionPoolEntry, Slide, SlideKeyword
+
+QUESTION_POOL_ENABLED = os.getenv("QUESTION_POOL_ENABLED", "1") == "1"
+QUESTION_POOL_LOW_WATER = int(os.getenv("QUESTION_POOL_LOW_WATER", "2"))    # 새 문제가 이보다 적으면 채우기 시작
+QUESTION_POOL_TARGET = int(os.getenv("QUESTION_POOL_TARGET", "5"))          # 한 번 채울 때 새 문제 목표 개수
+QUESTION_POOL_WORKERS = int(os.getenv("QUESTION_POOL_WORKERS", "2"))        # 동시에 채우는 키 수 (LLM 호출 스레드)
+QUESTION_POOL_TTL_SECONDS = int(os.getenv("QUESTION_POOL_TTL_SECONDS", "30"))
+QUESTION_POOL_MAX_KEYS = int(os.getenv("QUESTION_POOL_MAX_KEYS", "5000"))   # 메모리에 올릴 키 수 (LRU)
+QUESTION_POOL_SEEN_USERS = int(os.getenv("QUESTION_POOL_SEEN_USERS", "2000"))  # 본 문제 집합을 유지할 사용자 수 (LRU)
+
+DIFFICULTIES = ("하", "중", "상")
+
+PoolKey = Tuple[int, int, str]  # (slide_id, keyword_id, difficulty)
+
+
+class KeyPool:
+    """키 하나의 풀 문제 + 내줄 순서 큐 + 아직 아무에게도 안 나간 문제"""
+
+    def __init__(self, rows):
+        # rows: (question_id, served_count), 나간 횟수 → question_id 순
+        self.ids: Set[int] = {qid for qid, _ in rows}
+        self.queue = deque(qid for qid, _ in rows)
+        self.fresh: Set[int] = {qid for qid, served in rows if not served}
+        self.loaded_at = time.time()
+
+    def pop_unseen(self, seen: "UserSeen") -> Optional[int]:
+        """앞에서부터 이 사용자가 안 본 문제 하나 (확인한 문제는 모두 큐 뒤로 보냄)"""
+        for _ in range(len(self.queue)):
+            question_id = self.queue.popleft()
+            self.queue.append(question_id)
+            if not seen.covers(question_id):
+                self.fresh.discard(question_id)
+                return question_id
+        return None
+
+    def push(self, question_id: int, fresh: bool):
+        if question_id in self.ids:
+            return
+        self.ids.add(question_id)
+        if fresh:
+            self.fresh.add(question_id)
+            self.queue.appendleft(question_id)
+        else:
+            self.queue.append(question_id)
+
+
+class UserSeen:
+    """사용자가 받았거나 푼 question_id + 그 문제들의 유사도 그룹 (거의 같은 문제도 본 것으로 취급)"""
+
+    def __init__(self, question_ids: Set[int]):
+        self.ids = set(question_ids)
+        self.groups = question_dedup.QUESTION_INDEX.groups(self.ids) if question_dedup.QUESTION_DEDUP_ENABLED else set()
+        self.loaded_at = time.time()
+
+    def add(self, question_id: int):
+        self.ids.add(question_id)
+        if question_dedup.QUESTION_DEDUP_ENABLED:
+            self.groups.add(question_dedup.QUESTION_INDEX.group(question_id))
+
+    def covers(self, question_id: int) -> bool:
+        if question_id in self.ids:
+            return True
+        return bool(self.groups) and question_dedup.QUESTION_INDEX.group(question_id) in self.groups
+
+
+def slide_context(db: Session, slide_id: int, keyword_id: int) -> dict:
+    """백그라운드 생성용 프롬프트 재료 (/quiz/generate 요청 본문과 같은 항목)"""
+    slide = db.get(Slide, slide_id)
+    if slide is None:
+        raise ValueError(f"슬라이드를 찾을 수 없습니다: {slide_id}")
+    keywords = [k.strip() for k in (slide.main_keywords or "").split(",") if k.strip()]
+    keyword = db.get(Keyword, keyword_id)
+    if keyword is not None and keyword.keyword_name not in keywords:
+        keywords.insert(0, keyword.keyword_name)
+    return {
+        "slide_title": slide.slide_title or "",
+        "concept_explanation": slide.concept_explanation or "",
+        "image_description": None,
+        "keywords": keywords,
+        "important_sentences": [s for s in (slide.important_sentences or "").split("\n") if s.strip()],
+        "slide_summary": slide.summary or ""
+    }
+
+
+def load_question(db: Session, question_id: int) -> dict:
+    """저장된 문제를 생성 응답과 같은 형식으로 (풀에 있으면 options/tags 포함), 재사용 표시(reused) 포함"""
+    question = db.get(Question, question_id)
+    payload = db.execute(
+        select(QuestionPoolEntry.payload).where(QuestionPoolEntry.question_id == question_id)
+    ).scalar()
+    if payload:
+        parsed = json.loads(payload)
+    else:
+        parsed = {"type": question.question_type, "question": question.content, "options": None,
+                  "correct_answer": question.answer, "explanation": question.explanation, "tags": []}
+    parsed.update(question_id=question_id, difficulty=question.difficulty, reused=True)
+    return parsed
+
+
+class QuestionPool:
+    def __init__(self, generate: Callable, session_factory=SessionLocal, generate_batch: Callable = None):
+        """
+        generate(db, slide_id, keyword_id, context, difficulty, fresh) → 저장까지 마친 문제 dict (question_id 포함)
+        generate_batch(db, [{"slide_id", "keyword_id", "difficulty"}], fresh) → (문제 목록, 버린 수), 있으면 채우기에 사용
+        """
+        self.generate = generate
+        self.generate_batch = generate_batch
+        self.session_factory = session_factory
+        self._keys: "OrderedDict[PoolKey, KeyPool]" = OrderedDict()
+        self._seen: "OrderedDict[int, UserSeen]" = OrderedDict()
+        self._refilling: Set[PoolKey] = set()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._stats = {"hits": 0, "fallbacks": 0, "reused": 0, "refills": 0, "refill_errors": 0, "generated": 0}
+
+    def _pool(self, db: Session, key: PoolKey) -> KeyPool:
+        with self._lock:
+            pool = self._keys.get(key)
+            if pool is not None and time.time() - pool.loaded_at <= QUESTION_POOL_TTL_SECONDS:
+                self._keys.move_to_end(key)
+                return pool
+        slide_id, keyword_id, difficulty = key
+        rows = db.execute(
+            select(QuestionPoolEntry.question_id, QuestionPoolEntry.served_count)
+            .where(QuestionPoolEntry.slide_id == slide_id, QuestionPoolEntry.keyword_id == keyword_id,
+                   QuestionPoolEntry.difficulty == difficulty)
+            .order_by(QuestionPoolEntry.served_count, QuestionPoolEntry.question_id)
+        ).fetchall()
+        pool = KeyPool([(row[0], row[1]) for row in rows])
+        with self._lock:
+            self._keys[key] = pool
+            self._keys.move_to_end(key)
+            while len(self._keys) > QUESTION_POOL_MAX_KEYS:
+                self._keys.popitem(last=False)
+        self._update_depth()
+        return pool
+
+    def _seen_by(self, db: Session, user_id: int) -> UserSeen:
+        """이 사용자가 받았거나 푼 question_id (+ 유사도 그룹)"""
+        if question_dedup.QUESTION_DEDUP_ENABLED:
+            question_dedup.QUESTION_INDEX.refresh(db)
+        with self._lock:
+            cached = self._seen.get(user_id)
+            if cached is not None and time.time() - cached.loaded_at <= QUESTION_POOL_TTL_SECONDS:
+                self._seen.move_to_end(user_id)
+                return cached
+        seen = UserSeen({row[0] for row in db.execute(
+            text("""
+                SELECT question_id FROM user_seen_questions WHERE user_id = :uid
+                UNION
+                SELECT question_id FROM question_attempts WHERE user_id = :uid
+            """),
+            {"uid": user_id}
+        )})
+        with self._lock:
+            self._seen[user_id] = seen
+            self._seen.move_to_end(user_id)
+            while len(self._seen) > QUESTION_POOL_SEEN_USERS:
+                self._seen.popitem(last=False)
+        return seen
+
+    def take(self, db: Session, user_id: int, slide_id: int, keyword_id: int, difficulty: str) -> Optional[dict]:
+        """풀에서 이 사용자가 안 본 문제 하나 (없으면 None → 호출한 쪽에서 바로 생성 후 add)"""
+        key = (slide_id, keyword_id, difficulty)
+        pool = self._pool(db, key)
+        seen = self._seen_by(db, user_id)
+        with self._lock:
+            question_id = pool.pop_unseen(seen)
+            if question_id is not None:
+                seen.add(question_id)
+            self._stats["hits" if question_id is not None else "fallbacks"] += 1
+        metrics.QUESTION_POOL_REQUESTS.inc(outcome="hit" if question_id is not None else "fallback")
+        self._maybe_refill(key, pool)
+        if question_id is None:
+            return None
+        payload = db.execute(
+            select(QuestionPoolEntry.payload).where(QuestionPoolEntry.question_id == question_id)
+        ).scalar()
+        self._mark_served(db, user_id, question_id)
+        db.commit()
+        self._update_depth()
+        parsed = json.loads(payload)
+        parsed["question_id"] = question_id
+        parsed["difficulty"] = difficulty
+        return parsed
+
+    def is_unseen(self, db: Session, user_id: int, question_id: int) -> bool:
+        """이 사용자가 question_id(또는 거의 같은 문제)를 아직 받거나 풀지 않았는지"""
+        seen = self._seen_by(db, user_id)
+        with self._lock:
+            return not seen.covers(question_id)
+
+    def reuse_existing(self, db: Session, user_id: int, keyword_ids: List[int], difficulty: str,
+                       slide_id: Optional[int] = None) -> Optional[dict]:
+        """
+        LLM 호출 전에 확인: keyword_ids 중 하나에 연결된 같은 난이도의 저장된 문제(slide_id가 있으면 그 슬라이드만) 중
+        이 사용자가 안 본 문제가 있으면 재사용 (reused 표시, 본 문제로 기록). 없으면 None
+        """
+        seen = self._seen_by(db, user_id)
+        query = (
+            select(Question.question_id)
+            .join(QuestionKeyword, QuestionKeyword.question_id == Question.question_id)
+            .where(QuestionKeyword.keyword_id.in_(keyword_ids), Question.difficulty == difficulty)
+        )
+        if slide_id is not None:
+            query = query.where(Question.slide_id == slide_id)
+        rows = db.execute(query.distinct().order_by(Question.question_id)).fetchall()
+        with self._lock:
+            question_id = next((row[0] for row in rows if not seen.covers(row[0])), None)
+        if question_id is None:
+            return None
+        parsed = load_question(db, question_id)
+        self.mark_seen(db, user_id, question_id)
+        with self._lock:
+            self._stats["reused"] += 1
+        return parsed
+
+    def add(self, db: Session, key: PoolKey, parsed: dict, served_to: int = None):
+        """생성한 문제를 풀에 추가 (served_to: 요청 안에서 만들어 바로 내준 사용자)"""
+        slide_id, keyword_id, difficulty = key
+        question_id = parsed["question_id"]
+        payload = {k: v for k, v in parsed.items() if k not in ("question_id", "difficulty", "slide_id", "keyword_id")}
+        db.add(QuestionPoolEntry(
+            question_id=question_id, slide_id=slide_id, keyword_id=keyword_id, difficulty=difficulty,
+            payload=json.dumps(payload, ensure_ascii=False), served_count=0
+        ))
+        if served_to is not None:
+            db.flush()
+            self._mark_served(db, served_to, question_id)
+        db.commit()
+        with self._lock:
+            pool = self._keys.get(key)
+            if pool is not None:
+                pool.push(question_id, fresh=served_to is None)
+            if served_to is not None and served_to in self._seen:
+                self._seen[served_to].add(question_id)
+        self._update_depth()
+
+    def mark_seen(self, db: Session, user_id: int, question_id: int):
+        """풀 밖에서 기존 문제를 재사용해 내준 경우에도 본 문제로 기록"""
+        self._mark_served(db, user_id, question_id)
+        db.commit()
+        with self._lock:
+            if user_id in self._seen:
+                self._seen[user_id].add(question_id)
+
+    def _mark_served(self, db: Session, user_id: int, question_id: int):
+        db.execute(
+            text("""
+                INSERT INTO user_seen_questions (user_id, question_id, seen_at)
+                VALUES (:uid, :qid, CURRENT_TIMESTAMP)
+                ON DUPLICATE KEY UPDATE seen_at = CURRENT_TIMESTAMP
+            """),
+            {"uid": user_id, "qid": question_id}
+        )
+        db.execute(
+            text("UPDATE question_pool SET served_count = served_count + 1 WHERE question_id = :qid"),
+            {"qid": question_id}
+        )
+
+    def _maybe_refill(self, key: PoolKey, pool: KeyPool) -> bool:
+        with self._lock:
+            if len(pool.fresh) >= QUESTION_POOL_LOW_WATER or key in self._refilling:
+                return False
+            self._refilling.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=QUESTION_POOL_WORKERS,
+                                                    thread_name_prefix="question-pool")
+            executor = self._executor
+        executor.submit(self._refill, key)
+        return True
+
+    def _refill(self, key: PoolKey):
+        slide_id, keyword_id, difficulty = key
+        db = self.session_factory()
+        try:
+            with metrics.span("question_pool", "refill"):
+                # 다른 워커가 이미 채웠을 수 있으므로 DB 기준으로 부족한 개수만 생성
+                with self._lock:
+                    self._keys.pop(key, None)
+                need = QUESTION_POOL_TARGET - len(self._pool(db, key).fresh)
+                # 캐시된 응답을 쓰면 같은 문제가 반복되므로 항상 새로 생성
+                if need <= 0:
+                    generated = []
+                elif self.generate_batch is not None:
+                    spec = {"slide_id": slide_id, "keyword_id": keyword_id, "difficulty": difficulty}
+                    generated, _ = self.generate_batch(db, [dict(spec) for _ in range(need)], True)
+                else:
+                    context = slide_context(db, slide_id, keyword_id)
+                    generated = []
+                    for _ in range(need):
+                        try:
+                            parsed = self.generate(db, slide_id, keyword_id, context, difficulty, True)
+                        except question_dedup.DuplicateQuestion:
+                            continue
+                        if not parsed.get("reused"):  # 기존 문제 재사용은 풀에 새로 넣지 않음
+                            generated.append(parsed)
+                for parsed in generated:
+                    self.add(db, key, parsed)
+                with self._lock:
+                    self._stats["generated"] += len(generated)
+            with self._lock:
+                self._stats["refills"] += 1
+        except Exception as e:
+            db.rollback()
+            with self._lock:
+                self._stats["refill_errors"] += 1
+            print(f"문제 풀 채우기 실패 {key}: {e}")
+        finally:
+            db.close()
+            with self._lock:
+                self._refilling.discard(key)
+
+    def prefill(self, db: Session, slide_id: int, keyword_ids: List[int] = None,
+                difficulties: Tuple[str, ...] = DIFFICULTIES) -> int:
+        """수업 전에 슬라이드의 키워드 × 난이도 풀을 미리 채움 → 채우기를 시작한 키 수"""
+        if not keyword_ids:
+            keyword_ids = [row[0] for row in db.execute(
+                select(SlideKeyword.keyword_id).where(SlideKeyword.slide_id == slide_id)
+            )]
+        scheduled = 0
+        for keyword_id in keyword_ids:
+            for difficulty in difficulties:
+                key = (slide_id, keyword_id, difficulty)
+                scheduled += self._maybe_refill(key, self._pool(db, key))
+        return scheduled
+
+    def _update_depth(self):
+        depth: Dict[str, int] = {d: 0 for d in DIFFICULTIES}
+        with self._lock:
+            for (_, _, difficulty), pool in self._keys.items():
+                depth[difficulty] = depth.get(difficulty, 0) + len(pool.fresh)
+        for difficulty, count in depth.items():
+            metrics.QUESTION_POOL_DEPTH.set(count, difficulty=difficulty)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            served = self._stats["hits"] + self._stats["fallbacks"]
+            return {
+                **self._stats,
+                "enabled": QUESTION_POOL_ENABLED,
+                "fallback_rate": round(self._stats["fallbacks"] / served, 4) if served else 0.0,
+                "keys": len(self._keys),
+                "fresh": sum(len(p.fresh) for p in self._keys.values()),
+                "refilling": len(self._refilling),
+                "seen_users": len(self._seen),
+                "low_water": QUESTION_POOL_LOW_WATER,
+                "target": QUESTION_POOL_TARGET
+            }
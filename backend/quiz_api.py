@@ -1,11 +1,18 @@
 # -*- coding: utf-8 -*-
-from fastapi import APIRouter, Depends, Body
+from typing import Optional
+from fastapi import APIRouter, Depends, Body, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func, select, text
-from models import Question, QuestionAttempt, Keyword, WeakKeywordLog, Slide
+from sqlalchemy import func, insert, select, text
+from models import Question, QuestionAttempt, QuestionKeyword, Keyword, WeakKeywordLog, Slide
 from database import get_db
 from auth import get_current_user
-from schemas import QuizGenerationResponse, RegisterQuestionRequest
+from schemas import QuizGenerationResponse, RegisterQuestionRequest, SubmitBatchRequest
+from question_listing import QuestionFilter, list_questions
+import keyword_stats
+import review_scheduler
+import write_behind
+import question_dedup
+from datetime import datetime
 
 
 router = APIRouter()
@@ -14,7 +21,7 @@ router = APIRouter()
 def get_wrong_notes(user_id: int, db: Session = Depends(get_db)):
     results = db.execute(
         text("""
-            SELECT q.content, q.question_type, k.keyword_name, qa.answer, q.answer, q.explanation, qa.is_correct, qa.attempt_date
+            SELECT q.content, q.question_type, k.keyword_name, qa.answer, q.answer, q.explanation, qa.is_correct, qa.attempt_date, qa.submission_id
             FROM question_attempts qa
             JOIN questions q ON qa.question_id = q.question_id
             JOIN question_keywords qk ON q.question_id = qk.question_id
@@ -23,7 +30,7 @@ def get_wrong_notes(user_id: int, db: Session = Depends(get_db)):
         """),
         {"uid": user_id}
     ).fetchall()
-    return [
+    notes = [
         {
             "question": row[0],
             "type": row[1],
@@ -37,17 +44,38 @@ def get_wrong_notes(user_id: int, db: Session = Depends(get_db)):
         for row in results
     ]
 
+    # 아직 저장되지 않은(write-behind 대기 중) 오답도 포함 (저장 직후 아직 큐에 남은 항목은 submission_id로 중복 제거)
+    saved = {row[8] for row in results if row[8]}
+    pending = [e for e in write_behind.WRITE_BEHIND.pending_for(user_id)
+               if not e.is_correct and e.submission_id not in saved]
+    if pending:
+        rows = db.execute(
+            select(Question.question_id, Question.content, Question.question_type, Keyword.keyword_name,
+                   Question.answer, Question.explanation)
+            .join(QuestionKeyword, QuestionKeyword.question_id == Question.question_id)
+            .join(Keyword, Keyword.keyword_id == QuestionKeyword.keyword_id)
+            .where(Question.question_id.in_({e.question_id for e in pending}))
+        ).fetchall()
+        for e in pending:
+            for row in rows:
+                if row[0] == e.question_id:
+                    notes.append({
+                        "question": row[1],
+                        "type": row[2],
+                        "keyword": row[3],
+                        "user_answer": e.answer,
+                        "correct_answer": row[4],
+                        "explanation": row[5],
+                        "is_correct": False,
+                        "attempt_date": str(datetime.fromtimestamp(e.submitted_at).date())
+                    })
+    return notes
+
 
 @router.get("/quiz/weak-review")
 def weak_review(user_id: int, db: Session = Depends(get_db)):
-    # 오답이 가장 많은 키워드 집계 쿼리로 추출
-    weak = (
-        db.query(WeakKeywordLog.keyword_id, func.count().label("incorrect_count"))
-        .filter(WeakKeywordLog.user_id == user_id, WeakKeywordLog.is_incorrect == True)
-        .group_by(WeakKeywordLog.keyword_id)
-        .order_by(func.count().desc())
-        .first()
-    )
+    # 약점 점수(오답 수, 시간 감쇠)가 가장 높은 키워드 → user_keyword_stats 인덱스 조회
+    weak = keyword_stats.top_weak_keywords(db, user_id, 1, write_behind.pending_counts_for(user_id))
     if not weak:
         return []
     questions = db.execute(
@@ -57,10 +85,14 @@ def weak_review(user_id: int, db: Session = Depends(get_db)):
             JOIN question_keywords k ON q.question_id = k.question_id
             WHERE k.keyword_id = :kid
         """),
-        {"kid": weak[0]}
+        {"kid": weak[0]["keyword_id"]}
     ).fetchall()
     return [{"question_id": row[0], "content": row[1]} for row in questions]
 
+@router.get("/quiz/weak-keywords")
+def weak_keywords(user_id: int, top_n: int = 10, db: Session = Depends(get_db)):
+    return keyword_stats.top_weak_keywords(db, user_id, top_n, write_behind.pending_counts_for(user_id))
+
 @router.get("/quiz/my-attempts")
 def get_my_attempts(user_id: int, material_id: int = None, db: Session = Depends(get_db)):
     query = db.query(QuestionAttempt, Question).join(Question, Question.question_id == QuestionAttempt.question_id)
@@ -108,17 +140,24 @@ def register_question(
             {"qid": question.question_id, "kid": kid}
         )
     db.commit()
+    question_dedup.index_question(question.question_id, question.content)
 
     return {
         "question_id": question.question_id,
         "message": "문제가 성공적으로 저장되었습니다."
     }
 
+def grade_answer(question_type: str, correct_answer: str, user_answer: str) -> bool:
+    if question_type in ['객관식', '참거짓']:
+        return user_answer.strip().lower() == correct_answer.strip().lower()
+    return user_answer.strip().lower() == correct_answer.strip().lower()
+
 @router.post("/quiz/submit")
 def submit_quiz(
     user_id: int = Body(...),
     question_id: int = Body(...),
     user_answer: str = Body(...),
+    quality: Optional[int] = Body(None, ge=0, le=5),  # 자기 평가(SM-2, 0~5), 없으면 정답 4 / 오답 1
     db: Session = Depends(get_db)
 ):
     # 문제 정보 조회
@@ -128,12 +167,29 @@ def submit_quiz(
         raise HTTPException(status_code=404, detail="문제를 찾을 수 없습니다.")
 
     # 정답 비교
-    if question.question_type in ['객관식', '참거짓']:
-        is_correct = (user_answer.strip().lower() == question.answer.strip().lower())
-    else:
-        is_correct = (user_answer.strip().lower() == question.answer.strip().lower())
+    is_correct = grade_answer(question.question_type, question.answer, user_answer)
 
-    # 풀이 기록 저장
+    # question_keywords에서 keyword_id 가져오기
+    keyword_ids = [row[0] for row in db.execute(
+        text("SELECT keyword_id FROM question_keywords WHERE question_id = :qid"),
+        {"qid": question_id}
+    )]
+
+    # 지연 저장 모드: 채점 결과만 바로 반환하고 기록은 write_behind 큐에서 일괄 저장 (큐가 가득 차면 아래 동기 저장)
+    if write_behind.QUIZ_WRITE_BEHIND:
+        entry = write_behind.PendingAttempt(user_id, question_id, user_answer, is_correct, keyword_ids, quality)
+        if write_behind.WRITE_BEHIND.enqueue(entry):
+            return {
+                "question_id": question_id,
+                "is_correct": is_correct,
+                "correct_answer": question.answer,
+                "explanation": question.explanation,
+                "attempt_id": None,
+                "submission_id": entry.submission_id,
+                "next_review_at": None
+            }
+
+    # 풀이 기록 + 오답 로그 + 키워드 통계를 한 트랜잭션으로 저장
     attempt = QuestionAttempt(
         user_id=user_id,
         question_id=question_id,
@@ -141,16 +197,8 @@ def submit_quiz(
         is_correct=is_correct
     )
     db.add(attempt)
-    db.commit()
-    db.refresh(attempt)
-
     # 오답일 경우 weak_keyword_logs에 기록
     if not is_correct:
-        # question_keywords에서 keyword_id 가져오기
-        keyword_ids = [row[0] for row in db.execute(
-            text("SELECT keyword_id FROM question_keywords WHERE question_id = :qid"),
-            {"qid": question_id}
-        )]
         for kid in keyword_ids:
             weak_log = WeakKeywordLog(
                 user_id=user_id,
@@ -159,35 +207,135 @@ def submit_quiz(
                 is_incorrect=True
             )
             db.add(weak_log)
-        db.commit()
+    keyword_stats.record_attempt(db, user_id, keyword_ids, is_correct)
+    due_at = review_scheduler.record_review(db, user_id, question_id, is_correct, quality)
+    db.commit()
+    db.refresh(attempt)
+    review_scheduler.DUE_QUEUES.update(user_id, question_id, due_at)
 
     return {
         "question_id": question_id,
         "is_correct": is_correct,
         "correct_answer": question.answer,
         "explanation": question.explanation,
-        "attempt_id": attempt.attempt_id
+        "attempt_id": attempt.attempt_id,
+        "next_review_at": due_at.isoformat(timespec="seconds")
     }
 
+@router.post("/quiz/submit-batch")
+def submit_quiz_batch(data: SubmitBatchRequest, db: Session = Depends(get_db)):
+    # 풀이 세션 전체를 한 번에 채점: 문제+키워드 한 번 조회 → 메모리에서 채점 → 한 트랜잭션으로 일괄 저장
+    question_ids = {a.question_id for a in data.answers}
+    questions, keywords = {}, {}
+    for row in db.execute(
+        select(Question.question_id, Question.question_type, Question.answer, Question.explanation,
+               QuestionKeyword.keyword_id)
+        .outerjoin(QuestionKeyword, QuestionKeyword.question_id == Question.question_id)
+        .where(Question.question_id.in_(question_ids))
+    ):
+        questions[row[0]] = row
+        keywords.setdefault(row[0], [])
+        if row[4] is not None:
+            keywords[row[0]].append(row[4])
+    missing = sorted(question_ids - questions.keys())
+    if missing:
+        raise HTTPException(status_code=404, detail=f"문제를 찾을 수 없습니다: {missing}")
+
+    graded = [
+        (a, grade_answer(questions[a.question_id][1], questions[a.question_id][2], a.user_answer))
+        for a in data.answers
+    ]
+    attempts = [
+        {"user_id": data.user_id, "question_id": a.question_id, "answer": a.user_answer, "is_correct": ok}
+        for a, ok in graded
+    ]
+    weak_logs = [
+        {"user_id": data.user_id, "question_id": a.question_id, "keyword_id": kid, "is_incorrect": True}
+        for a, ok in graded if not ok for kid in keywords[a.question_id]
+    ]
+    keyword_counts = {}
+    for a, ok in graded:
+        for kid in keywords[a.question_id]:
+            n, wrong = keyword_counts.get(kid, (0, 0))
+            keyword_counts[kid] = (n + 1, wrong + (0 if ok else 1))
+
+    try:
+        db.execute(insert(QuestionAttempt), attempts)
+        if weak_logs:
+            db.execute(insert(WeakKeywordLog), weak_logs)
+        keyword_stats.record_attempts(db, data.user_id, keyword_counts)
+        due = review_scheduler.record_reviews(
+            db, data.user_id, [(a.question_id, ok, a.quality) for a, ok in graded]
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    for qid, due_at in due.items():
+        review_scheduler.DUE_QUEUES.update(data.user_id, qid, due_at)
+
+    correct = sum(1 for _, ok in graded if ok)
+    return {
+        "user_id": data.user_id,
+        "total": len(graded),
+        "correct": correct,
+        "score": round(correct / len(graded) * 100, 1),
+        "results": [
+            {
+                "question_id": a.question_id,
+                "is_correct": ok,
+                "correct_answer": questions[a.question_id][2],
+                "explanation": questions[a.question_id][3],
+                "next_review_at": due[a.question_id].isoformat(timespec="seconds")
+            }
+            for a, ok in graded
+        ]
+    }
+
+@router.get("/quiz/review/due")
+def get_due_reviews(user_id: int, limit: int = 20, db: Session = Depends(get_db)):
+    # 복습 시각이 지난 문제 (SM-2 일정, 오래 밀린 순)
+    due = review_scheduler.DUE_QUEUES.due(db, user_id, max(1, min(limit, 100)))
+    if not due:
+        return []
+    questions = {
+        q.question_id: q for q in db.query(
+            Question.question_id, Question.slide_id, Question.question_type, Question.content
+        ).filter(Question.question_id.in_([qid for qid, _ in due]))
+    }
+    return [
+        {
+            "question_id": qid,
+            "slide_id": questions[qid].slide_id,
+            "type": questions[qid].question_type,
+            "content": questions[qid].content,
+            "due_at": datetime.fromtimestamp(due_ts).isoformat(timespec="seconds")
+        }
+        for qid, due_ts in due if qid in questions
+    ]
+
+@router.get("/quiz/write-behind/stats")
+def write_behind_stats():
+    return write_behind.WRITE_BEHIND.stats()
+
+@router.on_event("shutdown")
+def drain_write_behind():
+    # 정상 종료 시 큐에 남은 풀이 기록을 모두 저장
+    left = write_behind.WRITE_BEHIND.drain()
+    if left:
+        print(f"종료 전 저장하지 못한 풀이 기록 {left}건을 실패 파일로 보냈습니다.")
+
 @router.get("/quiz/all")
-def get_all_questions(db: Session = Depends(get_db)):
-    questions = db.query(Question).all()
-    result = []
-    for q in questions:
-        # question_keywords 테이블에서 keyword_id 리스트 조회
-        keyword_ids = [row[0] for row in db.execute(
-            select([Keyword.keyword_id])
-            .select_from(Keyword)
-            .join('question_keywords', Keyword.keyword_id == text('question_keywords.keyword_id'))
-            .where(text('question_keywords.question_id = :qid')).params(qid=q.question_id)
-        )]
-        result.append({
-            "question_id": q.question_id,
-            "slide_id": q.slide_id,
-            "type": q.question_type,
-            "content": q.content,
-            "answer": q.answer,
-            "explanation": q.explanation,
-            "keyword_ids": keyword_ids
-        })
-    return result
\ No newline at end of file
+def get_all_questions(
+    slide_id: Optional[int] = None,
+    material_id: Optional[int] = None,
+    keyword_id: Optional[int] = None,
+    difficulty: Optional[str] = None,
+    after: Optional[int] = None,
+    limit: Optional[int] = None,
+    format: str = "json",
+    db: Session = Depends(get_db)
+):
+    # after(question_id 커서) + limit으로 이어서 조회, format=ndjson|page 지원 (question_listing 참고)
+    filters = QuestionFilter(slide_id, material_id, keyword_id, difficulty)
+    return list_questions(db, filters, format, after, limit, with_keywords=True)
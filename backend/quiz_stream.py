@@ -0,0 +1,111 @@
+# quiz_stream.py
+# 문제 생성 스트리밍(SSE)용 도구
+# - FieldStreamParser: GPT가 조각조각 보내는 JSON 객체에서 최상위 필드가 하나 완성될 때마다 (이름, 값)을 꺼냄
+#   → 전체 응답을 기다리지 않고 question, options, correct_answer, explanation 순서대로 바로 클라이언트에 전송
+# - 코드블록(```json) 등 첫 '{' 앞의 글자는 무시, 최상위 객체가 닫히면 done
+import json
+from typing import Iterator, List, Tuple
+
+
+class FieldStreamParser:
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.expect = "key"       # key → colon → value → (string/container 끝나면 after | scalar) → key ...
+        self.key = None
+        self.key_start = None
+        self.value_start = None
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, object]]:
+        """조각을 이어 붙이고, 이번에 완성된 최상위 필드 [(이름, 값)] 반환"""
+        self.buffer += chunk
+        fields = []
+        buf = self.buffer
+        while self.pos < len(buf) and not self.done:
+            i, c = self.pos, buf[self.pos]
+            self.pos += 1
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.expect == "key":
+                        self.key = self._loads(buf[self.key_start:i + 1])
+                        self.expect = "colon"
+                    elif self.depth == 1 and self.expect == "value":
+                        self._emit(fields, buf[self.value_start:i + 1])
+                        self.expect = "after"
+                continue
+            if self.depth == 0:
+                if c == "{":
+                    self.depth = 1
+                continue
+            if c == '"':
+                self.in_string = True
+                if self.depth == 1 and self.expect == "key":
+                    self.key_start = i
+                elif self.depth == 1 and self.expect == "value":
+                    self.value_start = i
+            elif c in "{[":
+                if self.depth == 1 and self.expect == "value":
+                    self.value_start = i
+                    self.expect = "container"
+                self.depth += 1
+            elif c in "}]":
+                self.depth -= 1
+                if self.depth == 1 and self.expect == "container":
+                    self._emit(fields, buf[self.value_start:i + 1])
+                    self.expect = "after"
+                elif self.depth == 0:
+                    if self.expect == "scalar":
+                        self._emit(fields, buf[self.value_start:i])
+                    self.done = True
+            elif self.depth == 1:
+                if c == ":" and self.expect == "colon":
+                    self.expect = "value"
+                elif c == ",":
+                    if self.expect == "scalar":
+                        self._emit(fields, buf[self.value_start:i])
+                    self.expect = "key"
+                elif self.expect == "value" and not c.isspace():
+                    # 숫자/true/false/null
+                    self.value_start = i
+                    self.expect = "scalar"
+        return fields
+
+    def _emit(self, fields: list, raw: str):
+        value = self._loads(raw.strip())
+        if self.key is not None and value is not _INVALID:
+            fields.append((self.key, value))
+        self.key = None
+        self.value_start = None
+
+    @staticmethod
+    def _loads(raw: str):
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return _INVALID
+
+
+_INVALID = object()
+
+
+def sse(event: str, data) -> str:
+    """SSE 이벤트 한 개 (data는 JSON)"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def stream_fields(chunks: Iterator[str]) -> Iterator[Tuple[str, object, str]]:
+    """LLM 조각 스트림 → (필드 이름, 값, 지금까지 받은 전체 본문), 스트림 끝에 (None, None, 전체 본문)"""
+    parser = FieldStreamParser()
+    for chunk in chunks:
+        for name, value in parser.feed(chunk):
+            yield name, value, parser.buffer
+    yield None, None, parser.buffer
@@ -0,0 +1,181 @@
+# review_scheduler.py
+# 간격 반복(SM-2) 복습 스케줄러
+# - (user_id, question_id)마다 반복 횟수/간격/난이도 계수(EF)/다음 복습 시각(due_at)을 review_schedule에 저장
+# - 문제 제출 때 풀이 기록과 같은 트랜잭션에서 갱신 → 복습 대상 조회에 question_attempts 이력을 읽지 않음
+# - "지금 복습할 문제 n개"는 (user_id, due_at) 인덱스 범위 조회, 자주 조회하는 사용자는 프로세스 메모리의 힙에서 바로 응답
+import heapq
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import metrics
+from models import ReviewSchedule
+
+REVIEW_HEAP_SIZE = int(os.getenv("REVIEW_HEAP_SIZE", "200"))           # 사용자당 메모리에 올릴 가장 이른 복습 항목 수
+REVIEW_HOT_USERS = int(os.getenv("REVIEW_HOT_USERS", "2000"))          # 힙을 유지할 최대 사용자 수 (LRU)
+REVIEW_HEAP_TTL_SECONDS = int(os.getenv("REVIEW_HEAP_TTL_SECONDS", "30"))  # 다른 워커의 제출을 반영하려고 다시 읽는 주기
+
+MIN_EASE = 1.3
+DEFAULT_EASE = 2.5
+
+
+def sm2(repetitions: int, interval_days: float, ease: float, quality: int):
+    """
+    SM-2: quality(0~5)가 3 미만이면 처음부터(1일 뒤), 이상이면 1일 → 6일 → 이전 간격 × EF
+    EF는 매 응답마다 EF + (0.1 - (5-q)(0.08 + (5-q)0.02)), 최소 1.3
+    """
+    ease = max(MIN_EASE, ease + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)))
+    if quality < 3:
+        return 0, 1.0, ease
+    repetitions += 1
+    if repetitions == 1:
+        interval_days = 1.0
+    elif repetitions == 2:
+        interval_days = 6.0
+    else:
+        interval_days = interval_days * ease
+    return repetitions, interval_days, ease
+
+
+def record_review(db: Session, user_id: int, question_id: int, is_correct: bool, quality: int = None,
+                  now: datetime = None) -> datetime:
+    """풀이 결과로 다음 복습 시각 계산 (commit은 호출한 쪽에서). 정답은 quality 4, 오답은 1로 간주"""
+    return record_reviews(db, user_id, [(question_id, is_correct, quality)], now)[question_id]
+
+
+def record_reviews(db: Session, user_id: int, answers: List[tuple], now: datetime = None) -> Dict[int, datetime]:
+    """[(question_id, 정답 여부, quality)]를 제출 순서대로 반영 → question_id별 다음 복습 시각 (기존 일정은 한 번에 조회)"""
+    now = now or datetime.now()
+    rows = {
+        row.question_id: row for row in db.query(ReviewSchedule).filter(
+            ReviewSchedule.user_id == user_id,
+            ReviewSchedule.question_id.in_({qid for qid, _, _ in answers})
+        ).with_for_update()
+    }
+    for question_id, is_correct, quality in answers:
+        if quality is None:
+            quality = 4 if is_correct else 1
+        row = rows.get(question_id)
+        if row is None:
+            row = rows[question_id] = ReviewSchedule(user_id=user_id, question_id=question_id, repetitions=0,
+                                                     interval_days=0.0, ease=DEFAULT_EASE, lapses=0)
+            db.add(row)
+        row.repetitions, row.interval_days, row.ease = sm2(row.repetitions, row.interval_days, row.ease, quality)
+        if quality < 3:
+            row.lapses += 1
+        row.last_reviewed_at = now
+        row.due_at = now + timedelta(days=row.interval_days)
+    return {qid: row.due_at for qid, row in rows.items()}
+
+
+class UserQueue:
+    """사용자 한 명의 가장 이른 복습 항목들 (due_at 최소 힙, 갱신은 새 항목을 넣고 이전 항목은 꺼낼 때 버림)"""
+
+    def __init__(self, rows, truncated: bool):
+        self.current = {qid: due for qid, due in rows}  # question_id → 유효한 due (timestamp)
+        self.heap = [(due, qid) for qid, due in rows]
+        heapq.heapify(self.heap)
+        # 일부만 올렸다면 마지막 항목의 due까지만 완전함 (그 뒤 항목은 DB에만 있음)
+        self.horizon = rows[-1][1] if truncated and rows else float("inf")
+        self.loaded_at = time.time()
+
+    def update(self, question_id: int, due: float):
+        if due <= self.horizon:
+            self.current[question_id] = due
+            heapq.heappush(self.heap, (due, question_id))
+        else:
+            self.current.pop(question_id, None)
+        if len(self.heap) > 2 * len(self.current) + 16:
+            self.heap = [(d, q) for d, q in self.heap if self.current.get(q) == d]
+            heapq.heapify(self.heap)
+
+    def due(self, now: float, limit: int) -> Optional[list]:
+        """now까지 도래한 항목 최대 limit개, 힙만으로 답할 수 없으면 None"""
+        items = heapq.nsmallest(limit, (
+            (d, q) for d, q in self.heap if d <= now and self.current.get(q) == d
+        ))
+        if len(items) < limit and self.horizon < now:
+            return None
+        return [(q, d) for d, q in items]
+
+
+class DueQueues:
+    def __init__(self, max_users: int = REVIEW_HOT_USERS):
+        self.max_users = max_users
+        self._queues: "OrderedDict[int, UserQueue]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session, user_id: int) -> UserQueue:
+        rows = db.execute(
+            text("""
+                SELECT question_id, due_at FROM review_schedule
+                WHERE user_id = :uid
+                ORDER BY due_at
+                LIMIT :n
+            """),
+            {"uid": user_id, "n": REVIEW_HEAP_SIZE}
+        ).fetchall()
+        return UserQueue([(row[0], _ts(row[1])) for row in rows], truncated=len(rows) >= REVIEW_HEAP_SIZE)
+
+    def due(self, db: Session, user_id: int, limit: int, now: float = None) -> List[tuple]:
+        """[(question_id, due timestamp)] 도래 시각 순"""
+        now = now or time.time()
+        with self._lock:
+            queue = self._queues.get(user_id)
+            if queue is not None and time.time() - queue.loaded_at <= REVIEW_HEAP_TTL_SECONDS:
+                self._queues.move_to_end(user_id)
+                items = queue.due(now, limit)
+                if items is not None:
+                    metrics.record_cache_lookup("review_queue", hit=True)
+                    return items
+        metrics.record_cache_lookup("review_queue", hit=False)
+        queue = self._load(db, user_id)
+        items = queue.due(now, limit)
+        with self._lock:
+            self._queues[user_id] = queue
+            self._queues.move_to_end(user_id)
+            while len(self._queues) > self.max_users:
+                self._queues.popitem(last=False)
+        if items is None:
+            # 도래한 항목이 힙 크기보다 많음 → 인덱스 범위 조회
+            rows = db.execute(
+                text("""
+                    SELECT question_id, due_at FROM review_schedule
+                    WHERE user_id = :uid AND due_at <= :now
+                    ORDER BY due_at
+                    LIMIT :n
+                """),
+                {"uid": user_id, "now": datetime.fromtimestamp(now), "n": limit}
+            ).fetchall()
+            items = [(row[0], _ts(row[1])) for row in rows]
+        return items
+
+    def update(self, user_id: int, question_id: int, due_at: datetime):
+        """이 프로세스에서 커밋한 제출 결과를 힙에 반영 (힙이 없는 사용자는 다음 조회 때 DB에서 읽음)"""
+        with self._lock:
+            queue = self._queues.get(user_id)
+            if queue is not None:
+                queue.update(question_id, _ts(due_at))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "users": len(self._queues),
+                "items": sum(len(q.current) for q in self._queues.values()),
+                "max_users": self.max_users
+            }
+
+
+def _ts(value) -> float:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+DUE_QUEUES = DueQueues()
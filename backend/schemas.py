@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 
 class QuizGenerationRequest(BaseModel):
@@ -42,3 +42,22 @@ class QuizGenerationResponse(BaseModel):
     correct_answer: str
     explanation: str
     tags: List[str]
+
+class SubmitAnswer(BaseModel):
+    question_id: int
+    user_answer: str
+    quality: Optional[int] = Field(None, ge=0, le=5)  # ڱ (SM-2),   4 /  1
+
+class SubmitBatchRequest(BaseModel):
+    user_id: int
+    answers: List[SubmitAnswer] = Field(..., min_length=1, max_length=200)  #   Ǯ 
+
+class BatchQuestionSpec(BaseModel):
+    slide_id: int
+    keyword_id: Optional[int] = None
+    difficulty: Optional[str] = None        # //,  
+    count: int = Field(1, ge=1, le=10)      #     
+
+class GenerateBatchRequest(BaseModel):
+    items: List[BatchQuestionSpec] = Field(..., min_length=1, max_length=20)
+    fresh: bool = False                     # True ĳø ϰ ׻   
@@ -10,6 +10,7 @@ const Tesseract = require('tesseract.js');
 const fs = require('fs');
 const { summarizeWithGPT, summarizeSlideWithGPT, summarizeMaterialWithGPT } = require('./summarizeWithGPT');
 const { fromPath } = require('pdf2pic');
+const axios = require('axios');
 require('dotenv').config();
 
 const app = express();
@@ -172,6 +173,23 @@ const authenticateToken = (req, res, next) => {
     });
 };
 
+// 업로드한 강의자료를 파이썬 백그라운드 분석 작업으로 제출 (material_id를 같이 보내 강의자료 간 개념 그래프에 저장)
+// PY_ANALYSIS_URL을 빈 값으로 두면 제출하지 않음, 실패해도 업로드 응답에는 영향 없음
+const PY_ANALYSIS_URL = process.env.PY_ANALYSIS_URL ?? 'http://localhost:8000';
+async function submitConceptAnalysis(materialId, pdfPath, filename) {
+    if (!PY_ANALYSIS_URL) return;
+    try {
+        const form = new FormData();
+        form.append('file', new Blob([fs.readFileSync(pdfPath)], { type: 'application/pdf' }), filename);
+        form.append('material_id', materialId);
+        const { data } = await axios.post(`${PY_ANALYSIS_URL.replace(/\/+$/, '')}/analyze-pdf/jobs`, form, { timeout: 60000 });
+        console.log(`[ANALYSIS] material_id=${materialId} 분석 작업 ${data.job_id} (${data.status})`);
+    } catch (err) {
+        const status = err.response ? ` (HTTP ${err.response.status})` : '';
+        console.error(`개념 그래프 분석 작업 제출 실패${status} (material_id=${materialId}):`, err.message);
+    }
+}
+
 // PDF 업로드 및 페이지 수 계산 API
 app.post('/api/upload', authenticateToken, upload.single('pdf'), async (req, res) => {
     if (!req.file) {
@@ -203,6 +221,9 @@ app.post('/api/upload', authenticateToken, upload.single('pdf'), async (req, res
 
         // (DB에는 이미 원본 파일명 저장했으니, material_name 업데이트 필요 없음)
 
+        // 3. 개념 그래프 분석은 응답을 기다리지 않고 백그라운드 작업으로 제출
+        submitConceptAnalysis(materialId, newPath, `${materialId}.pdf`);
+
         res.json({
             material_id: materialId,
             total_pages: numPages
@@ -252,6 +273,32 @@ app.get('/archive/:lecture_id', authenticateToken, async (req, res) => {
     }
 });
 
+// 슬라이드 이미지 OCR
+// PY_OCR_URL(파이썬 백엔드 주소)이 있으면 이미지 해시 기반 공유 OCR 캐시를 거치고, 실패 시 Tesseract.js로 직접 인식
+// (서버 미실행/오류 응답/시간 초과/형식이 다른 응답 모두 실패로 보고 Tesseract.js로 대체)
+const PY_OCR_URL = process.env.PY_OCR_URL;
+const PY_OCR_TIMEOUT_MS = parseInt(process.env.PY_OCR_TIMEOUT_MS || '90000', 10);
+async function recognizeSlideImage(imagePath) {
+    if (PY_OCR_URL) {
+        try {
+            const form = new FormData();
+            form.append('file', new Blob([fs.readFileSync(imagePath)], { type: 'image/png' }), path.basename(imagePath));
+            form.append('lang', 'kor+eng');
+            const { data } = await axios.post(`${PY_OCR_URL.replace(/\/+$/, '')}/ocr-page`, form, { timeout: PY_OCR_TIMEOUT_MS });
+            if (data && typeof data.text === 'string') {
+                console.log(`[OCR] 파이썬 OCR ${data.cached ? '캐시 적중' : '인식 완료'}: ${path.basename(imagePath)}`);
+                return data.text;
+            }
+            console.error('파이썬 OCR 응답 형식 오류, Tesseract.js 사용');
+        } catch (err) {
+            const status = err.response ? ` (HTTP ${err.response.status})` : '';
+            console.error(`파이썬 OCR 호출 실패${status}, Tesseract.js 사용:`, err.message);
+        }
+    }
+    const { data: { text } } = await Tesseract.recognize(imagePath, 'kor+eng');
+    return text;
+}
+
 // 특정 슬라이드 요약 API
 app.post('/archive/:lecture_id/slide/:slide_number/summary', authenticateToken, async (req, res) => {
     const materialId = req.params.lecture_id;
@@ -292,7 +339,7 @@ app.post('/archive/:lecture_id/slide/:slide_number/summary', authenticateToken,
         const imagePath = pageImage.path;
 
         // OCR
-        const { data: { text } } = await Tesseract.recognize(imagePath, 'kor+eng');
+        const text = await recognizeSlideImage(imagePath);
 
         // GPT 구조화 요약
         const gptResult = await summarizeSlideWithGPT(text);
@@ -1,18 +1,35 @@
 # slide_analyzer.py
-import fitz
 import openai
 import json
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import networkx as nx
 from collections import Counter
-from sklearn.feature_extraction.text import TfidfVectorizer
-from konlpy.tag import Okt
 import os
+import re
 import tempfile
-from typing import List, Dict, Any
+import asyncio
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
 import csv
+import shutil
+import sys
+from contextlib import closing
+from llm_client import achat_completion, response_text
+from disk_cache import DiskCache
+from idf_store import IdfStore
+from analysis_jobs import JobStore, JobRunner
+from pdf_ingest import file_sha256, iter_pages, save_upload, title_from_record, DEFAULT_TITLE
+from keyword_pairs import select_candidate_pairs, RELATION_TOP_K
+import tokenizer_pool
+import ocr_engine
+import metrics
+import concept_graph
+from database import SessionLocal
+from sqlalchemy import text
+from passage_index import PassageIndex, PASSAGE_TOKEN_BUDGET, OVERVIEW_TOKEN_BUDGET
 
 # .env 파일을 자동으로 읽어서 환경변수로 등록
 load_dotenv()
@@ -24,47 +41,68 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 print("OPENAI_API_KEY:", os.environ.get("OPENAI_API_KEY"))
 
-def load_stopwords(filepath="stopwords-ko.txt"):
+# Node 서버(/api/upload)가 강의자료 PDF를 material_id.pdf로 저장하는 폴더 (개념 그래프 백필에서 사용)
+UPLOADS_DIR = os.getenv("UPLOADS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads"))
+
+# 분석 파이프라인 설정 (결과 캐시 키에 포함됨)
+ANALYSIS_MODEL = os.getenv("ANALYSIS_MODEL", "gpt-3.5-turbo")
+PROMPT_VERSION = "4"  # 프롬프트/후처리 로직을 바꾸면 올려서 기존 캐시 무효화
+N_SUBTOPICS = 4
+N_KEYWORDS = 12
+# 같은 강의자료를 재분석할 때 설명/중요도/관계 프롬프트 응답을 재사용하는 기간(초)
+ANALYSIS_LLM_CACHE_TTL = int(os.getenv("ANALYSIS_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+
+# 같은 PDF 재업로드 시 전체 파이프라인을 건너뛰기 위한 결과 캐시
+ANALYSIS_CACHE = DiskCache("analysis", max_bytes=int(os.getenv("ANALYSIS_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+# 분석한 모든 강의자료의 문서 빈도 (TF-IDF의 IDF를 코퍼스 기준으로 계산)
+IDF_STORE = IdfStore()
+
+def analysis_cache_key(pdf_sha256: str, n_sub: int = N_SUBTOPICS, n_kw: int = N_KEYWORDS) -> str:
+    return (f"{pdf_sha256}:{n_sub}:{n_kw}:{ANALYSIS_MODEL}:v{PROMPT_VERSION}"
+            f":{PASSAGE_TOKEN_BUDGET}:{OVERVIEW_TOKEN_BUDGET}:{RELATION_TOP_K}")
+
+# 불용어 파일은 저장소 루트에 있음 (서버는 backend 폴더에서 실행하므로 모듈 위치 기준으로 찾음)
+STOPWORDS_PATH = os.getenv("STOPWORDS_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "stopwords-ko.txt"))
+
+def load_stopwords(filepath=STOPWORDS_PATH):
     with open(filepath, encoding="utf-8") as f:
         return set(line.strip() for line in f if line.strip())
 STOPWORDS = load_stopwords()
 
-def extract_texts_from_pdf(pdf_path: str) -> List[str]:
+def read_pdf_pages(pdf_path: str):
+    # 문서를 한 번만 열어 페이지 텍스트와 제목(첫 페이지 첫 줄)을 함께 얻음
+    # 페이지 레코드는 하나씩 소비하고 텍스트만 남김: 이후 단계(코퍼스 DF, 문단 인덱스, 동시출현 쌍 선정)는 모두
+    # 문서 전체 페이지가 필요하고, 단계 결과를 체크포인트(JSON)로 저장해야 하므로 페이지 텍스트 목록이 단계 간 단위
+    slide_texts, first = [], None
     try:
-        texts = []
-        doc = fitz.open(pdf_path)
-        for page in doc:
-            page_text = page.get_text()
-            texts.append(page_text)
-        return texts
+        with closing(iter_pages(pdf_path)) as pages:
+            for record in pages:
+                if first is None:
+                    first = record
+                slide_texts.append(record.text)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"PDF 텍스트 추출 실패: {str(e)}")
+    return slide_texts, title_from_record(first)
 
-def extract_title_from_pdf(pdf_path: str) -> str:
-    try:
-        doc = fitz.open(pdf_path)
-        if len(doc) == 0:
-            return "제목없음"
-        first_page = doc[0]
-        text = first_page.get_text("text")
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        return lines[0] if lines else "제목없음"
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"PDF 제목 추출 실패: {str(e)}")
-
-def get_top_n_tfidf_nouns(text, n=30, stopwords=None):
-    okt = Okt()
-    nouns = [word for word in okt.nouns(text) if len(word) > 1 and (not stopwords or word not in stopwords)]
+def get_top_n_tfidf_nouns(texts, n=30, stopwords=None, doc_id=None):
+    # texts: 페이지별 텍스트 목록(또는 문자열 하나). 페이지마다 토크나이저 풀에서 병렬로 명사 추출 후 합침
+    # doc_id(PDF 해시)가 있으면 이 문서를 코퍼스 DF 저장소에 반영한 뒤 코퍼스 IDF로 점수 계산
+    if isinstance(texts, str):
+        texts = [texts]
+    page_nouns = tokenizer_pool.tokenize_pages(texts)
+    nouns = [word for words in page_nouns for word in words if len(word) > 1 and (not stopwords or word not in stopwords)]
     with open("nouns.csv", "w", encoding="utf-8", newline="") as f:
         writer = csv.writer(f)
         writer.writerow(["명사"])
         for noun in nouns:
             writer.writerow([noun])
-    doc = " ".join(nouns)
-    vectorizer = TfidfVectorizer()
-    tfidf = vectorizer.fit_transform([doc])
-    scores = dict(zip(vectorizer.get_feature_names_out(), tfidf.toarray()[0]))
-    top = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:n]
+    counts = Counter(noun.lower() for noun in nouns)
+    if doc_id is not None:
+        IDF_STORE.add_document(doc_id, counts.keys())
+    top, scores = IDF_STORE.top_n(counts, n, counted=doc_id is not None)
     with open("tfidf_scores.csv", "w", encoding="utf-8", newline="") as f:
         writer = csv.writer(f)
         writer.writerow(["명사", "TF-IDF 점수"])
@@ -72,7 +110,7 @@ def get_top_n_tfidf_nouns(text, n=30, stopwords=None):
             writer.writerow([k, v])
     return set([k for k, v in top]), dict(scores)
 
-def extract_subtopics_and_keywords_with_llm(text, api_key, n_sub=4, n_kw=12):
+async def extract_subtopics_and_keywords_with_llm(text, api_key, n_sub=4, n_kw=12):
     prompt = f'''
 아래 강의자료 전체 내용을 읽고,
 1. 이 자료의 소주제(중요한 {n_sub}개)를 뽑아줘.
@@ -91,14 +129,16 @@ def extract_subtopics_and_keywords_with_llm(text, api_key, n_sub=4, n_kw=12):
 {text}
 '''
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
+        response = await achat_completion(
+            model=ANALYSIS_MODEL,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.2,
             max_tokens=1200,
-            api_key=api_key
+            api_key=api_key,
+            cache_ttl=ANALYSIS_LLM_CACHE_TTL,
+            validate=json.loads
         )
-        result = response['choices'][0]['message']['content']
+        result = response_text(response)
         data = json.loads(result)
         with open("llm_keywords.csv", "w", encoding="utf-8", newline="") as f:
             writer = csv.writer(f)
@@ -111,88 +151,111 @@ def extract_subtopics_and_keywords_with_llm(text, api_key, n_sub=4, n_kw=12):
         print(f"LLM 소주제/개념어 추출 오류: {e}")
         return {}
 
-def get_keyword_descriptions(keywords, text, api_key):
-    # LLM에 한 번에 여러 개 요청(최대 10~15개씩)
-    desc_dict = {}
+async def get_keyword_descriptions(keywords, text, api_key, index=None):
+    # LLM에 한 번에 여러 개 요청(최대 10~15개씩), 배치들은 동시에 실행
+    # index(PassageIndex)가 있으면 전체 text 대신 배치 용어 관련 문단만 프롬프트에 넣음
     batch = list(keywords)
-    for i in range(0, len(batch), 10):
-        sub = batch[i:i+10]
+
+    async def describe(sub):
+        context = index.context_for(sub) if index is not None else text
         prompt = f"""
 아래 강의자료에서 다음 용어들의 간단한 정의/설명을 1~2문장씩 JSON으로 반환해줘.
 용어: {json.dumps(sub, ensure_ascii=False)}
 강의자료:
-{text}
+{context}
 예시:
 {{"용어1": "설명1", "용어2": "설명2", ...}}
 """
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
+            response = await achat_completion(
+                model=ANALYSIS_MODEL,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.2,
                 max_tokens=800,
-                api_key=api_key
+                api_key=api_key,
+                cache_ttl=ANALYSIS_LLM_CACHE_TTL,
+                validate=json.loads
             )
-            result = response['choices'][0]['message']['content']
-            descs = json.loads(result)
-            desc_dict.update(descs)
+            result = response_text(response)
+            return json.loads(result)
         except Exception as e:
             print(f"LLM 설명 생성 오류: {e}")
+            return {}
+
+    results = await asyncio.gather(*(describe(batch[i:i+10]) for i in range(0, len(batch), 10)))
+    desc_dict = {}
+    for descs in results:
+        desc_dict.update(descs)
     return desc_dict
 
-def get_keyword_importance(keywords, text, api_key):
+async def get_keyword_importance(keywords, text, api_key, index=None):
     # LLM에게 각 용어의 학술적 중요도를 1~5점으로 평가하게 함
+    context = index.context_for(list(keywords)) if index is not None else text
     prompt = f"""
 아래 강의자료에서 다음 용어들의 학술적 중요도를 1~5점(5가 가장 중요)으로 평가해서 JSON으로 반환해줘.
 용어: {json.dumps(list(keywords), ensure_ascii=False)}
 강의자료:
-{text}
+{context}
 예시:
 {{"용어1": 5, "용어2": 3, ...}}
 """
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
+        response = await achat_completion(
+            model=ANALYSIS_MODEL,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.2,
             max_tokens=800,
-            api_key=api_key
+            api_key=api_key,
+            cache_ttl=ANALYSIS_LLM_CACHE_TTL,
+            validate=json.loads
         )
-        result = response['choices'][0]['message']['content']
+        result = response_text(response)
         imp_dict = json.loads(result)
         return imp_dict
     except Exception as e:
         print(f"LLM 중요도 평가 오류: {e}")
         return {k: 3 for k in keywords}
 
-def get_keyword_relations(keywords, text, api_key):
-    # LLM에게 용어쌍 간 관계유형(상위-하위, 원인-결과 등) 추론
-    rels = []
-    pairs = [(a, b) for i, a in enumerate(keywords) for b in keywords[i+1:]]
-    for i in range(0, len(pairs), 10):
-        sub = pairs[i:i+10]
+async def get_keyword_relations(keywords, text, api_key, slide_texts=None, top_k=RELATION_TOP_K, index=None):
+    # LLM에게 용어쌍 간 관계유형(상위-하위, 원인-결과 등) 추론, 배치들은 동시에 실행
+    # slide_texts가 주어지면 페이지/문장 동시출현 점수로 후보 쌍을 먼저 걸러냄 (전체 쌍 대비 호출 수 감소)
+    if slide_texts is not None:
+        pairs = select_candidate_pairs(list(keywords), slide_texts, top_k=top_k)
+    else:
+        pairs = [(a, b) for i, a in enumerate(keywords) for b in keywords[i+1:]]
+
+    async def relate(sub):
+        context = index.context_for(list(dict.fromkeys(kw for pair in sub for kw in pair))) if index is not None else text
         prompt = f"""
 아래 강의자료에서 다음 용어쌍의 관계유형(상위-하위, 원인-결과, 동의어, 관련없음 등)을 JSON으로 반환해줘.
 예시: [["용어1", "용어2"], ...]
 강의자료:
-{text}
+{context}
 예시 반환:
 [["용어1", "용어2", "관계유형"], ...]
 용어쌍:
 {sub}
 """
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
+            response = await achat_completion(
+                model=ANALYSIS_MODEL,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.2,
                 max_tokens=800,
-                api_key=api_key
+                api_key=api_key,
+                cache_ttl=ANALYSIS_LLM_CACHE_TTL,
+                validate=json.loads
             )
-            result = response['choices'][0]['message']['content']
-            rels += json.loads(result)
+            result = response_text(response)
+            return json.loads(result)
         except Exception as e:
             print(f"LLM 관계 추론 오류: {e}")
+            return []
+
+    results = await asyncio.gather(*(relate(pairs[i:i+10]) for i in range(0, len(pairs), 10)))
+    rels = []
+    for r in results:
+        rels += r
     return rels
 
 def build_subtopic_network(subtopic_dict, main_title, tfidf_nouns, tfidf_scores, desc_dict, imp_dict, rels):
@@ -277,89 +340,187 @@ def build_subtopic_network(subtopic_dict, main_title, tfidf_nouns, tfidf_scores,
     } for k, v in freq_counter.most_common()]
     return nodes, edges, freq_table
 
+def filter_subtopic_keywords(subtopic_dict, tfidf_nouns):
+    # LLM+TF-IDF 혼합 필터링 (최소 10개씩 보장, LLM 결과를 더 많이 반영)
+    tfidf_nouns = set(tfidf_nouns)
+    filtered_subtopic_dict = {}
+    for subtopic, keywords in subtopic_dict.items():
+        filtered_keywords = [kw for kw in keywords if kw in tfidf_nouns]
+        # 최소 10개까지 LLM 결과에서 채우기
+        if len(filtered_keywords) < 10:
+            filtered_keywords += [kw for kw in keywords if kw not in filtered_keywords][:10-len(filtered_keywords)]
+        filtered_subtopic_dict[subtopic] = filtered_keywords[:10]  # 최대 10개까지만 사용
+    return filtered_subtopic_dict
+
+# ---- 분석 파이프라인 단계 ----
+# 각 단계는 ctx(이전 단계 결과가 누적된 dict)를 받아 JSON 직렬화 가능한 결과 dict를 반환
+# → 백그라운드 작업에서는 단계별 결과를 체크포인트로 저장해 중단된 단계부터 재개
+
+def _passage_index(ctx):
+    # 문단 인덱스는 체크포인트에 저장하지 않고 필요할 때 slide_texts로 다시 만듦
+    if "_passage_index" not in ctx:
+        ctx["_passage_index"] = PassageIndex(ctx["slide_texts"])
+    return ctx["_passage_index"]
+
+def _keyword_list(ctx):
+    filtered = filter_subtopic_keywords(ctx["subtopic_dict"], ctx["tfidf_nouns"])
+    all_keywords = set()
+    for kws in filtered.values():
+        all_keywords.update(kws)
+    # 순서를 고정해야 같은 자료 재분석 시 프롬프트가 같아져 LLM 캐시가 적중함
+    return sorted(all_keywords)
+
+async def stage_extract(ctx):
+    # PyMuPDF 파싱은 스레드풀에서 실행 (문서는 한 번만 열고 페이지 단위로 읽음)
+    slide_texts, main_title = await run_in_threadpool(read_pdf_pages, ctx["pdf_path"])
+    output = {"slide_texts": slide_texts, "main_title": main_title}
+    # 텍스트 레이어가 없는(스캔/이미지) 페이지만 OCR로 채움
+    pages = ocr_engine.find_textless_pages(slide_texts) if ocr_engine.OCR_ENABLED else []
+    if pages:
+        with metrics.span("analysis", "ocr"):
+            ocr_texts, ocr_stats = await run_in_threadpool(ocr_engine.ocr_pages, ctx["pdf_path"], pages)
+        for page_no, text in ocr_texts.items():
+            slide_texts[page_no - 1] = text
+        if main_title == DEFAULT_TITLE and 1 in ocr_texts:
+            lines = [line.strip() for line in ocr_texts[1].split("\n") if line.strip()]
+            if lines:
+                output["main_title"] = lines[0]
+        print(f"OCR: {ocr_stats['recognized']}/{ocr_stats['pages']} 페이지 (캐시 적중 {ocr_stats['cache_hits']}), "
+              f"{ocr_stats['seconds']}초 ({ocr_stats['pages_per_second']} pages/s)")
+        output["ocr"] = ocr_stats
+    return output
+
+async def stage_tokenize(ctx):
+    tfidf_nouns, tfidf_scores = await run_in_threadpool(
+        get_top_n_tfidf_nouns, ctx["slide_texts"], n=30, stopwords=STOPWORDS, doc_id=ctx["pdf_sha256"]
+    )
+    return {"tfidf_nouns": sorted(tfidf_nouns), "tfidf_scores": tfidf_scores}
+
+async def stage_subtopics(ctx):
+    subtopic_dict = await extract_subtopics_and_keywords_with_llm(
+        _passage_index(ctx).overview(), OPENAI_API_KEY, n_sub=N_SUBTOPICS, n_kw=N_KEYWORDS
+    )
+    return {"subtopic_dict": subtopic_dict}
+
+# 아래 LLM 단계들은 문단 인덱스만 사용하므로 전체 텍스트(text 인자)는 넘기지 않음
+async def stage_descriptions(ctx):
+    return {"desc_dict": await get_keyword_descriptions(_keyword_list(ctx), None, OPENAI_API_KEY, index=_passage_index(ctx))}
+
+async def stage_importance(ctx):
+    return {"imp_dict": await get_keyword_importance(_keyword_list(ctx), None, OPENAI_API_KEY, index=_passage_index(ctx))}
+
+async def stage_relations(ctx):
+    rels = await get_keyword_relations(_keyword_list(ctx), None, OPENAI_API_KEY,
+                                       slide_texts=ctx["slide_texts"], index=_passage_index(ctx))
+    return {"rels": rels}
+
+async def stage_graph(ctx):
+    filtered_subtopic_dict = filter_subtopic_keywords(ctx["subtopic_dict"], ctx["tfidf_nouns"])
+    nodes, edges, freq_table = build_subtopic_network(
+        filtered_subtopic_dict, ctx["main_title"], ctx["tfidf_nouns"], ctx["tfidf_scores"],
+        ctx["desc_dict"], ctx["imp_dict"], ctx["rels"]
+    )
+    with open("final_keywords.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["최종 개념어"])
+        for subtopic, keywords in filtered_subtopic_dict.items():
+            for kw in keywords:
+                writer.writerow([kw])
+    result = {
+        "nodes": nodes,
+        "edges": edges,
+        "main_title": ctx["main_title"],
+        "freq_table": freq_table
+    }
+    # LLM 소주제 추출이 실패한 결과(빈 그래프)는 캐시하지 않음
+    if filtered_subtopic_dict:
+        ANALYSIS_CACHE.set(analysis_cache_key(ctx["pdf_sha256"]), json.dumps(result, ensure_ascii=False).encode("utf-8"))
+    return {"result": result}
+
+# (단계 이름, 함수, 실패 시 메시지). 같은 그룹 안의 단계들은 서로 독립적이라 동시에 실행
+ANALYSIS_STAGE_GROUPS = [
+    [("extract", stage_extract, "PDF 텍스트 추출 실패")],
+    [("tokenize", stage_tokenize, "TF-IDF 분석 실패"),
+     ("subtopics", stage_subtopics, "LLM 분석 실패")],
+    [("descriptions", stage_descriptions, "개념어 설명 생성 실패"),
+     ("importance", stage_importance, "개념어 중요도 분석 실패"),
+     ("relations", stage_relations, "개념어 관계 분석 실패")],
+    [("graph", stage_graph, "네트워크 생성 실패")],
+]
+ANALYSIS_STAGES = [name for group in ANALYSIS_STAGE_GROUPS for name, _, _ in group]
+
+async def run_analysis_pipeline(pdf_path, pdf_sha256, checkpoints=None, on_stage_start=None, on_stage_done=None):
+    """전체 분석 실행. checkpoints에 이미 있는 단계는 건너뛰고, 끝난 단계마다 on_stage_done(name, output) 호출"""
+    checkpoints = checkpoints or {}
+    ctx = {"pdf_path": pdf_path, "pdf_sha256": pdf_sha256}
+    for name in ANALYSIS_STAGES:
+        ctx.update(checkpoints.get(name, {}))
+
+    async def run_stage(name, fn, error_message):
+        if on_stage_start:
+            on_stage_start(name)
+        try:
+            with metrics.span("analysis", name):
+                output = await fn(ctx)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"{error_message}: {str(e)}")
+        if on_stage_done:
+            on_stage_done(name, output)
+        return output
+
+    for group in ANALYSIS_STAGE_GROUPS:
+        pending = [stage for stage in group if stage[0] not in checkpoints]
+        outputs = await asyncio.gather(*(run_stage(*stage) for stage in pending), return_exceptions=True)
+        for output in outputs:
+            if isinstance(output, Exception):
+                raise output
+            ctx.update(output)
+    return ctx["result"]
+
+def _save_concept_graph(material_id: int, result: dict):
+    # 분석 결과를 강의자료 간 개념 그래프에 반영 (실패해도 분석 결과 응답은 그대로)
+    db = SessionLocal()
+    try:
+        with metrics.span("analysis", "concept_graph"):
+            saved = concept_graph.save_material_graph(db, material_id, result)
+        print(f"개념 그래프 저장: 강의자료 {material_id}, 개념어 {saved['concepts']}개, 관계 {saved['relations']}개")
+    except Exception as e:
+        db.rollback()
+        print(f"개념 그래프 저장 실패 (강의자료 {material_id}): {e}")
+    finally:
+        db.close()
+
+async def save_concept_graph(material_id: Optional[int], result: dict):
+    if material_id is not None and result.get("nodes"):
+        await run_in_threadpool(_save_concept_graph, material_id, result)
+
 @router.post("/analyze-pdf")
-async def analyze_pdf(file: UploadFile = File(...)):
+async def analyze_pdf(file: UploadFile = File(...), material_id: Optional[int] = Form(None)):
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="PDF 파일만 업로드 가능합니다.")
     
     # 임시 파일 생성
     with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
+        temp_file.close()
         try:
-            # 파일 저장
-            content = await file.read()
-            temp_file.write(content)
-            temp_file.flush()
+            # 업로드를 청크 단위로 저장하면서 해시 계산 (PDF 전체를 메모리에 올리지 않음)
+            pdf_sha256 = await save_upload(file, temp_file.name)
             
-            # PDF 분석
-            slide_texts = extract_texts_from_pdf(temp_file.name)
-            joined_text = "\n".join(slide_texts)
-            main_title = extract_title_from_pdf(temp_file.name)
+            # 동일 PDF + 동일 파라미터로 분석한 결과가 있으면 바로 반환
+            cached = ANALYSIS_CACHE.get(analysis_cache_key(pdf_sha256))
+            if cached is not None:
+                result = json.loads(cached)
+            else:
+                result = await run_analysis_pipeline(temp_file.name, pdf_sha256)
             
-            # 1. LLM 소주제/개념어 추출
-            try:
-                subtopic_dict = extract_subtopics_and_keywords_with_llm(joined_text, OPENAI_API_KEY, n_sub=4, n_kw=12)
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"LLM 분석 실패: {str(e)}")
-            
-            # 2. TF-IDF 상위 명사 추출
-            try:
-                tfidf_nouns, tfidf_scores = get_top_n_tfidf_nouns(joined_text, n=30, stopwords=STOPWORDS)
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"TF-IDF 분석 실패: {str(e)}")
-            
-            # 3. LLM+TF-IDF 혼합 필터링 (최소 10개씩 보장, LLM 결과를 더 많이 반영)
-            filtered_subtopic_dict = {}
-            for subtopic, keywords in subtopic_dict.items():
-                filtered_keywords = [kw for kw in keywords if kw in tfidf_nouns]
-                # 최소 10개까지 LLM 결과에서 채우기
-                if len(filtered_keywords) < 10:
-                    filtered_keywords += [kw for kw in keywords if kw not in filtered_keywords][:10-len(filtered_keywords)]
-                filtered_subtopic_dict[subtopic] = filtered_keywords[:10]  # 최대 10개까지만 사용
-            
-            all_keywords = set()
-            for kws in filtered_subtopic_dict.values():
-                all_keywords.update(kws)
-            
-            # 4. 개념어별 설명/정의
-            try:
-                desc_dict = get_keyword_descriptions(all_keywords, joined_text, OPENAI_API_KEY)
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"개념어 설명 생성 실패: {str(e)}")
-            
-            # 5. 개념어별 중요도 점수
-            try:
-                imp_dict = get_keyword_importance(all_keywords, joined_text, OPENAI_API_KEY)
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"개념어 중요도 분석 실패: {str(e)}")
-            
-            # 6. 개념어 간 관계유형 추론
-            try:
-                rels = get_keyword_relations(list(all_keywords), joined_text, OPENAI_API_KEY)
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"개념어 관계 분석 실패: {str(e)}")
-            
-            # 7. 네트워크 생성
-            try:
-                nodes, edges, freq_table = build_subtopic_network(
-                    filtered_subtopic_dict, main_title, tfidf_nouns, tfidf_scores, desc_dict, imp_dict, rels
-                )
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"네트워크 생성 실패: {str(e)}")
-            
-            with open("final_keywords.csv", "w", encoding="utf-8", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(["최종 개념어"])
-                for subtopic, keywords in filtered_subtopic_dict.items():
-                    for kw in keywords:
-                        writer.writerow([kw])
-            
-            return {
-                "nodes": nodes,
-                "edges": edges,
-                "main_title": main_title,
-                "freq_table": freq_table
-            }
+            # material_id가 주어지면 강의자료 간 개념 그래프에 저장
+            await save_concept_graph(material_id, result)
+            return result
             
+        except HTTPException:
+            raise
         except Exception as e:
             import traceback
             print("PDF 분석 중 오류 발생:", e)
@@ -370,4 +531,172 @@ async def analyze_pdf(file: UploadFile = File(...)):
             try:
                 os.unlink(temp_file.name)
             except:
-                pass  # 임시 파일 삭제 실패는 무시
\ No newline at end of file
+                pass  # 임시 파일 삭제 실패는 무시
+
+# ---- 백그라운드 분석 작업 API ----
+# POST /analyze-pdf/jobs 로 제출 → job_id로 진행 상황 조회(GET) 또는 구독(SSE)
+
+async def run_analysis_job(job, store):
+    def on_stage_start(name):
+        store.set_stage(job["job_id"], name)
+
+    def on_stage_done(name, output):
+        store.save_stage(job["job_id"], name, output)
+
+    result = await run_analysis_pipeline(
+        job["file_path"], job["file_sha256"],
+        checkpoints=store.load_stages(job["job_id"]),
+        on_stage_start=on_stage_start,
+        on_stage_done=on_stage_done
+    )
+    await save_concept_graph(job.get("material_id"), result)
+    return result
+
+ANALYSIS_JOBS = JobRunner(JobStore(), run_analysis_job)
+
+@router.on_event("startup")
+async def start_analysis_workers():
+    # 형태소 분석기를 워커 프로세스마다 미리 로드해 첫 업로드 지연을 없앤 뒤 작업 워커 시작
+    try:
+        # 워커 프로세스의 JVM/모델 로드를 기다리는 동안 이벤트 루프를 막지 않도록 스레드에서 실행
+        ready = await asyncio.get_running_loop().run_in_executor(None, tokenizer_pool.warm_up)
+        print(f"토크나이저 풀 워밍업: 워커 {ready}개 준비")
+    except Exception as e:
+        print(f"토크나이저 풀 워밍업 실패: {e}")
+    await ANALYSIS_JOBS.start()
+
+@router.on_event("shutdown")
+async def stop_analysis_workers():
+    # 작업 워커를 먼저 멈춰 실행 중인 작업을 대기열로 돌려놓은 뒤 풀을 닫음
+    # (풀을 먼저 닫으면 진행 중인 단계가 실패로 기록돼 재시도 횟수를 소모함)
+    await ANALYSIS_JOBS.stop()
+    tokenizer_pool.shutdown()
+    ocr_engine.shutdown()
+
+def _job_status(job):
+    # 완료된 작업은 체크포인트를 지우므로 전체 단계를 완료로 표시
+    done = ANALYSIS_STAGES if job["status"] == "done" else [s for s in job["finished_stages"] if s in ANALYSIS_STAGES]
+    progress = round(len(done) / len(ANALYSIS_STAGES), 3)
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "filename": job["filename"],
+        "current_stage": job["current_stage"],
+        "finished_stages": done,
+        "progress": progress,
+        "attempts": job["attempts"],
+        "error": job["error"],
+        "result": job["result"]
+    }
+
+@router.post("/analyze-pdf/jobs")
+async def submit_analysis_job(file: UploadFile = File(...), material_id: Optional[int] = Form(None)):
+    if not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="PDF 파일만 업로드 가능합니다.")
+    store = ANALYSIS_JOBS.store
+    job_id = ANALYSIS_JOBS.new_job_id()
+    file_path = store.file_path_for(job_id)
+    pdf_sha256 = await save_upload(file, file_path)
+    
+    # 이미 분석된 PDF면 바로 완료 상태의 작업으로 기록
+    cached = ANALYSIS_CACHE.get(analysis_cache_key(pdf_sha256))
+    if cached is not None:
+        os.unlink(file_path)
+        result = json.loads(cached)
+        await save_concept_graph(material_id, result)
+        store.create(job_id, file.filename, pdf_sha256, status="done", result=result, material_id=material_id)
+        return {"job_id": job_id, "status": "done"}
+    
+    ANALYSIS_JOBS.submit(file.filename, pdf_sha256, job_id=job_id, material_id=material_id)
+    return {"job_id": job_id, "status": "queued"}
+
+@router.get("/analyze-pdf/jobs/{job_id}")
+def get_analysis_job(job_id: str):
+    job = ANALYSIS_JOBS.store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="분석 작업을 찾을 수 없습니다.")
+    return _job_status(job)
+
+@router.get("/analyze-pdf/jobs/{job_id}/events")
+async def stream_analysis_job(job_id: str):
+    # 상태가 바뀔 때마다 SSE로 전송, 완료/실패 시 종료
+    if not ANALYSIS_JOBS.store.get(job_id):
+        raise HTTPException(status_code=404, detail="분석 작업을 찾을 수 없습니다.")
+
+    async def events():
+        last = None
+        while True:
+            status = _job_status(ANALYSIS_JOBS.store.get(job_id))
+            snapshot = (status["status"], status["current_stage"], tuple(status["finished_stages"]))
+            if snapshot != last:
+                last = snapshot
+                yield f"data: {json.dumps(status, ensure_ascii=False)}\n\n"
+            if status["status"] in ("done", "failed"):
+                break
+            await asyncio.sleep(1)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@router.get("/analyze-pdf/cache-stats")
+def analysis_cache_stats():
+    return ANALYSIS_CACHE.stats()
+
+def backfill_concept_graph(material_ids: Optional[List[int]] = None) -> dict:
+    """
+    개념 그래프가 없는 강의자료(또는 지정한 material_ids)를 UPLOADS_DIR의 PDF로 채움
+    분석 결과 캐시가 있으면 바로 저장, 없으면 material_id를 붙인 백그라운드 분석 작업으로 제출
+    (작업 DB는 서버와 공유하므로 실행 중인 서버의 워커가 처리, 서버가 꺼져 있으면 다음 시작 때 처리)
+    """
+    if material_ids is None:
+        db = SessionLocal()
+        try:
+            material_ids = [row[0] for row in db.execute(text("""
+                SELECT m.material_id FROM lecture_materials m
+                WHERE NOT EXISTS (SELECT 1 FROM material_concepts c WHERE c.material_id = m.material_id)
+                ORDER BY m.material_id
+            """))]
+        finally:
+            db.close()
+    counts = {"saved": 0, "queued": 0, "missing": 0}
+    for material_id in material_ids:
+        pdf_path = os.path.join(UPLOADS_DIR, f"{material_id}.pdf")
+        if not os.path.exists(pdf_path):
+            print(f"개념 그래프 백필: 강의자료 {material_id}의 PDF가 없습니다 ({pdf_path})")
+            counts["missing"] += 1
+            continue
+        pdf_sha256 = file_sha256(pdf_path)
+        cached = ANALYSIS_CACHE.get(analysis_cache_key(pdf_sha256))
+        if cached is not None:
+            _save_concept_graph(material_id, json.loads(cached))
+            counts["saved"] += 1
+            continue
+        job_id = ANALYSIS_JOBS.new_job_id()
+        shutil.copyfile(pdf_path, ANALYSIS_JOBS.store.file_path_for(job_id))
+        ANALYSIS_JOBS.submit(os.path.basename(pdf_path), pdf_sha256, job_id=job_id, material_id=material_id)
+        counts["queued"] += 1
+    return counts
+
+# 슬라이드 요약(Node 서버) 흐름에서 렌더링한 페이지 이미지를 보내면 공유 OCR 캐시를 거쳐 인식
+@router.post("/ocr-page")
+async def ocr_page(file: UploadFile = File(...), lang: str = Form(ocr_engine.OCR_LANG)):
+    if not re.fullmatch(r"[a-z_]+(\+[a-z_]+)*", lang):
+        raise HTTPException(status_code=400, detail="잘못된 OCR 언어입니다.")
+    image = await file.read()
+    try:
+        text, cached = await run_in_threadpool(ocr_engine.recognize_cached, image, lang)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"OCR 실패: {str(e)}")
+    return {"text": text, "cached": cached}
+
+@router.get("/ocr/cache-stats")
+def ocr_cache_stats():
+    return ocr_engine.get_cache().stats()
+
+
+if __name__ == "__main__":
+    # 사용법 (backend 폴더에서): python slide_analyzer.py backfill-concepts [material_id ...]
+    if len(sys.argv) < 2 or sys.argv[1] != "backfill-concepts":
+        print("사용법: python slide_analyzer.py backfill-concepts [material_id ...]")
+        sys.exit(1)
+    counts = backfill_concept_graph([int(m) for m in sys.argv[2:]] or None)
+    print(f"개념 그래프 백필: 바로 저장 {counts['saved']}개, 분석 작업 제출 {counts['queued']}개, PDF 없음 {counts['missing']}개")
@@ -0,0 +1,97 @@
+# tokenizer_pool.py
+# 한국어 명사 추출을 위한 상주(warm) 프로세스 풀
+# - 워커 프로세스마다 형태소 분석기(Okt 또는 Kiwi)를 한 번만 만들어 재사용 (요청마다 JVM 기동/연결 X)
+# - 페이지 단위로 작업을 나눠 여러 코어에서 동시에 처리 → GIL/JVM 때문에 업로드끼리 직렬화되지 않음
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+KOREAN_TOKENIZER = os.getenv("KOREAN_TOKENIZER", "okt")  # "okt" | "kiwi"
+TOKENIZER_WORKERS = int(os.getenv("TOKENIZER_WORKERS", str(os.cpu_count() or 1)))
+SUPPORTED_BACKENDS = ("okt", "kiwi")
+WARM_UP_ROUNDS = 3  # 워커가 모두 뜰 때까지 워밍업 작업을 다시 보내는 최대 횟수
+
+_analyzer = None  # 워커 프로세스 안에서만 사용
+_backend = None
+_pools = {}  # backend → (ProcessPoolExecutor, 워커 수)
+_pools_lock = threading.Lock()
+
+
+def create_analyzer(backend: str):
+    if backend == "okt":
+        from konlpy.tag import Okt
+        return Okt()
+    if backend == "kiwi":
+        from kiwipiepy import Kiwi
+        return Kiwi()
+    raise ValueError(f"지원하지 않는 형태소 분석기: {backend} (okt, kiwi 중 선택)")
+
+
+def extract_nouns(analyzer, backend: str, text: str) -> List[str]:
+    if backend == "okt":
+        return analyzer.nouns(text)
+    # Kiwi: 일반명사(NNG)/고유명사(NNP)만 사용 (Okt.nouns와 같은 범위)
+    return [token.form for token in analyzer.tokenize(text) if token.tag in ("NNG", "NNP")]
+
+
+def _init_worker(backend: str):
+    global _analyzer, _backend
+    _backend = backend
+    _analyzer = create_analyzer(backend)
+
+
+def _nouns_in_worker(text: str) -> List[str]:
+    return extract_nouns(_analyzer, _backend, text)
+
+
+def _warm_in_worker(hold: float) -> int:
+    # initializer(분석기 로드)가 끝난 워커에서만 실행됨 → pid로 준비된 워커를 셈
+    # 잠시 붙잡아 두어 다른 워밍업 작업이 이미 준비된 워커로 몰리지 않고 새 워커를 띄우게 함
+    extract_nouns(_analyzer, _backend, "워밍업")
+    time.sleep(hold)
+    return os.getpid()
+
+
+def _pool_entry(backend: str, workers: int):
+    with _pools_lock:
+        entry = _pools.get(backend)
+        if entry is None:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(backend,))
+            entry = _pools[backend] = (pool, workers)
+        return entry
+
+
+def get_pool(backend: str = KOREAN_TOKENIZER, workers: int = TOKENIZER_WORKERS) -> ProcessPoolExecutor:
+    return _pool_entry(backend, workers)[0]
+
+
+def warm_up(backend: str = KOREAN_TOKENIZER, hold: float = 0.2) -> int:
+    """
+    서버 시작 시 호출 (블로킹이므로 이벤트 루프 밖에서): 워커마다 initializer가 끝날 때까지 기다려
+    모든 워커의 분석기(JVM/모델)를 미리 로드 → 준비된 워커 수
+    """
+    pool, workers = _pool_entry(backend, TOKENIZER_WORKERS)
+    ready = set()
+    for _ in range(WARM_UP_ROUNDS):
+        # 워커 수만큼 동시에 보내면 풀이 쉬는 워커가 없어 워커를 끝까지 띄움, 다 뜨지 않았으면 한 번 더
+        futures = [pool.submit(_warm_in_worker, hold) for _ in range(workers)]
+        ready.update(future.result() for future in futures)
+        if len(ready) >= workers:
+            break
+    return len(ready)
+
+
+def tokenize_pages(pages: List[str], backend: str = KOREAN_TOKENIZER) -> List[List[str]]:
+    """페이지마다 명사 목록 (입력 순서 유지)"""
+    if not pages:
+        return []
+    return list(get_pool(backend).map(_nouns_in_worker, pages))
+
+
+def shutdown():
+    with _pools_lock:
+        for pool, _ in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
@@ -0,0 +1,293 @@
+# write_behind.py
+# 문제 풀이 기록 지연 저장(write-behind) 버퍼 (QUIZ_WRITE_BEHIND=1일 때만 사용)
+# - /quiz/submit은 채점 결과를 바로 반환하고, 풀이 기록/오답 로그/키워드 통계/복습 일정은 프로세스 메모리 큐에 쌓음
+# - 백그라운드 스레드가 WRITE_BEHIND_BATCH_SIZE개가 모이거나 WRITE_BEHIND_FLUSH_MS가 지나면 한 트랜잭션으로 일괄 저장
+# - 제출마다 submission_id를 붙이고 이미 저장된 ID는 건너뛰므로, 커밋 응답을 못 받고 다시 시도해도 중복 저장되지 않음
+# - 재시도(WRITE_BEHIND_MAX_RETRIES)까지 실패한 묶음은 DATA_DIR/write_behind_failed.jsonl에 남김
+#   → DB가 복구되면 `python write_behind.py replay`로 다시 저장
+# - 큐가 WRITE_BEHIND_MAX_PENDING개로 차면 enqueue가 False → 호출한 쪽이 기존처럼 동기 저장
+# - 아직 저장 전인 항목은 pending_for()로 조회해서 오답노트/약점 조회 결과에 합침 (같은 워커 프로세스 안에서만 보임)
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+
+import keyword_stats
+import metrics
+import review_scheduler
+from database import SessionLocal
+from models import QuestionAttempt, ReviewSchedule, WeakKeywordLog
+
+QUIZ_WRITE_BEHIND = os.getenv("QUIZ_WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "200"))
+WRITE_BEHIND_FLUSH_MS = int(os.getenv("WRITE_BEHIND_FLUSH_MS", "200"))
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "20000"))
+WRITE_BEHIND_MAX_RETRIES = int(os.getenv("WRITE_BEHIND_MAX_RETRIES", "5"))
+WRITE_BEHIND_DRAIN_SECONDS = float(os.getenv("WRITE_BEHIND_DRAIN_SECONDS", "30"))
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data"))
+FAILED_PATH = os.path.join(DATA_DIR, "write_behind_failed.jsonl")
+
+
+class PendingAttempt:
+    def __init__(self, user_id: int, question_id: int, answer: str, is_correct: bool, keyword_ids: List[int],
+                 quality: Optional[int] = None):
+        self.submission_id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.question_id = question_id
+        self.answer = answer
+        self.is_correct = is_correct
+        self.keyword_ids = keyword_ids
+        self.quality = quality
+        self.submitted_at = time.time()
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PendingAttempt":
+        entry = cls.__new__(cls)
+        entry.__dict__.update(data)
+        return entry
+
+
+def apply_batch(db, batch: List[PendingAttempt]) -> List[Tuple[int, int, datetime]]:
+    """
+    묶음 하나를 저장 (commit 포함). 이미 저장된 submission_id는 건너뜀
+    → [(user_id, question_id, 다음 복습 시각)] (건너뛴 항목은 DB에 저장된 일정)
+    """
+    done = {row[0] for row in db.execute(
+        select(QuestionAttempt.submission_id)
+        .where(QuestionAttempt.submission_id.in_([e.submission_id for e in batch]))
+    )}
+    todo = [e for e in batch if e.submission_id not in done]
+    # 이전 시도에서 커밋은 됐지만 응답을 못 받은 항목도 메모리 복습 큐에 반영되도록 저장된 일정을 같이 반환
+    saved = saved_schedules(db, [e for e in batch if e.submission_id in done])
+    if not todo:
+        return saved
+    db.execute(insert(QuestionAttempt), [
+        {"user_id": e.user_id, "question_id": e.question_id, "answer": e.answer, "is_correct": e.is_correct,
+         "attempt_date": datetime.fromtimestamp(e.submitted_at).date(), "submission_id": e.submission_id}
+        for e in todo
+    ])
+    weak_logs = [
+        {"user_id": e.user_id, "question_id": e.question_id, "keyword_id": kid, "is_incorrect": True,
+         "occurred_at": datetime.fromtimestamp(e.submitted_at)}
+        for e in todo if not e.is_correct for kid in e.keyword_ids
+    ]
+    if weak_logs:
+        db.execute(insert(WeakKeywordLog), weak_logs)
+    by_user = defaultdict(list)
+    for e in todo:
+        by_user[e.user_id].append(e)
+    scheduled = []
+    for user_id, entries in by_user.items():
+        keyword_stats.record_attempts(db, user_id, pending_keyword_counts(entries), entries[-1].submitted_at)
+        due = review_scheduler.record_reviews(
+            db, user_id, [(e.question_id, e.is_correct, e.quality) for e in entries],
+            datetime.fromtimestamp(entries[-1].submitted_at)
+        )
+        scheduled.extend((user_id, qid, due_at) for qid, due_at in due.items())
+    db.commit()
+    return saved + scheduled
+
+
+def saved_schedules(db, entries: List[PendingAttempt]) -> List[Tuple[int, int, datetime]]:
+    """이미 저장된 제출들의 현재 복습 일정 → [(user_id, question_id, 다음 복습 시각)]"""
+    by_user = defaultdict(set)
+    for e in entries:
+        by_user[e.user_id].add(e.question_id)
+    return [
+        (user_id, row.question_id, row.due_at)
+        for user_id, question_ids in by_user.items()
+        for row in db.execute(
+            select(ReviewSchedule.question_id, ReviewSchedule.due_at)
+            .where(ReviewSchedule.user_id == user_id, ReviewSchedule.question_id.in_(question_ids))
+        )
+    ]
+
+
+def pending_keyword_counts(entries: List[PendingAttempt]) -> Dict[int, Tuple[int, int]]:
+    """keyword_id → (풀이 수, 오답 수)"""
+    counts = {}
+    for e in entries:
+        for kid in e.keyword_ids:
+            n, wrong = counts.get(kid, (0, 0))
+            counts[kid] = (n + 1, wrong + (0 if e.is_correct else 1))
+    return counts
+
+
+def pending_counts_for(user_id: int) -> Dict[int, Tuple[int, int]]:
+    """아직 저장되지 않은 이 사용자의 제출 → keyword_id별 (풀이 수, 오답 수) (약점 순위 계산에 합산)"""
+    return pending_keyword_counts(WRITE_BEHIND.pending_for(user_id)) if QUIZ_WRITE_BEHIND else {}
+
+
+class WriteBehindBuffer:
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._pending: List[PendingAttempt] = []
+        self._inflight: List[PendingAttempt] = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._stats = {"queued": 0, "flushed": 0, "batches": 0, "retries": 0, "failed": 0, "rejected": 0}
+
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="quiz-write-behind", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, entry: PendingAttempt) -> bool:
+        self.start()
+        with self._cond:
+            if self._stopping or len(self._pending) + len(self._inflight) >= WRITE_BEHIND_MAX_PENDING:
+                self._stats["rejected"] += 1
+                return False
+            self._pending.append(entry)
+            self._stats["queued"] += 1
+            if len(self._pending) >= WRITE_BEHIND_BATCH_SIZE:
+                self._cond.notify()
+        return True
+
+    def pending_for(self, user_id: int) -> List[PendingAttempt]:
+        """아직 커밋되지 않은 이 사용자의 제출 (저장 중인 묶음 포함, 제출 순서)"""
+        with self._cond:
+            return [e for e in self._inflight + self._pending if e.user_id == user_id]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending and self._stopping:
+                    return
+                # 첫 항목이 들어온 뒤 FLUSH_MS 동안 더 모음 (묶음이 차거나 종료 중이면 바로)
+                deadline = self._pending[0].submitted_at + WRITE_BEHIND_FLUSH_MS / 1000 if self._pending else 0
+                while self._pending and len(self._pending) < WRITE_BEHIND_BATCH_SIZE and not self._stopping:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if not self._pending:
+                    continue
+                self._inflight = self._pending[:WRITE_BEHIND_BATCH_SIZE]
+                self._pending = self._pending[WRITE_BEHIND_BATCH_SIZE:]
+                batch = list(self._inflight)
+            self._flush(batch)
+            with self._cond:
+                self._inflight = []
+
+    def _flush(self, batch: List[PendingAttempt]):
+        for attempt in range(WRITE_BEHIND_MAX_RETRIES + 1):
+            db = self.session_factory()
+            try:
+                with metrics.span("write_behind", "flush"):
+                    scheduled = apply_batch(db, batch)
+                for user_id, question_id, due_at in scheduled:
+                    review_scheduler.DUE_QUEUES.update(user_id, question_id, due_at)
+                with self._cond:
+                    self._stats["flushed"] += len(batch)
+                    self._stats["batches"] += 1
+                metrics.WRITE_BEHIND_FLUSHES.inc(outcome="ok")
+                return
+            except Exception as e:
+                db.rollback()
+                print(f"풀이 기록 일괄 저장 실패 ({attempt + 1}/{WRITE_BEHIND_MAX_RETRIES + 1}, {len(batch)}건): {e}")
+                if attempt < WRITE_BEHIND_MAX_RETRIES:
+                    with self._cond:
+                        self._stats["retries"] += 1
+                    metrics.WRITE_BEHIND_FLUSHES.inc(outcome="retry")
+                    time.sleep(min(0.1 * 2 ** attempt, 5.0))
+            finally:
+                db.close()
+        self._dead_letter(batch)
+
+    def _dead_letter(self, batch: List[PendingAttempt]):
+        # 재시도를 다 써도 실패 → 파일에 남겨서 수동으로 다시 넣을 수 있게 (submission_id가 있어 재적용해도 중복 없음)
+        os.makedirs(DATA_DIR, exist_ok=True)
+        with open(FAILED_PATH, "a", encoding="utf-8") as f:
+            for e in batch:
+                f.write(json.dumps(e.as_dict(), ensure_ascii=False) + "\n")
+        with self._cond:
+            self._stats["failed"] += len(batch)
+        metrics.WRITE_BEHIND_FLUSHES.inc(outcome="failed")
+
+    def drain(self, timeout: float = WRITE_BEHIND_DRAIN_SECONDS) -> int:
+        """남은 항목을 모두 저장하고 스레드 종료 → 시간 안에 못 끝내 실패 파일로 보낸 항목 수"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            alive = thread is not None and thread.is_alive()
+            self._thread = thread if alive else None
+            leftover, self._pending = self._pending, []
+            if alive:
+                # 저장 중인 묶음이 시간 안에 안 끝남 → 데몬 스레드는 종료 시 사라지므로 이 묶음도 실패 파일에 남김
+                # (이미 커밋됐더라도 replay는 submission_id로 건너뛰므로 중복 저장되지 않음)
+                leftover = list(self._inflight) + leftover
+        if leftover:
+            self._dead_letter(leftover)
+        return len(leftover)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {**self._stats, "enabled": QUIZ_WRITE_BEHIND, "pending": len(self._pending),
+                    "inflight": len(self._inflight)}
+
+
+WRITE_BEHIND = WriteBehindBuffer()
+
+
+def replay(path: str = FAILED_PATH, session_factory=SessionLocal) -> Tuple[int, int]:
+    """
+    실패 파일의 항목을 WRITE_BEHIND_BATCH_SIZE개씩 다시 저장 → (저장 처리한 수, 다시 실패한 수)
+    이미 저장된 submission_id는 건너뛰므로 여러 번 실행해도 안전. 다시 실패한 묶음은 실패 파일에 새로 남김
+    """
+    if not os.path.exists(path):
+        return 0, 0
+    # 실행 중인 서버가 새로 쓰는 실패 항목과 섞이지 않도록 파일을 옮긴 뒤 처리
+    replaying = f"{path}.{os.getpid()}.replaying"
+    os.replace(path, replaying)
+    with open(replaying, encoding="utf-8") as f:
+        entries = [PendingAttempt.from_dict(json.loads(line)) for line in f if line.strip()]
+    applied, failed = 0, []
+    for i in range(0, len(entries), WRITE_BEHIND_BATCH_SIZE):
+        batch = entries[i:i + WRITE_BEHIND_BATCH_SIZE]
+        db = session_factory()
+        try:
+            apply_batch(db, batch)
+            applied += len(batch)
+        except Exception as e:
+            db.rollback()
+            print(f"풀이 기록 재저장 실패 ({len(batch)}건): {e}")
+            failed.extend(batch)
+        finally:
+            db.close()
+    if failed:
+        with open(path, "a", encoding="utf-8") as f:
+            for e in failed:
+                f.write(json.dumps(e.as_dict(), ensure_ascii=False) + "\n")
+    os.unlink(replaying)
+    return applied, len(failed)
+
+
+if __name__ == "__main__":
+    # 사용법 (backend 폴더에서): python write_behind.py replay [실패 파일 경로]
+    if len(sys.argv) < 2 or sys.argv[1] != "replay":
+        print("사용법: python write_behind.py replay [실패 파일 경로]")
+        sys.exit(1)
+    started = time.time()
+    applied, failed = replay(sys.argv[2] if len(sys.argv) > 2 else FAILED_PATH)
+    print(f"풀이 기록 재저장 완료: {applied}건 처리, {failed}건 다시 실패, {time.time() - started:.1f}초")
+    print("(서버의 메모리 복습 큐는 REVIEW_HEAP_TTL_SECONDS 안에 DB에서 다시 읽음)")
@@ -85,6 +85,72 @@ CREATE TABLE `question_keywords` (
   CONSTRAINT `question_keywords_ibfk_2` FOREIGN KEY (`keyword_id`) REFERENCES `keywords` (`keyword_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_uca1400_ai_ci;
 
+-- Create material_versions table (강의자료 번들 캐시 검증용 버전: 슬라이드/문제가 바뀔 때마다 증가)
+CREATE TABLE `material_versions` (
+  `material_id` int(11) NOT NULL,
+  `version` bigint(20) NOT NULL DEFAULT 0,
+  `updated_at` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+  PRIMARY KEY (`material_id`),
+  CONSTRAINT `material_versions_ibfk_1` FOREIGN KEY (`material_id`) REFERENCES `lecture_materials` (`material_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_uca1400_ai_ci;
+
+-- slides/questions 변경 시 버전 증가 (Node 서버와 FastAPI 어느 쪽에서 써도 반영)
+CREATE TRIGGER `slides_version_ins` AFTER INSERT ON `slides` FOR EACH ROW
+  INSERT INTO `material_versions` (`material_id`, `version`) VALUES (NEW.`material_id`, 1)
+  ON DUPLICATE KEY UPDATE `version` = `version` + 1;
+-- 수정 시에는 슬라이드가 다른 강의자료로 옮겨진 경우를 위해 이전(OLD)/새(NEW) 강의자료를 모두 증가
+CREATE TRIGGER `slides_version_upd` AFTER UPDATE ON `slides` FOR EACH ROW
+  INSERT INTO `material_versions` (`material_id`, `version`)
+  SELECT `mid`, 1 FROM (SELECT NEW.`material_id` AS `mid` UNION SELECT OLD.`material_id`) AS `changed`
+  ON DUPLICATE KEY UPDATE `version` = `material_versions`.`version` + 1;
+CREATE TRIGGER `slides_version_del` AFTER DELETE ON `slides` FOR EACH ROW
+  INSERT INTO `material_versions` (`material_id`, `version`) VALUES (OLD.`material_id`, 1)
+  ON DUPLICATE KEY UPDATE `version` = `version` + 1;
+CREATE TRIGGER `questions_version_ins` AFTER INSERT ON `questions` FOR EACH ROW
+  INSERT INTO `material_versions` (`material_id`, `version`)
+  SELECT `material_id`, 1 FROM `slides` WHERE `slide_id` = NEW.`slide_id`
+  ON DUPLICATE KEY UPDATE `version` = `material_versions`.`version` + 1;
+CREATE TRIGGER `questions_version_upd` AFTER UPDATE ON `questions` FOR EACH ROW
+  INSERT INTO `material_versions` (`material_id`, `version`)
+  SELECT DISTINCT `material_id`, 1 FROM `slides` WHERE `slide_id` IN (NEW.`slide_id`, OLD.`slide_id`)
+  ON DUPLICATE KEY UPDATE `version` = `material_versions`.`version` + 1;
+CREATE TRIGGER `questions_version_del` AFTER DELETE ON `questions` FOR EACH ROW
+  INSERT INTO `material_versions` (`material_id`, `version`)
+  SELECT `material_id`, 1 FROM `slides` WHERE `slide_id` = OLD.`slide_id`
+  ON DUPLICATE KEY UPDATE `version` = `material_versions`.`version` + 1;
+
+-- 트리거 설치 전부터 있던 강의자료의 버전 행 (없으면 번들 캐시/ETag/304가 동작하지 않음)
+INSERT IGNORE INTO `material_versions` (`material_id`, `version`)
+  SELECT `material_id`, 1 FROM `lecture_materials`;
+
+-- Create material_concepts table -> 강의자료별 개념맵 노드 (개념어는 keywords 공유 → 강의자료 간 개념 그래프)
+CREATE TABLE `material_concepts` (
+  `material_id` int(11) NOT NULL,                  -- 강의 자료 고유 아이디
+  `keyword_id` int(11) NOT NULL,                   -- 개념어(키워드) 고유 아이디
+  `subtopic` varchar(255) DEFAULT NULL,            -- 소주제
+  `importance` int(11) DEFAULT NULL,               -- 중요도 (1~5)
+  `tfidf` float DEFAULT NULL,                      -- TF-IDF 점수
+  `description` text DEFAULT NULL,                 -- 개념어 설명
+  PRIMARY KEY (`material_id`,`keyword_id`),
+  KEY `keyword_id` (`keyword_id`),
+  CONSTRAINT `material_concepts_ibfk_1` FOREIGN KEY (`material_id`) REFERENCES `lecture_materials` (`material_id`),
+  CONSTRAINT `material_concepts_ibfk_2` FOREIGN KEY (`keyword_id`) REFERENCES `keywords` (`keyword_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_uca1400_ai_ci;
+
+-- Create concept_edges table -> 개념어 간 관계 엣지 (강의자료 단위로 저장, 여러 자료에서 나온 같은 관계는 가중치로 합산)
+CREATE TABLE `concept_edges` (
+  `material_id` int(11) NOT NULL,                  -- 관계를 추출한 강의 자료
+  `source_keyword_id` int(11) NOT NULL,            -- 시작 개념어
+  `target_keyword_id` int(11) NOT NULL,            -- 끝 개념어
+  `relation_type` varchar(50) NOT NULL,            -- 관계 유형 (상위-하위, 원인-결과, 동의어 등)
+  PRIMARY KEY (`material_id`,`source_keyword_id`,`target_keyword_id`,`relation_type`),
+  KEY `idx_concept_edges_source` (`source_keyword_id`),
+  KEY `idx_concept_edges_target` (`target_keyword_id`),
+  CONSTRAINT `concept_edges_ibfk_1` FOREIGN KEY (`material_id`) REFERENCES `lecture_materials` (`material_id`),
+  CONSTRAINT `concept_edges_ibfk_2` FOREIGN KEY (`source_keyword_id`) REFERENCES `keywords` (`keyword_id`),
+  CONSTRAINT `concept_edges_ibfk_3` FOREIGN KEY (`target_keyword_id`) REFERENCES `keywords` (`keyword_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_uca1400_ai_ci;
+
 -- Create question_attempts table
 CREATE TABLE `question_attempts` (
   `attempt_id` int(11) NOT NULL AUTO_INCREMENT,             -- 시도 고유 아이디
@@ -93,7 +159,9 @@ CREATE TABLE `question_attempts` (
   `is_correct` tinyint(1) NOT NULL,                         -- 정답 여부
   `answer` text DEFAULT NULL,                               -- 사용자 답안
   `attempt_date` date NOT NULL DEFAULT curdate(),           -- 시도 날짜
+  `submission_id` char(32) DEFAULT NULL,                    -- 지연 저장(write-behind) 제출 ID, 재시도 시 중복 저장 방지
   PRIMARY KEY (`attempt_id`),
+  UNIQUE KEY `uq_qa_submission` (`submission_id`),
   KEY `question_id` (`question_id`),
   KEY `idx_qa_user_question` (`user_id`,`question_id`),
   CONSTRAINT `question_attempts_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`user_id`),
@@ -153,6 +221,67 @@ CREATE TABLE `weak_keyword_logs` (
   CONSTRAINT `weak_keyword_logs_ibfk_3` FOREIGN KEY (`question_id`) REFERENCES `questions` (`question_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_uca1400_ai_ci;
 
+-- Create user_keyword_stats table (사용자 × 키워드 풀이 통계, 문제 제출 시 갱신)
+CREATE TABLE `user_keyword_stats` (
+  `user_id` int(11) NOT NULL,
+  `keyword_id` int(11) NOT NULL,
+  `attempts` int(11) NOT NULL DEFAULT 0,               -- 이 키워드가 걸린 문제 풀이 수
+  `incorrect_count` int(11) NOT NULL DEFAULT 0,        -- 오답 수
+  `last_seen_at` timestamp NULL DEFAULT NULL,          -- 마지막 풀이 시각
+  `last_incorrect_at` timestamp NULL DEFAULT NULL,     -- 마지막 오답 시각
+  `weakness_key` double DEFAULT NULL,                  -- ln(감쇠 약점 점수) + λ·t (keyword_stats.py 참고), 오답 없으면 NULL
+  PRIMARY KEY (`user_id`,`keyword_id`),
+  KEY `idx_uks_weakness` (`user_id`,`weakness_key`),
+  KEY `keyword_id` (`keyword_id`),
+  CONSTRAINT `user_keyword_stats_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`user_id`),
+  CONSTRAINT `user_keyword_stats_ibfk_2` FOREIGN KEY (`keyword_id`) REFERENCES `keywords` (`keyword_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_uca1400_ai_ci;
+
+-- Create review_schedule table (간격 반복 복습 일정, 문제 제출 시 SM-2로 갱신)
+CREATE TABLE `review_schedule` (
+  `user_id` int(11) NOT NULL,
+  `question_id` int(11) NOT NULL,
+  `repetitions` int(11) NOT NULL DEFAULT 0,            -- 연속 정답 횟수 (오답이면 0)
+  `interval_days` double NOT NULL DEFAULT 0,           -- 현재 복습 간격(일)
+  `ease` double NOT NULL DEFAULT 2.5,                  -- SM-2 난이도 계수(EF)
+  `lapses` int(11) NOT NULL DEFAULT 0,                 -- 오답 횟수
+  `last_reviewed_at` datetime DEFAULT NULL,
+  `due_at` datetime NOT NULL,                          -- 다음 복습 시각
+  PRIMARY KEY (`user_id`,`question_id`),
+  KEY `idx_review_due` (`user_id`,`due_at`),
+  KEY `question_id` (`question_id`),
+  CONSTRAINT `review_schedule_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`user_id`),
+  CONSTRAINT `review_schedule_ibfk_2` FOREIGN KEY (`question_id`) REFERENCES `questions` (`question_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_uca1400_ai_ci;
+
+-- Create question_pool table (미리 만들어 둔 문제 풀, (slide_id, keyword_id, difficulty)별로 백그라운드에서 채움)
+CREATE TABLE `question_pool` (
+  `question_id` int(11) NOT NULL,
+  `slide_id` int(11) NOT NULL,
+  `keyword_id` int(11) NOT NULL,
+  `difficulty` varchar(10) NOT NULL,
+  `payload` text NOT NULL,                             -- 생성 응답 JSON (options/tags 포함)
+  `served_count` int(11) NOT NULL DEFAULT 0,           -- 내준 횟수 (0이면 아직 아무에게도 안 나간 문제)
+  `created_at` timestamp NULL DEFAULT current_timestamp(),
+  PRIMARY KEY (`question_id`),
+  KEY `idx_pool_key` (`slide_id`,`keyword_id`,`difficulty`,`question_id`),
+  KEY `keyword_id` (`keyword_id`),
+  CONSTRAINT `question_pool_ibfk_1` FOREIGN KEY (`question_id`) REFERENCES `questions` (`question_id`),
+  CONSTRAINT `question_pool_ibfk_2` FOREIGN KEY (`slide_id`) REFERENCES `slides` (`slide_id`),
+  CONSTRAINT `question_pool_ibfk_3` FOREIGN KEY (`keyword_id`) REFERENCES `keywords` (`keyword_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_uca1400_ai_ci;
+
+-- Create user_seen_questions table (사용자가 풀에서 받은 문제, 같은 문제를 두 번 주지 않기 위함)
+CREATE TABLE `user_seen_questions` (
+  `user_id` int(11) NOT NULL,
+  `question_id` int(11) NOT NULL,
+  `seen_at` timestamp NULL DEFAULT current_timestamp(),
+  PRIMARY KEY (`user_id`,`question_id`),
+  KEY `question_id` (`question_id`),
+  CONSTRAINT `user_seen_questions_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`user_id`),
+  CONSTRAINT `user_seen_questions_ibfk_2` FOREIGN KEY (`question_id`) REFERENCES `questions` (`question_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_uca1400_ai_ci;
+
 -- Create weak_keyword_stats view
 CREATE VIEW `weak_keyword_stats` AS 
 SELECT 
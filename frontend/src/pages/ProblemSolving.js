@@ -73,6 +73,7 @@ export default function ProblemSolving() {
           'Content-Type': 'application/json'
         },
         body: JSON.stringify({
+          user_id: parseJwt(token)?.user_id,  // 미리 만들어 둔 문제 풀에서 안 본 문제를 받기 위함
           slide_id: slide.slide_id,
           keyword_id: keywordId,
           slide_title: slide.slide_title,